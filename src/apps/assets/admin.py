@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from src.apps.core.admin import TenantModelAdmin
+from src.apps.components.models import PlanoPadrao
 from .models import Motor, MarcaMotor, ModeloMotor, Equipamento
 
 @admin.register(MarcaMotor)
@@ -9,12 +10,19 @@ class MarcaMotorAdmin(TenantModelAdmin):
     list_display = ('nome',)
     search_fields = ('nome',)
 
+class PlanoPadraoInline(admin.TabularInline):
+    # Copiados para os itens de cada motor novo deste modelo
+    model = PlanoPadrao
+    exclude = ['tenant']
+    extra = 1
+
 @admin.register(ModeloMotor)
 class ModeloMotorAdmin(TenantModelAdmin):
     # IMPORTANTE: search_fields é obrigatório aqui para o autocomplete_fields do Motor funcionar
     list_display = ('nome', 'marca')
     search_fields = ('nome', 'marca__nome') 
     autocomplete_fields = ['marca']
+    inlines = [PlanoPadraoInline]
 
 @admin.register(Equipamento)
 class EquipamentoAdmin(TenantModelAdmin):
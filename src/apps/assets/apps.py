@@ -10,5 +10,4 @@ class AssetsConfig(AppConfig):
 
     def ready(self):
         # Isso ativa a automação (Signals) quando o app inicia
-        #import src.apps.assets.signals
-        pass
\ No newline at end of file
+        import src.apps.assets.signals
\ No newline at end of file
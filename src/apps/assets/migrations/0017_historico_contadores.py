@@ -0,0 +1,170 @@
+# Generated by Django 5.2.10 on 2026-10-18 16:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def criar_brin(apps, schema_editor):
+    # BRIN: índice minúsculo para a tabela append-only (linhas chegam em ordem de tempo)
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX leitura_registrado_brin ON assets_leituracontador "
+            "USING brin (registrado_em)"
+        )
+
+
+def remover_brin(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS leitura_registrado_brin")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("assets", "0016_alter_equipamento_options_and_more"),
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeituraContador",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "ativo_tipo",
+                    models.CharField(
+                        choices=[("motor", "Motor"), ("equipamento", "Equipamento")],
+                        max_length=12,
+                    ),
+                ),
+                ("ativo_id", models.BigIntegerField()),
+                ("registrado_em", models.DateTimeField()),
+                ("horas", models.IntegerField()),
+                ("arranques", models.IntegerField(blank=True, null=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="core.tenant"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Leitura de Contador",
+                "verbose_name_plural": "Leituras de Contadores",
+                "indexes": [
+                    models.Index(
+                        fields=["ativo_tipo", "ativo_id", "registrado_em"],
+                        name="leitura_ativo_tempo_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="UsoDiario",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "ativo_tipo",
+                    models.CharField(
+                        choices=[("motor", "Motor"), ("equipamento", "Equipamento")],
+                        max_length=12,
+                    ),
+                ),
+                ("ativo_id", models.BigIntegerField()),
+                ("horas_min", models.IntegerField()),
+                ("horas_max", models.IntegerField()),
+                ("arranques_min", models.IntegerField(blank=True, null=True)),
+                ("arranques_max", models.IntegerField(blank=True, null=True)),
+                ("leituras", models.PositiveIntegerField(default=0)),
+                ("dia", models.DateField()),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="core.tenant"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Uso Diário",
+                "verbose_name_plural": "Uso Diário",
+                "indexes": [
+                    models.Index(
+                        fields=["tenant", "ativo_tipo", "dia"],
+                        name="uso_diario_tenant_dia_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("ativo_tipo", "ativo_id", "dia"),
+                        name="uso_diario_unico",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="UsoMensal",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "ativo_tipo",
+                    models.CharField(
+                        choices=[("motor", "Motor"), ("equipamento", "Equipamento")],
+                        max_length=12,
+                    ),
+                ),
+                ("ativo_id", models.BigIntegerField()),
+                ("horas_min", models.IntegerField()),
+                ("horas_max", models.IntegerField()),
+                ("arranques_min", models.IntegerField(blank=True, null=True)),
+                ("arranques_max", models.IntegerField(blank=True, null=True)),
+                ("leituras", models.PositiveIntegerField(default=0)),
+                ("mes", models.DateField(help_text="Primeiro dia do mês")),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="core.tenant"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Uso Mensal",
+                "verbose_name_plural": "Uso Mensal",
+                "indexes": [
+                    models.Index(
+                        fields=["tenant", "ativo_tipo", "mes"],
+                        name="uso_mensal_tenant_mes_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("ativo_tipo", "ativo_id", "mes"),
+                        name="uso_mensal_unico",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(criar_brin, remover_brin),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from src.apps.core.models import TenantAwareModel
 
 # --- Marca e Modelo (Mantém igual) ---
@@ -64,18 +64,23 @@ class Motor(TenantAwareModel):
         verbose_name = "Motor"
         verbose_name_plural = "Motores"
 
-    def save(self, *args, **kwargs):
+    def aplicar_quantidades_padrao(self):
         # Automação inteligente: Se deixar 0, assume a quantidade de cilindros
+        if self.qtd_pistoes == 0: self.qtd_pistoes = self.qtd_cilindros
+        if self.qtd_camisas == 0: self.qtd_camisas = self.qtd_cilindros
+        if self.qtd_bronzinas == 0: self.qtd_bronzinas = self.qtd_cilindros
+        if self.qtd_bielas == 0: self.qtd_bielas = self.qtd_cilindros
+        if self.qtd_velas == 0: self.qtd_velas = self.qtd_cilindros
+        if self.qtd_bobinas == 0: self.qtd_bobinas = self.qtd_cilindros
+        if self.qtd_cabos_vela == 0: self.qtd_cabos_vela = self.qtd_cilindros
+
+    def save(self, *args, **kwargs):
         if not self.pk: # Apenas na criação
-            if self.qtd_pistoes == 0: self.qtd_pistoes = self.qtd_cilindros
-            if self.qtd_camisas == 0: self.qtd_camisas = self.qtd_cilindros
-            if self.qtd_bronzinas == 0: self.qtd_bronzinas = self.qtd_cilindros
-            if self.qtd_bielas == 0: self.qtd_bielas = self.qtd_cilindros
-            if self.qtd_velas == 0: self.qtd_velas = self.qtd_cilindros
-            if self.qtd_bobinas == 0: self.qtd_bobinas = self.qtd_cilindros
-            if self.qtd_cabos_vela == 0: self.qtd_cabos_vela = self.qtd_cilindros
-            
-        super().save(*args, **kwargs)
+            self.aplicar_quantidades_padrao()
+
+        # A estrutura de componentes (signal post_save) é gravada na mesma transação
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self): return f"{self.nome} ({self.modelo.nome})"
 
@@ -111,4 +116,77 @@ class Equipamento(TenantAwareModel):
         ordering = ['nome']
 
     def __str__(self):
-        return f"{self.nome} ({self.horas_totais}h)"
\ No newline at end of file
+        return f"{self.nome} ({self.horas_totais}h)"
+
+# --- HISTÓRICO DOS CONTADORES (série temporal) ---
+
+TIPOS_ATIVO = [
+    ('motor', 'Motor'),
+    ('equipamento', 'Equipamento'),
+]
+
+
+class LeituraContador(TenantAwareModel):
+    """
+    Leitura de horímetro/arranques de um ativo (append-only, alto volume).
+    O ativo é (tipo, id) sem FK: linha enxuta, sem índices extras por ativo.
+    No PostgreSQL há também um índice BRIN em registrado_em (ver migration).
+    """
+    ativo_tipo = models.CharField(max_length=12, choices=TIPOS_ATIVO)
+    ativo_id = models.BigIntegerField()
+    registrado_em = models.DateTimeField()
+    horas = models.IntegerField()
+    arranques = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Leitura de Contador"
+        verbose_name_plural = "Leituras de Contadores"
+        indexes = [
+            models.Index(fields=['ativo_tipo', 'ativo_id', 'registrado_em'], name='leitura_ativo_tempo_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ativo_tipo} {self.ativo_id} em {self.registrado_em:%d/%m/%Y %H:%M}: {self.horas}h"
+
+
+class UsoAgregado(TenantAwareModel):
+    """Faixa dos contadores de um ativo num período (base dos rollups diário e mensal)."""
+    ativo_tipo = models.CharField(max_length=12, choices=TIPOS_ATIVO)
+    ativo_id = models.BigIntegerField()
+    horas_min = models.IntegerField()
+    horas_max = models.IntegerField()
+    arranques_min = models.IntegerField(null=True, blank=True)
+    arranques_max = models.IntegerField(null=True, blank=True)
+    leituras = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class UsoDiario(UsoAgregado):
+    dia = models.DateField()
+
+    class Meta:
+        verbose_name = "Uso Diário"
+        verbose_name_plural = "Uso Diário"
+        constraints = [
+            models.UniqueConstraint(fields=['ativo_tipo', 'ativo_id', 'dia'], name='uso_diario_unico'),
+        ]
+        indexes = [
+            # "Todos os motores do tenant no último ano": range scan por dia
+            models.Index(fields=['tenant', 'ativo_tipo', 'dia'], name='uso_diario_tenant_dia_idx'),
+        ]
+
+
+class UsoMensal(UsoAgregado):
+    mes = models.DateField(help_text="Primeiro dia do mês")
+
+    class Meta:
+        verbose_name = "Uso Mensal"
+        verbose_name_plural = "Uso Mensal"
+        constraints = [
+            models.UniqueConstraint(fields=['ativo_tipo', 'ativo_id', 'mes'], name='uso_mensal_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['tenant', 'ativo_tipo', 'mes'], name='uso_mensal_tenant_mes_idx'),
+        ]
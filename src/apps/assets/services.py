@@ -0,0 +1,428 @@
+import atexit
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, Max, Min, Q, Sum, Value, When, Window
+from django.db.models.functions import Coalesce, Greatest, Lag, TruncDate, TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from src.apps.assets.models import Motor, Equipamento, LeituraContador, UsoDiario, UsoMensal
+from src.apps.core.cache import cache_preventivas
+from src.apps.core.tenancy import todos_os_tenants
+
+# Colunas de contador gravadas pela telemetria, por tipo de ativo
+CONTADORES = {
+    'motor': (Motor, ('horas_totais', 'total_arranques')),
+    'equipamento': (Equipamento, ('horas_totais',)),
+}
+
+# Linhas por comando no UPDATE em conjunto
+LOTE_UPDATE = 1000
+
+
+# ==========================================================
+# 1. VALIDAÇÃO (contadores só andam para a frente)
+# ==========================================================
+
+def _ler_leitura(leitura):
+    """Normaliza uma leitura do payload em (tipo, id, data, (horas, arranques))."""
+    if not isinstance(leitura, dict):
+        raise ValueError("Leitura deve ser um objeto.")
+    tipos = [tipo for tipo in CONTADORES if tipo in leitura]
+    if len(tipos) != 1:
+        raise ValueError("Informe 'motor' OU 'equipamento'.")
+    tipo = tipos[0]
+    if not isinstance(leitura[tipo], int) or isinstance(leitura[tipo], bool):
+        raise ValueError(f"'{tipo}' deve ser o id (inteiro) do ativo.")
+
+    valores = []
+    for campo in ('horas', 'arranques'):
+        valor = leitura.get(campo)
+        if valor is not None and (not isinstance(valor, int) or isinstance(valor, bool) or valor < 0):
+            raise ValueError(f"'{campo}' deve ser um inteiro não negativo.")
+        valores.append(valor)
+    if valores[0] is None:
+        raise ValueError("'horas' é obrigatório.")
+    if tipo == 'equipamento':
+        valores = valores[:1]
+
+    data = leitura.get('data')
+    if data is not None:
+        data = parse_datetime(data) if isinstance(data, str) else None
+        if data is None:
+            raise ValueError("'data' deve estar no formato ISO 8601.")
+        if timezone.is_naive(data):
+            data = timezone.make_aware(data)
+    return tipo, leitura[tipo], data, tuple(valores)
+
+
+def validar_leituras(tenant_id, leituras, pendentes=None):
+    """
+    Valida um lote de leituras do tenant e coalesce por ativo.
+
+    Cada leitura precisa ser >= à anterior do mesmo ativo (no lote, na ordem
+    de 'data' quando todas a informam) e >= ao valor atual do ativo (banco ou
+    ainda pendente no buffer). Um SELECT por tipo de ativo, qualquer que seja
+    o tamanho do lote.
+
+    Retorna ({(tipo, id): valores finais}, [(índice, erro), ...], leituras
+    aceitas como LeituraContador ainda não gravadas, para o histórico).
+    """
+    rejeitadas = []
+    por_ativo = {}
+    for indice, leitura in enumerate(leituras):
+        try:
+            tipo, pk, data, valores = _ler_leitura(leitura)
+        except ValueError as erro:
+            rejeitadas.append((indice, str(erro)))
+            continue
+        por_ativo.setdefault((tipo, pk), []).append((data, indice, valores))
+
+    atuais = {}
+    for tipo, (modelo, colunas) in CONTADORES.items():
+        ids = [pk for t, pk in por_ativo if t == tipo]
+        if ids:
+            linhas = modelo.objects.filter(tenant_id=tenant_id, pk__in=ids).values_list('pk', *colunas)
+            atuais.update({(tipo, pk): tuple(valores) for pk, *valores in linhas})
+
+    aceitas, historico = {}, []
+    agora = timezone.now()
+    for chave, grupo in por_ativo.items():
+        if chave not in atuais:
+            rejeitadas.extend((indice, f"{chave[0].capitalize()} {chave[1]} não encontrado.") for _, indice, _ in grupo)
+            continue
+        if all(data is not None for data, _, _ in grupo):
+            grupo.sort(key=lambda item: item[0])
+
+        base = atuais[chave]
+        pendente = (pendentes or {}).get((tenant_id, *chave))
+        if pendente:
+            base = tuple(max(a, p) for a, p in zip(base, pendente))
+
+        final = None
+        for data, indice, valores in grupo:
+            # Arranques não informado: mantém o atual
+            valores = tuple(b if v is None else v for v, b in zip(valores, base))
+            if any(v < b for v, b in zip(valores, base)):
+                rejeitadas.append((indice, f"Leitura menor que a anterior {base}."))
+                continue
+            base = final = valores
+            historico.append(LeituraContador(
+                tenant_id=tenant_id, ativo_tipo=chave[0], ativo_id=chave[1], registrado_em=data or agora,
+                horas=valores[0], arranques=valores[1] if len(valores) > 1 else None,
+            ))
+        if final is not None:
+            aceitas[chave] = final
+
+    rejeitadas.sort()
+    return aceitas, rejeitadas, historico
+
+
+# ==========================================================
+# 2. GRAVAÇÃO EM CONJUNTO
+# ==========================================================
+
+def _atualizar_contadores(modelo, colunas, valores):
+    """
+    Um UPDATE para muitos ativos (por lote de LOTE_UPDATE), sem nunca
+    diminuir o contador gravado (GREATEST com o valor atual).
+
+    PostgreSQL: UPDATE ... FROM (VALUES ...). Outros bancos: CASE por id.
+    """
+    itens = list(valores.items())
+    for inicio in range(0, len(itens), LOTE_UPDATE):
+        lote = itens[inicio:inicio + LOTE_UPDATE]
+
+        if connection.vendor == 'postgresql':
+            qn = connection.ops.quote_name
+            tabela = qn(modelo._meta.db_table)
+            cols = [qn(modelo._meta.get_field(coluna).column) for coluna in colunas]
+            linha = "(%s)" % ", ".join(["%s::bigint"] + ["%s::integer"] * len(cols))
+            sql = (
+                f"UPDATE {tabela} AS t SET "
+                + ", ".join(f"{c} = GREATEST(t.{c}, COALESCE(v.{c}, t.{c}))" for c in cols)
+                + f" FROM (VALUES {', '.join([linha] * len(lote))}) AS v(id, {', '.join(cols)})"
+                + " WHERE t.id = v.id"
+            )
+            params = [valor for pk, contadores in lote for valor in (pk, *contadores)]
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+            continue
+
+        atualizacao = {}
+        for i, coluna in enumerate(colunas):
+            atualizacao[coluna] = Case(
+                *[
+                    When(pk=pk, then=Greatest(F(coluna), Value(contadores[i])))
+                    for pk, contadores in lote if contadores[i] is not None
+                ],
+                default=F(coluna),
+            )
+        modelo.objects.filter(pk__in=[pk for pk, _ in lote]).update(**atualizacao)
+
+
+def gravar_contadores(pendentes):
+    """
+    Grava as leituras coalescidas ({(tenant_id, tipo, id): valores}) e
+    atualiza o saldo das preventivas só desses ativos: um UPDATE por tipo de
+    ativo e um por unidade de contador, qualquer que seja o nº de ativos.
+
+    As chaves já trazem o tenant e o buffer mistura empresas: grava fora do
+    filtro do tenant da requisição que disparou o flush.
+    """
+    from src.apps.components.models import PlanoPreventiva
+
+    if not pendentes:
+        return
+    por_tipo = {tipo: {} for tipo in CONTADORES}
+    for (_, tipo, pk), valores in pendentes.items():
+        por_tipo[tipo][pk] = valores
+
+    with transaction.atomic(), todos_os_tenants():
+        for tipo, valores in por_tipo.items():
+            if valores:
+                modelo, colunas = CONTADORES[tipo]
+                _atualizar_contadores(modelo, colunas, valores)
+
+        # O .update()/SQL acima não dispara os signals de atualizar_saldos_*
+        PlanoPreventiva.objects.filter(
+            Q(posicao__motor_id__in=list(por_tipo['motor']))
+            | Q(posicao__motor__isnull=True, posicao__equipamento_id__in=list(por_tipo['equipamento']))
+        ).recalcular_saldos_pelos_ativos()
+        cache_preventivas.invalidar_no_commit(tenant_id for tenant_id, _, _ in pendentes)
+
+
+# ==========================================================
+# 3. BUFFER (uma gravação por ativo por intervalo)
+# ==========================================================
+
+class BufferTelemetria:
+    """
+    Coalesce leituras em memória: por ativo fica só o maior valor, e o flush
+    grava tudo de uma vez no máximo uma vez por `intervalo` segundos (os
+    contadores e, em um INSERT, o histórico de leituras).
+    Um buffer por processo; o que estiver pendente é gravado na saída.
+    """
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._pendentes = {}
+        self._historico = []
+        self._ultimo_flush = time.monotonic()
+
+    def pendentes(self):
+        with self._lock:
+            return dict(self._pendentes)
+
+    def adicionar(self, tenant_id, aceitas, historico=()):
+        with self._lock:
+            for (tipo, pk), valores in aceitas.items():
+                chave = (tenant_id, tipo, pk)
+                anterior = self._pendentes.get(chave)
+                if anterior:
+                    valores = tuple(max(v, a) for v, a in zip(valores, anterior))
+                self._pendentes[chave] = valores
+            self._historico.extend(historico)
+
+    def flush(self, forcar=False) -> int:
+        with self._lock:
+            if not self._pendentes:
+                return 0
+            if not forcar and time.monotonic() - self._ultimo_flush < self.intervalo:
+                return 0
+            pendentes, self._pendentes = self._pendentes, {}
+            historico, self._historico = self._historico, []
+            self._ultimo_flush = time.monotonic()
+
+        try:
+            with transaction.atomic():
+                gravar_contadores(pendentes)
+                registrar_leituras(historico)
+        except Exception:
+            # Devolve ao buffer para a próxima tentativa (sem perder leituras)
+            with self._lock:
+                for chave, valores in pendentes.items():
+                    atual = self._pendentes.get(chave)
+                    self._pendentes[chave] = tuple(map(max, valores, atual)) if atual else valores
+                self._historico[:0] = historico
+            raise
+        return len(pendentes)
+
+
+buffer_telemetria = BufferTelemetria(settings.TELEMETRIA_FLUSH_SEGUNDOS)
+atexit.register(buffer_telemetria.flush, forcar=True)
+
+
+def ingerir_leituras(tenant_id, leituras, buffer=None):
+    """
+    Entrada da telemetria: valida, coalesce no buffer e grava se o intervalo
+    de flush já passou. Retorna o resumo para a resposta da API.
+    """
+    buffer = buffer or buffer_telemetria
+    aceitas, rejeitadas, historico = validar_leituras(tenant_id, leituras, buffer.pendentes())
+    buffer.adicionar(tenant_id, aceitas, historico)
+    gravados = buffer.flush()
+    return {
+        'aceitas': len(leituras) - len(rejeitadas),
+        'ativos': len(aceitas),
+        'gravados': gravados,
+        'rejeitadas': [{'indice': indice, 'erro': erro} for indice, erro in rejeitadas],
+    }
+
+
+# ==========================================================
+# 4. HISTÓRICO E ROLLUPS (uso diário / mensal)
+# ==========================================================
+
+# Agregados de cada rollup: campo -> (função, coluna de origem no nível abaixo)
+_AGREGADOS_DIA = {
+    'horas_min': (Min, 'horas'), 'horas_max': (Max, 'horas'),
+    'arranques_min': (Min, 'arranques'), 'arranques_max': (Max, 'arranques'),
+    'leituras': (Count, 'id'),
+}
+_AGREGADOS_MES = {
+    'horas_min': (Min, 'horas_min'), 'horas_max': (Max, 'horas_max'),
+    'arranques_min': (Min, 'arranques_min'), 'arranques_max': (Max, 'arranques_max'),
+    'leituras': (Sum, 'leituras'),
+}
+
+
+def _filtro_ativos(chaves):
+    filtro = Q()
+    for tipo in {tipo for tipo, _, _ in chaves}:
+        filtro |= Q(ativo_tipo=tipo, ativo_id__in={pk for t, pk, _ in chaves if t == tipo})
+    return filtro
+
+
+def _reagregar(origem, destino, periodo, truncar, agregados, chaves):
+    """
+    Recalcula no `destino` só os períodos em `chaves` ({(tipo, id, período)})
+    com um GROUP BY na `origem`, e grava com um upsert (INSERT ... ON CONFLICT).
+    Recalcular a partir da origem deixa o rollup idempotente.
+    """
+    apelidos = {f'_{campo}': funcao(coluna) for campo, (funcao, coluna) in agregados.items()}
+    linhas = (
+        origem.annotate(**{periodo: truncar})
+        .values('tenant_id', 'ativo_tipo', 'ativo_id', periodo)
+        .annotate(**apelidos)
+        .order_by()
+    )
+    registros = [
+        destino(**{campo.lstrip('_'): valor for campo, valor in linha.items()})
+        for linha in linhas
+        if (linha['ativo_tipo'], linha['ativo_id'], linha[periodo]) in chaves
+    ]
+    destino.objects.bulk_create(
+        registros, batch_size=LOTE_UPDATE, update_conflicts=True,
+        unique_fields=['ativo_tipo', 'ativo_id', periodo], update_fields=list(agregados),
+    )
+
+
+def atualizar_rollups(dias):
+    """
+    Atualiza UsoDiario dos (tipo, id, dia) informados a partir das leituras, e
+    UsoMensal dos meses correspondentes a partir dos dias: dois GROUP BY em
+    faixas indexadas e dois upserts, só nos períodos tocados.
+    """
+    if not dias:
+        return
+    dias = set(dias)
+    primeiro, ultimo = min(d for _, _, d in dias), max(d for _, _, d in dias)
+    leituras = LeituraContador.objects.filter(
+        _filtro_ativos(dias),
+        registrado_em__gte=timezone.make_aware(datetime.combine(primeiro, datetime.min.time())),
+        registrado_em__lt=timezone.make_aware(datetime.combine(ultimo + timedelta(days=1), datetime.min.time())),
+    )
+    _reagregar(leituras, UsoDiario, 'dia', TruncDate('registrado_em'), _AGREGADOS_DIA, dias)
+
+    meses = {(tipo, pk, dia.replace(day=1)) for tipo, pk, dia in dias}
+    fim_mes = (ultimo.replace(day=1) + timedelta(days=32)).replace(day=1)
+    diarios = UsoDiario.objects.filter(_filtro_ativos(meses), dia__gte=primeiro.replace(day=1), dia__lt=fim_mes)
+    _reagregar(diarios, UsoMensal, 'mes', TruncMonth('dia'), _AGREGADOS_MES, meses)
+
+
+def registrar_leituras(leituras):
+    """
+    Grava leituras no histórico (INSERT em lote) e atualiza só os rollups
+    dos dias que elas tocam. As leituras podem ser de vários tenants (flush
+    do buffer): os rollups são lidos e gravados fora do filtro do contexto.
+    """
+    if not leituras:
+        return
+    with transaction.atomic(), todos_os_tenants():
+        LeituraContador.objects.bulk_create(leituras, batch_size=LOTE_UPDATE)
+        atualizar_rollups({
+            (leitura.ativo_tipo, leitura.ativo_id, timezone.localdate(leitura.registrado_em))
+            for leitura in leituras
+        })
+        # Rollups novos mudam a taxa de uso usada na previsão de vencimento
+        cache_preventivas.invalidar_no_commit(leitura.tenant_id for leitura in leituras)
+
+
+def uso_por_dia(tenant_id, inicio, fim, ativo_tipo='motor'):
+    """
+    Horas rodadas e arranques por ativo e dia, lidos só do rollup diário:
+    maior contador do dia menos o do dia anterior com leitura (no primeiro
+    dia da faixa, a variação dentro do próprio dia).
+    """
+    def variacao(coluna):
+        anterior = Window(Lag(f'{coluna}_max'), partition_by=[F('ativo_id')], order_by=F('dia').asc())
+        return F(f'{coluna}_max') - Coalesce(anterior, F(f'{coluna}_min'))
+
+    return (
+        UsoDiario.objects.filter(tenant_id=tenant_id, ativo_tipo=ativo_tipo, dia__gte=inicio, dia__lte=fim)
+        .annotate(horas_rodadas=variacao('horas'), arranques_no_dia=variacao('arranques'))
+        .order_by('ativo_id', 'dia')
+        .values('ativo_id', 'dia', 'horas_rodadas', 'arranques_no_dia')
+    )
+
+
+def taxas_de_uso(tenant_id, hoje=None, janela=28):
+    """
+    Horas/dia e arranques/dia de cada ativo do tenant, pela mediana das taxas
+    entre leituras consecutivas do rollup diário nos últimos `janela` dias
+    (robusta a um dia atípico ou a um buraco na telemetria). Uma query.
+
+    Retorna {(tipo, id): (horas_por_dia, arranques_por_dia)}; nan sem dados.
+    """
+    hoje = hoje or timezone.localdate()
+    linhas = list(
+        UsoDiario.objects.filter(tenant_id=tenant_id, dia__gt=hoje - timedelta(days=janela), dia__lte=hoje)
+        .order_by('ativo_tipo', 'ativo_id', 'dia')
+        .values_list('ativo_tipo', 'ativo_id', 'dia', 'horas_max', 'arranques_max')
+    )
+    if not linhas:
+        return {}
+
+    chaves = [(tipo, pk) for tipo, pk, *_ in linhas]
+    dia = np.fromiter((d.toordinal() for _, _, d, _, _ in linhas), dtype=np.float64, count=len(linhas))
+    horas = np.fromiter((h for *_, h, _ in linhas), dtype=np.float64, count=len(linhas))
+    arranques = np.array([np.nan if a is None else a for *_, a in linhas], dtype=np.float64)
+
+    # Taxa de cada intervalo entre dois dias com leitura do MESMO ativo
+    mesmo_ativo = np.array([a == b for a, b in zip(chaves[1:], chaves[:-1])], dtype=bool)
+    # Só os pares do mesmo ativo: na fronteira entre dois ativos dias pode ser <= 0
+    dias = np.diff(dia)[mesmo_ativo]
+    taxa_horas = np.full(mesmo_ativo.size, np.nan)
+    taxa_horas[mesmo_ativo] = np.diff(horas)[mesmo_ativo] / dias
+    taxa_arranques = np.full(mesmo_ativo.size, np.nan)
+    taxa_arranques[mesmo_ativo] = np.diff(arranques)[mesmo_ativo] / dias
+
+    # Fatias por ativo (linhas já ordenadas) e mediana ignorando nan
+    inicios = np.flatnonzero(np.r_[True, ~mesmo_ativo])
+    resultado = {}
+    for inicio, fim in zip(inicios, np.r_[inicios[1:], len(linhas)]):
+        # Intervalos do ativo: índices inicio..fim-2 em taxa_* (fim-1 é a última leitura)
+        th, ta = taxa_horas[inicio:fim - 1], taxa_arranques[inicio:fim - 1]
+        resultado[chaves[inicio]] = (
+            float(np.median(th)) if th.size else np.nan,
+            float(np.nanmedian(ta)) if ta.size and not np.isnan(ta).all() else np.nan,
+        )
+    return resultado
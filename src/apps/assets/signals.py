@@ -0,0 +1,39 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from src.apps.core.tenancy import usar_tenant
+from .models import Motor, Equipamento, LeituraContador
+from .services import registrar_leituras
+
+
+def _registrar_se_mudou(tenant_id, ativo_tipo, ativo_id, horas, arranques):
+    # Um save qualquer no admin não pode virar leitura repetida no histórico
+    with usar_tenant(tenant_id):
+        ultima = (
+            LeituraContador.objects.filter(ativo_tipo=ativo_tipo, ativo_id=ativo_id)
+            .order_by('-registrado_em')
+            .values_list('horas', 'arranques')
+            .first()
+        )
+    if ultima == (horas, arranques):
+        return
+    registrar_leituras([LeituraContador(
+        tenant_id=tenant_id, ativo_tipo=ativo_tipo, ativo_id=ativo_id,
+        registrado_em=timezone.now(), horas=horas, arranques=arranques,
+    )])
+
+
+@receiver(post_save, sender=Motor)
+@receiver(post_save, sender=Equipamento)
+def historico_contadores(sender, instance, update_fields=None, **kwargs):
+    """Horímetro digitado no admin também entra no histórico (depois do COMMIT)."""
+    if update_fields is not None and not {'horas_totais', 'total_arranques'} & set(update_fields):
+        return
+    tipo = 'motor' if sender is Motor else 'equipamento'
+    transaction.on_commit(partial(
+        _registrar_se_mudou, instance.tenant_id, tipo, instance.pk,
+        instance.horas_totais, getattr(instance, 'total_arranques', None),
+    ))
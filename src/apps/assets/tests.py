@@ -0,0 +1,175 @@
+import json
+from datetime import date, datetime
+
+import numpy as np
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from src.apps.components.models import PlanoPreventiva, PosicaoComponente
+from src.apps.core.models import Tenant, User
+from src.apps.core.tenancy import usar_tenant
+from .models import Equipamento, LeituraContador, MarcaMotor, ModeloMotor, Motor, UsoDiario, UsoMensal
+from .services import BufferTelemetria, ingerir_leituras, registrar_leituras, taxas_de_uso, uso_por_dia
+
+
+class TelemetriaTests(TestCase):
+    """Leituras em lote: validação monotônica, um UPDATE por tipo de ativo e saldos atualizados."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(nome="Empresa Teste")
+        marca = MarcaMotor.objects.create(tenant=cls.tenant, nome="Jenbacher")
+        modelo = ModeloMotor.objects.create(tenant=cls.tenant, marca=marca, nome="J620")
+        cls.motores = [
+            Motor.objects.create(
+                tenant=cls.tenant, nome=f"GMG {i}", modelo=modelo, numero_serie=str(i), localizacao="Sala 1",
+                qtd_cilindros=4, horas_totais=1000, total_arranques=100,
+            )
+            for i in range(3)
+        ]
+        cls.compressor = Equipamento.objects.create(tenant=cls.tenant, nome="Compressor", localizacao="Sala 2", horas_totais=50)
+        PlanoPreventiva.objects.bulk_create([
+            PlanoPreventiva(
+                tenant=cls.tenant, posicao=posicao, tarefa="Troca", tipo_servico='SUBSTITUICAO',
+                unidade=unidade, intervalo_valor=500,
+            )
+            for posicao in PosicaoComponente.objects.filter(motor__in=cls.motores, nome_base="Vela de Ignição")
+            for unidade in ('HORAS', 'ARRANQUES')
+        ])
+        PlanoPreventiva.objects.recalcular_vencimentos()
+        cls.user = User.objects.create_user(email="controlador@teste.com", password="x", tenant=cls.tenant)
+
+    def saldos(self, motor):
+        return dict(PlanoPreventiva.objects.filter(posicao__motor=motor).values_list('unidade', 'saldo_contador').distinct())
+
+    def test_endpoint_valida_e_grava_em_conjunto(self):
+        a, b, c = self.motores
+        leituras = [
+            {'motor': a.pk, 'horas': 1100, 'arranques': 110, 'data': "2026-05-10T10:01:00"},
+            {'motor': a.pk, 'horas': 1050, 'data': "2026-05-10T10:00:00"},   # chegou fora de ordem
+            {'motor': b.pk, 'horas': 900},                                    # volta o horímetro
+            {'motor': c.pk, 'horas': 1200},
+            {'equipamento': self.compressor.pk, 'horas': 80},
+            {'motor': 999999, 'horas': 1},
+            {'motor': a.pk},
+        ]
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                reverse('assets:telemetria'), json.dumps({'leituras': leituras}), content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        resultado = response.json()
+        self.assertEqual((resultado['aceitas'], resultado['ativos']), (4, 3))
+        self.assertEqual([r['indice'] for r in resultado['rejeitadas']], [2, 5, 6])
+
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 4)  # motores, equipamentos, saldos HORAS, saldos ARRANQUES
+
+        valores = dict(Motor.objects.values_list('pk', 'horas_totais'))
+        self.assertEqual([valores[m.pk] for m in self.motores], [1100, 1000, 1200])
+        a.refresh_from_db()
+        self.assertEqual(a.total_arranques, 110)
+        self.compressor.refresh_from_db()
+        self.assertEqual(self.compressor.horas_totais, 80)
+        self.assertEqual(self.saldos(a), {'HORAS': 400, 'ARRANQUES': 390})
+        self.assertEqual(self.saldos(b), {'HORAS': 500, 'ARRANQUES': 400})
+
+    def test_buffer_grava_uma_vez_por_intervalo(self):
+        buffer = BufferTelemetria(intervalo=3600)
+        motor = self.motores[0]
+        for horas in (1010, 1020, 1030):
+            resultado = ingerir_leituras(self.tenant.pk, [{'motor': motor.pk, 'horas': horas}], buffer=buffer)
+            self.assertEqual(resultado['gravados'], 0)
+        # Leitura menor que a pendente no buffer também é rejeitada
+        self.assertEqual(len(ingerir_leituras(self.tenant.pk, [{'motor': motor.pk, 'horas': 1025}], buffer=buffer)['rejeitadas']), 1)
+        motor.refresh_from_db()
+        self.assertEqual(motor.horas_totais, 1000)
+
+        self.assertEqual(buffer.flush(forcar=True), 1)
+        motor.refresh_from_db()
+        self.assertEqual(motor.horas_totais, 1030)
+
+        # O histórico guarda cada leitura aceita, não só a coalescida
+        self.assertEqual(
+            list(LeituraContador.objects.filter(ativo_id=motor.pk).order_by('registrado_em').values_list('horas', flat=True)),
+            [1010, 1020, 1030],
+        )
+
+
+    def test_flush_grava_todos_os_tenants(self):
+        # O buffer é do processo: o flush disparado pela requisição de um tenant grava os outros também
+        outro = Tenant.objects.create(nome="Empresa B")
+        marca = MarcaMotor.objects.create(tenant=outro, nome="Cummins")
+        modelo = ModeloMotor.objects.create(tenant=outro, marca=marca, nome="QSK60")
+        motor_b = Motor.objects.create(
+            tenant=outro, nome="GMG B", modelo=modelo, numero_serie="B1", localizacao="-", qtd_cilindros=4,
+        )
+        buffer = BufferTelemetria(intervalo=3600)
+        ingerir_leituras(outro.pk, [{'motor': motor_b.pk, 'horas': 70, 'data': "2026-05-10T10:00:00"}], buffer=buffer)
+        ingerir_leituras(self.tenant.pk, [{'motor': self.motores[0].pk, 'horas': 1010}], buffer=buffer)
+
+        with usar_tenant(self.tenant.pk):
+            self.assertEqual(buffer.flush(forcar=True), 2)
+
+        motor_b.refresh_from_db()
+        self.assertEqual(motor_b.horas_totais, 70)
+        self.assertTrue(UsoDiario.objects.filter(tenant=outro, ativo_id=motor_b.pk, horas_max=70).exists())
+
+
+class HistoricoContadoresTests(TestCase):
+    """Leituras append-only com rollups diário/mensal atualizados só nos períodos tocados."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(nome="Empresa Teste")
+
+    def leitura(self, ativo_id, quando, horas, arranques=None):
+        return LeituraContador(
+            tenant=self.tenant, ativo_tipo='motor', ativo_id=ativo_id,
+            registrado_em=timezone.make_aware(datetime(*quando)), horas=horas, arranques=arranques,
+        )
+
+    def test_rollups_e_uso_por_dia(self):
+        registrar_leituras([
+            self.leitura(1, (2026, 4, 30, 22), 100, 10),
+            self.leitura(1, (2026, 5, 1, 8), 108, 11),
+            self.leitura(1, (2026, 5, 1, 20), 120, 12),
+            self.leitura(1, (2026, 5, 2, 9), 130, 12),
+            self.leitura(2, (2026, 5, 1, 12), 500),
+        ])
+        dia = UsoDiario.objects.get(ativo_id=1, dia=date(2026, 5, 1))
+        self.assertEqual((dia.horas_min, dia.horas_max, dia.arranques_max, dia.leituras), (108, 120, 12, 2))
+        maio = UsoMensal.objects.get(ativo_id=1, mes=date(2026, 5, 1))
+        self.assertEqual((maio.horas_min, maio.horas_max, maio.leituras), (108, 130, 3))
+
+        # Leitura atrasada: só o dia e o mês dela são recalculados
+        registrar_leituras([self.leitura(1, (2026, 5, 2, 23), 140, 13)])
+        self.assertEqual(UsoDiario.objects.get(ativo_id=1, dia=date(2026, 5, 2)).horas_max, 140)
+        self.assertEqual(UsoMensal.objects.get(ativo_id=1, mes=date(2026, 5, 1)).leituras, 4)
+
+        with self.assertNumQueries(1):
+            uso = list(uso_por_dia(self.tenant.pk, date(2026, 4, 1), date(2026, 5, 31)))
+        self.assertEqual(
+            [(u['ativo_id'], u['dia'], u['horas_rodadas'], u['arranques_no_dia']) for u in uso],
+            [(1, date(2026, 4, 30), 0, 0), (1, date(2026, 5, 1), 20, 2), (1, date(2026, 5, 2), 20, 1),
+             (2, date(2026, 5, 1), 0, None)],
+        )
+
+    def test_taxas_de_uso_sem_dividir_entre_ativos(self):
+        registrar_leituras([
+            self.leitura(1, (2026, 5, 1, 12), 100, 10),
+            self.leitura(1, (2026, 5, 2, 12), 120, 12),
+            self.leitura(1, (2026, 5, 3, 12), 150, 13),
+            # Mesmo dia da última leitura do ativo 1: na fronteira, dias = 0
+            self.leitura(2, (2026, 5, 3, 12), 500),
+            self.leitura(2, (2026, 5, 5, 12), 540),
+        ])
+        with np.errstate(all='raise'):
+            taxas = taxas_de_uso(self.tenant.pk, hoje=date(2026, 5, 10))
+        self.assertEqual(taxas[('motor', 1)], (25.0, 1.5))
+        self.assertEqual(taxas[('motor', 2)][0], 20.0)
+        self.assertTrue(np.isnan(taxas[('motor', 2)][1]))
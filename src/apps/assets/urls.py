@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import TelemetriaView
+
+app_name = 'assets'
+
+urlpatterns = [
+    # Leituras em lote dos controladores: POST /assets/telemetria/
+    path('telemetria/', TelemetriaView.as_view(), name='telemetria'),
+]
@@ -0,0 +1,32 @@
+import json
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from .services import ingerir_leituras
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class TelemetriaView(LoginRequiredMixin, View):
+    """
+    Recebe leituras de horímetro/arranques dos controladores em lote:
+    {"leituras": [{"motor": 1, "horas": 1520, "arranques": 310, "data": "..."},
+                  {"equipamento": 4, "horas": 880}]}
+    Só aceita JSON (um formulário de outro site não consegue enviar este corpo).
+    """
+    raise_exception = True  # API: 403 em vez de redirecionar para o login
+
+    def post(self, request, *args, **kwargs):
+        if request.content_type != 'application/json':
+            return JsonResponse({'erro': "Envie application/json."}, status=415)
+        try:
+            leituras = json.loads(request.body)['leituras']
+            if not isinstance(leituras, list):
+                raise TypeError
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'erro': "Corpo inválido: esperado {\"leituras\": [...]}."}, status=400)
+
+        return JsonResponse(ingerir_leituras(request.user.tenant_id, leituras))
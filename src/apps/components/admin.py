@@ -1,10 +1,13 @@
 from django import forms
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.db.models import Count
 from django.utils.html import format_html
 from django.urls import reverse
 from django.shortcuts import render
 from django.http import HttpResponseRedirect
 from src.apps.core.admin import TenantModelAdmin
+from .services import carregar_detalhes_preventivas, criar_planos_em_massa
 from .models import (
     GrupoComponente, 
     PosicaoComponente, 
@@ -34,13 +37,62 @@ class PreventivaMassaForm(forms.ModelForm):
             'intervalo_valor': 'Ex: 500 (se for Horas), 6 (se for Meses)'
         }
 
+# --- Filtro lateral: status calculado no banco (with_preventive_status) ---
+class SituacaoPreventivaFilter(admin.SimpleListFilter):
+    title = "Situação da Preventiva"
+    parameter_name = 'situacao'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('2', '🔴 Vencido'),
+            ('1', '🟡 Atenção'),
+            ('0', '🟢 Em dia'),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() in ('0', '1', '2'):
+            return queryset.with_preventive_status().filter(situacao_preventiva=int(self.value()))
+        return queryset
+
+# --- Filtros de FK sem N+1 (o __str__ de Motor/Grupo acessa outras tabelas) ---
+class RelacionadoComJoinFilter(admin.RelatedOnlyFieldListFilter):
+    """
+    Igual ao RelatedOnlyFieldListFilter (só mostra o que existe na lista do
+    tenant), mas carrega as opções com select_related: 1 query por filtro,
+    independente de quantos Motores/Grupos existam.
+    """
+    select_related = ()
+
+    def field_choices(self, field, request, model_admin):
+        pk_qs = (
+            model_admin.get_queryset(request)
+            .distinct()
+            .values_list(f"{self.field_path}__pk", flat=True)
+        )
+        opcoes = field.related_model._default_manager.filter(pk__in=pk_qs).select_related(*self.select_related)
+        return [(obj.pk, str(obj)) for obj in opcoes]
+
+
+class MotorFilter(RelacionadoComJoinFilter):
+    select_related = ('modelo__marca',)
+
+
+class GrupoFilter(RelacionadoComJoinFilter):
+    select_related = ('motor__modelo', 'equipamento')
+
 # --- 3. Configuração Base (Motor + Equipamento) ---
 class ComponenteBaseAdmin(TenantModelAdmin):
     # 'get_ativo_pai' substitui a coluna fixa de 'motor' para aceitar equipamentos
     list_display = ('nome', 'get_ativo_pai', 'horas_uso_atual', 'exibir_alertas_visual', 'acessar_dashboard')
     
     # Filtros para ambos os tipos de ativo
-    list_filter = ('motor', 'equipamento', 'grupo', 'peca_instalada__categoria') 
+    list_filter = (
+        SituacaoPreventivaFilter,
+        ('motor', MotorFilter),
+        ('equipamento', RelacionadoComJoinFilter),
+        ('grupo', GrupoFilter),
+        'peca_instalada__categoria',
+    )
     
     search_fields = ('nome', 'serial_number', 'motor__nome', 'equipamento__nome')
     
@@ -72,6 +124,18 @@ class ComponenteBaseAdmin(TenantModelAdmin):
         })
     )
 
+    # --- Changelist com nº fixo de queries ---
+    def get_queryset(self, request):
+        # Ativo pai e peça vêm no mesmo SELECT (get_ativo_pai, horas_uso_atual)
+        return super().get_queryset(request).select_related('motor', 'equipamento', 'peca_instalada')
+
+    def get_changelist_instance(self, request):
+        cl = super().get_changelist_instance(request)
+        # Status de todas as linhas da página em um único cálculo em lote
+        cl.result_list = list(cl.result_list)
+        carregar_detalhes_preventivas(cl.result_list)
+        return cl
+
     # --- Coluna Inteligente: Mostra Ícone do Pai ---
     def get_ativo_pai(self, obj):
         if obj.motor:
@@ -115,31 +179,30 @@ class ComponenteBaseAdmin(TenantModelAdmin):
             form = PreventivaMassaForm(request.POST)
             if form.is_valid():
                 tarefa = form.cleaned_data['tarefa']
-                tipo = form.cleaned_data['tipo_servico']
-                unidade = form.cleaned_data['unidade']
-                intervalo = form.cleaned_data['intervalo_valor']
-                
-                count = 0
-                for item in queryset:
-                    tenant_id = item.tenant_id if hasattr(item, 'tenant_id') else request.user.tenant_id
-                    PlanoPreventiva.objects.create(
-                        tenant_id=tenant_id, 
-                        posicao=item,
-                        tarefa=tarefa,
-                        tipo_servico=tipo,
-                        unidade=unidade,
-                        intervalo_valor=intervalo,
-                        ultima_execucao_valor=0 
-                    )
-                    count += 1
-                
-                self.message_user(request, f"Sucesso! Plano '{tarefa}' criado para {count} componentes.")
+                criados, ignorados = criar_planos_em_massa(
+                    queryset,
+                    tarefa=tarefa,
+                    tipo_servico=form.cleaned_data['tipo_servico'],
+                    unidade=form.cleaned_data['unidade'],
+                    intervalo_valor=form.cleaned_data['intervalo_valor'],
+                    tenant_id=request.user.tenant_id,
+                )
+                msg = f"Sucesso! Plano '{tarefa}' criado para {criados} componentes."
+                if ignorados:
+                    msg += f" {ignorados} já tinham esse plano e foram ignorados."
+                self.message_user(request, msg)
                 return HttpResponseRedirect(request.get_full_path())
         else:
             form = PreventivaMassaForm()
 
+        # Só contagens: a página não renderiza cada item selecionado.
+        # Os pks repassados são só os marcados na página (no máximo list_per_page);
+        # com "selecionar todos", select_across faz o admin reaplicar os filtros.
         return render(request, 'admin/components/adicionar_preventiva_massa.html', {
-            'itens': queryset,
+            'total': queryset.count(),
+            'por_grupo': queryset.order_by().values('grupo__nome').annotate(qtd=Count('pk')).order_by('-qtd'),
+            'select_across': request.POST.get('select_across') == '1',
+            'selecionados': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
             'form': form,
             'title': 'Definir Preventiva em Massa'
         })
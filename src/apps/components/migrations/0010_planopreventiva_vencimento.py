@@ -0,0 +1,151 @@
+# Generated by Django 5.2.10 on 2026-10-18 16:27
+
+import math
+from datetime import timedelta
+
+from django.db import migrations, models
+
+# Cópia congelada das regras de components.models.calcular_vencimento na data
+# desta migration: mudanças futuras no modelo não podem alterar o histórico.
+PCT_ATENCAO = 0.9
+DIAS_POR_MES = 30
+
+
+def calcular_vencimento(plano, posicao, horas_ativo, arranques_ativo):
+    campos = dict.fromkeys(
+        (
+            "contador_vencimento",
+            "contador_alerta",
+            "saldo_contador",
+            "saldo_alerta",
+            "data_vencimento",
+            "data_alerta",
+        )
+    )
+    intervalo = plano.intervalo_valor or 0
+
+    if plano.unidade in ("HORAS", "ARRANQUES"):
+        if plano.unidade == "HORAS":
+            instalacao, contador = posicao.hora_motor_instalacao, horas_ativo
+        else:
+            instalacao, contador = posicao.arranques_motor_instalacao, arranques_ativo
+
+        base = plano.ultima_execucao_valor
+        if base == 0 and instalacao:
+            base = instalacao
+
+        margem_atencao = math.ceil(intervalo * PCT_ATENCAO)
+        campos["contador_vencimento"] = base + intervalo
+        campos["contador_alerta"] = base + margem_atencao
+        if contador is not None:
+            campos["saldo_contador"] = min(base + intervalo - contador, intervalo)
+            campos["saldo_alerta"] = min(
+                base + margem_atencao - contador, margem_atencao
+            )
+
+    elif plano.unidade in ("DIAS", "MESES"):
+        base_data = plano.ultima_execucao_data or posicao.data_instalacao
+        if base_data:
+            limite = intervalo * DIAS_POR_MES if plano.unidade == "MESES" else intervalo
+            campos["data_vencimento"] = base_data + timedelta(days=limite)
+            campos["data_alerta"] = base_data + timedelta(
+                days=math.ceil(limite * PCT_ATENCAO)
+            )
+
+    return campos
+
+
+def preencher_vencimentos(apps, schema_editor):
+    PlanoPreventiva = apps.get_model("components", "PlanoPreventiva")
+    campos = (
+        "contador_vencimento",
+        "contador_alerta",
+        "saldo_contador",
+        "saldo_alerta",
+        "data_vencimento",
+        "data_alerta",
+    )
+    planos = PlanoPreventiva.objects.select_related(
+        "posicao__motor", "posicao__equipamento"
+    )
+    lote = []
+    for plano in planos.iterator(chunk_size=2000):
+        posicao = plano.posicao
+        ativo = posicao.motor or posicao.equipamento
+        horas = ativo.horas_totais if ativo else None
+        arranques = getattr(ativo, "total_arranques", 0) if ativo else None
+        for campo, valor in calcular_vencimento(
+            plano, posicao, horas, arranques
+        ).items():
+            setattr(plano, campo, valor)
+        lote.append(plano)
+        if len(lote) >= 2000:
+            PlanoPreventiva.objects.bulk_update(lote, campos)
+            lote = []
+    if lote:
+        PlanoPreventiva.objects.bulk_update(lote, campos)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("components", "0009_alter_grupocomponente_unique_together_and_more"),
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="planopreventiva",
+            name="contador_alerta",
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="planopreventiva",
+            name="contador_vencimento",
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="planopreventiva",
+            name="data_alerta",
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="planopreventiva",
+            name="data_vencimento",
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="planopreventiva",
+            name="saldo_alerta",
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="planopreventiva",
+            name="saldo_contador",
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="planopreventiva",
+            index=models.Index(
+                fields=["tenant", "saldo_contador"], name="plano_tenant_saldo_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="planopreventiva",
+            index=models.Index(
+                fields=["tenant", "saldo_alerta"], name="plano_tenant_saldo_alerta_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="planopreventiva",
+            index=models.Index(
+                fields=["tenant", "data_vencimento"], name="plano_tenant_vencimento_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="planopreventiva",
+            index=models.Index(
+                fields=["tenant", "data_alerta"], name="plano_tenant_data_alerta_idx"
+            ),
+        ),
+        migrations.RunPython(preencher_vencimentos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.10 on 2026-10-18 16:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("assets", "0016_alter_equipamento_options_and_more"),
+        ("components", "0010_planopreventiva_vencimento"),
+        ("core", "0001_initial"),
+        ("inventory", "0006_alter_catalogopeca_codigo_fabricante_fabricante_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="grupocomponente",
+            index=models.Index(fields=["tenant", "slug"], name="grupo_tenant_slug_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="posicaocomponente",
+            index=models.Index(
+                fields=["tenant", "grupo", "nome_base", "numero"],
+                name="posicao_tenant_grupo_idx",
+            ),
+        ),
+    ]
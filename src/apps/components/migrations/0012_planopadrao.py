@@ -0,0 +1,94 @@
+# Generated by Django 5.2.10 on 2026-10-18 16:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("assets", "0016_alter_equipamento_options_and_more"),
+        ("components", "0011_menus_indices"),
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlanoPadrao",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "nome_base",
+                    models.CharField(
+                        help_text="Nome base do item, sem o número. Ex: Pistão (vale para Pistão #1, #2...)",
+                        max_length=100,
+                        verbose_name="Item",
+                    ),
+                ),
+                (
+                    "tarefa",
+                    models.CharField(max_length=100, verbose_name="Nome da Tarefa"),
+                ),
+                (
+                    "tipo_servico",
+                    models.CharField(
+                        choices=[
+                            ("SUBSTITUICAO", "Substituição (Troca de Peça)"),
+                            ("INSTALACAO", "Instalação (Nova Peça)"),
+                            ("REGULAGEM", "Regulagem"),
+                            ("LUBRIFICACAO", "Lubrificação"),
+                            ("CALIBRACAO", "Calibração"),
+                            ("INSPECAO", "Inspeção / Rotina"),
+                            ("LIMPEZA", "Limpeza"),
+                        ],
+                        max_length=50,
+                        verbose_name="Gatilho de Reset",
+                    ),
+                ),
+                (
+                    "unidade",
+                    models.CharField(
+                        choices=[
+                            ("HORAS", "Horas de Operação"),
+                            ("ARRANQUES", "Arranques / Partidas"),
+                            ("DIAS", "Dias Corridos"),
+                            ("MESES", "Meses"),
+                        ],
+                        default="HORAS",
+                        max_length=20,
+                        verbose_name="Controlar por",
+                    ),
+                ),
+                (
+                    "intervalo_valor",
+                    models.PositiveIntegerField(verbose_name="Intervalo"),
+                ),
+                (
+                    "modelo",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="planos_padrao",
+                        to="assets.modelomotor",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="core.tenant"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Plano Padrão",
+                "verbose_name_plural": "Planos Padrão",
+                "ordering": ["nome_base", "id"],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.10 on 2026-10-18 16:37
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def remover_duplicados(apps, schema_editor):
+    # Mantém, de cada grupo duplicado, o plano executado mais recentemente
+    PlanoPreventiva = apps.get_model("components", "PlanoPreventiva")
+    posicao_atual, vistos = None, set()
+    duplicados = []
+    planos = PlanoPreventiva.objects.order_by(
+        "posicao_id",
+        F("ultima_execucao_data").desc(nulls_last=True),
+        "-ultima_execucao_valor",
+        "id",
+    ).values_list("id", "posicao_id", "tarefa", "tipo_servico", "unidade")
+    for pk, posicao_id, *chave in planos.iterator(chunk_size=2000):
+        if posicao_id != posicao_atual:
+            posicao_atual, vistos = posicao_id, set()
+        chave = tuple(chave)
+        if chave in vistos:
+            duplicados.append(pk)
+        else:
+            vistos.add(chave)
+    for i in range(0, len(duplicados), 500):
+        PlanoPreventiva.objects.filter(id__in=duplicados[i : i + 500]).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("components", "0012_planopadrao"),
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(remover_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="planopreventiva",
+            constraint=models.UniqueConstraint(
+                fields=("posicao", "tarefa", "tipo_servico", "unidade"),
+                name="plano_unico_por_posicao",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("assets", "0017_historico_contadores"),
+        ("components", "0013_plano_unico_por_posicao"),
+        ("core", "0001_initial"),
+        ("inventory", "0008_estoque_quantidade_nao_negativa"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="planopreventiva",
+            index=models.Index(
+                fields=["tenant", "posicao"], name="plano_tenant_posicao_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="posicaocomponente",
+            index=models.Index(
+                fields=["tenant", "motor"], name="posicao_tenant_motor_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="posicaocomponente",
+            index=models.Index(
+                fields=["tenant", "equipamento"], name="posicao_tenant_equip_idx"
+            ),
+        ),
+    ]
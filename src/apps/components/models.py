@@ -1,6 +1,14 @@
-from datetime import date
+import math
+from datetime import date, timedelta
+from types import SimpleNamespace
 from django.db import models
-from src.apps.core.models import TenantAwareModel
+from django.db.models import (
+    Case, Count, F, FloatField, Func, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, Least
+from django.db.models.lookups import GreaterThan, GreaterThanOrEqual, LessThan
+from django.utils import timezone
+from src.apps.core.models import TenantAwareModel, TenantManager
 from src.apps.inventory.models import CatalogoPeca
 from src.apps.assets.models import Motor, Equipamento  # Importamos o novo modelo Equipamento
 
@@ -23,6 +31,13 @@ UNIDADES_MEDIDA = [
     ('MESES', 'Meses'),
 ]
 
+UNIDADES_CONTADOR = ('HORAS', 'ARRANQUES')
+UNIDADES_TEMPO = ('DIAS', 'MESES')
+
+# Limiares usados em todo o cálculo de status (tabela, alertas, consultas SQL)
+PCT_ATENCAO = 0.9
+DIAS_POR_MES = 30
+
 # --- 1. O GRUPO (A Pasta Virtual) ---
 class GrupoComponente(TenantAwareModel):
     """
@@ -51,6 +66,9 @@ class GrupoComponente(TenantAwareModel):
         ordering = ['ordem', 'nome']
         # Removemos unique_together estrito pois agora um dos dois pode ser null
         # unique_together = ('motor', 'nome') 
+        indexes = [
+            models.Index(fields=['tenant', 'slug'], name='grupo_tenant_slug_idx'),
+        ]
 
     def __str__(self):
         if self.motor:
@@ -60,6 +78,105 @@ class GrupoComponente(TenantAwareModel):
         return self.nome
 
 # --- 2. O ITEM (Componente Físico) ---
+
+class DiasEntre(Func):
+    """Número inteiro de dias entre duas datas (data_final - data_inicial)."""
+    function = 'DATEDIFF'
+    output_field = IntegerField()
+
+    def __init__(self, data_final, data_inicial, **extra):
+        super().__init__(data_final, data_inicial, **extra)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        # date - date já retorna integer no PostgreSQL
+        return self.as_sql(compiler, connection, template='(%(expressions)s)', arg_joiner=' - ', **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='CAST(JULIANDAY(%(expressions)s) AS INTEGER)', arg_joiner=') - JULIANDAY(',
+            **extra_context,
+        )
+
+
+class PosicaoComponenteQuerySet(models.QuerySet):
+
+    def with_preventive_status(self, hoje=None):
+        """
+        Anota cada posição com o status das preventivas calculado NO BANCO:
+
+        - preventivas_vencidas / preventivas_atencao / preventivas_em_dia
+        - pior_progresso_pct (maior % de uso entre os planos; 100 se vencido)
+        - situacao_preventiva (2 = vencido, 1 = atenção, 0 = em dia)
+
+        Usa o horímetro/arranques atuais do Motor ou Equipamento e os mesmos
+        limiares de get_detalhes_preventivas (90% = atenção, MESES = 30 dias),
+        permitindo filtrar e ordenar por status sem trazer linhas ao Python.
+        """
+        hoje = hoje or date.today()
+        p = 'planos_preventiva__'
+
+        tem_ativo = Q(motor__isnull=False) | Q(equipamento__isnull=False)
+        eh_horas = Q(**{p + 'unidade': 'HORAS'})
+        eh_contador = Q(**{p + 'unidade__in': UNIDADES_CONTADOR})
+        eh_tempo = Q(**{p + 'unidade__in': UNIDADES_TEMPO})
+        intervalo = F(p + 'intervalo_valor')
+
+        # Contadores: Motor manda; Equipamento não tem arranques
+        horas_ativo = Coalesce('motor__horas_totais', 'equipamento__horas_totais')
+        arranques_ativo = Case(When(motor__isnull=False, then=F('motor__total_arranques')), default=Value(0))
+        contador = Case(When(eh_horas, then=horas_ativo), default=arranques_ativo, output_field=IntegerField())
+        instalacao = Case(
+            When(eh_horas, then=F('hora_motor_instalacao')), default=F('arranques_motor_instalacao'),
+            output_field=IntegerField(),
+        )
+        base = Case(
+            When(Q(**{p + 'ultima_execucao_valor': 0}), then=instalacao),
+            default=F(p + 'ultima_execucao_valor'), output_field=IntegerField(),
+        )
+        uso_contador = Greatest(contador - base, Value(0))
+
+        # Tempo: última execução -> instalação -> hoje
+        base_data = Coalesce(p + 'ultima_execucao_data', 'data_instalacao', Value(hoje))
+        dias = DiasEntre(Value(hoje), base_data)
+
+        limite = Case(
+            When(Q(**{p + 'unidade': 'MESES'}), then=intervalo * DIAS_POR_MES), default=intervalo,
+            output_field=IntegerField(),
+        )
+        uso = Case(
+            When(eh_contador, then=uso_contador),
+            When(eh_tempo, then=dias),
+            default=None, output_field=IntegerField(),
+        )
+
+        vencido = Q(tem_ativo, LessThan(limite - uso, 0))
+        atencao = Q(
+            tem_ativo, ~Q(LessThan(limite - uso, 0)),
+            GreaterThanOrEqual(Cast(uso, FloatField()), Cast(limite, FloatField()) * PCT_ATENCAO),
+        )
+        progresso = Case(
+            When(vencido, then=Value(100.0)),
+            When(Q(tem_ativo, GreaterThan(limite, 0)), then=Cast(uso, FloatField()) / Cast(limite, FloatField()) * 100),
+            When(Q(tem_ativo) & Q(**{p + 'id__isnull': False}), then=Value(0.0)),
+            default=None, output_field=FloatField(),
+        )
+
+        return self.annotate(
+            preventivas_vencidas=Coalesce(Sum(Case(When(vencido, then=1), default=0)), 0),
+            preventivas_atencao=Coalesce(Sum(Case(When(atencao, then=1), default=0)), 0),
+            preventivas_total=Count(p + 'id', filter=tem_ativo),
+            pior_progresso_pct=Max(progresso),
+        ).annotate(
+            preventivas_em_dia=F('preventivas_total') - F('preventivas_vencidas') - F('preventivas_atencao'),
+            situacao_preventiva=Case(
+                When(preventivas_vencidas__gt=0, then=Value(2)),
+                When(preventivas_atencao__gt=0, then=Value(1)),
+                default=Value(0),
+            ),
+        )
+
+
 class PosicaoComponente(TenantAwareModel):
     # --- Vínculos (Um dos dois deve ser preenchido) ---
     motor = models.ForeignKey(
@@ -101,10 +218,19 @@ class PosicaoComponente(TenantAwareModel):
     ultima_medicao_vibracao = models.DateField(null=True, blank=True)
     ultimo_engraxamento = models.DateField(null=True, blank=True)
 
+    objects = TenantManager.from_queryset(PosicaoComponenteQuerySet)()
+
     class Meta:
         ordering = ['grupo__ordem', 'nome_base', 'numero'] 
         verbose_name = "Componente"
         verbose_name_plural = "Todos os Componentes"
+        indexes = [
+            # Caminho dos menus: grupo (tenant, slug) -> itens já na ordem de exibição
+            models.Index(fields=['tenant', 'grupo', 'nome_base', 'numero'], name='posicao_tenant_grupo_idx'),
+            # Árvore de um ativo (detalhe do Motor/Equipamento, provisionamento, saldos)
+            models.Index(fields=['tenant', 'motor'], name='posicao_tenant_motor_idx'),
+            models.Index(fields=['tenant', 'equipamento'], name='posicao_tenant_equip_idx'),
+        ]
 
     def __str__(self):
         ativo = self.ativo_pai
@@ -140,149 +266,199 @@ class PosicaoComponente(TenantAwareModel):
                 alertas.append(f"PRÓXIMO: {d['tarefa']}")
         return alertas
 
+    def recalcular_vencimentos(self):
+        """Recalcula o vencimento de todos os planos desta posição."""
+        self.planos_preventiva.all().recalcular_vencimentos()
+
     # --- MÉTODO PRINCIPAL PARA O DASHBOARD (TABELA DINÂMICA) ---
     def get_detalhes_preventivas(self):
         """
         Retorna uma lista detalhada de todos os planos, calculando
         com base no horímetro/arranques do ativo pai (Motor ou Equipamento).
+
+        O cálculo fica no motor em lote (components.services). Se a posição já
+        foi carregada por carregar_detalhes_preventivas (ex: changelist do
+        admin), reaproveita o resultado sem nenhuma query.
         """
-        lista_status = []
-        
-        ativo = self.ativo_pai
-        
-        # Se não tiver pai, não há como calcular horas
-        if not ativo:
-            return []
-
-        horas_ativo = ativo.horas_totais
-        # Equipamentos podem não ter arranques, usamos getattr para segurança
-        arranques_ativo = getattr(ativo, 'total_arranques', 0)
-        
-        hoje = date.today()
-
-        for plano in self.planos_preventiva.all():
-            dados = {
-                'id_plano': plano.id,
-                'tarefa': plano.tarefa,
-                'tipo': plano.get_tipo_servico_display(),
-                'frequencia': f"{plano.intervalo_valor} {plano.get_unidade_display()}",
-                
-                # Dados da Última Execução
-                'ultima_data': plano.ultima_execucao_data,
-                'ultimo_valor': plano.ultima_execucao_valor, 
-                
-                # Cálculos (Padrão)
-                'rodado': '-',
-                'restante': '-',
-                'status': 'EM DIA',
-                'cor': 'success', # Verde
-                'progresso_pct': 0,
-            }
-
-            vencido = False
-            atencao = False
-
-            # --- 1. Lógica para HORAS ---
-            if plano.unidade == 'HORAS':
-                base = plano.ultima_execucao_valor
-                if base == 0 and self.hora_motor_instalacao:
-                    base = self.hora_motor_instalacao
-                
-                uso = horas_ativo - base
-                if uso < 0: uso = 0
-                
-                falta = plano.intervalo_valor - uso
-                dados['rodado'] = f"{uso} h"
-                
-                # Lógica de Vencimento
-                if falta < 0:
-                    vencido = True
-                    dados['restante'] = f"Vencido há {abs(falta)} h"
-                else:
-                    dados['restante'] = f"{falta} h"
-                
-                if plano.intervalo_valor > 0:
-                    dados['progresso_pct'] = (uso / plano.intervalo_valor) * 100
-                
-                if not vencido and uso >= (plano.intervalo_valor * 0.9): 
-                    atencao = True
-
-            # --- 2. Lógica para ARRANQUES ---
-            elif plano.unidade == 'ARRANQUES':
-                base = plano.ultima_execucao_valor
-                if base == 0 and self.arranques_motor_instalacao:
-                    base = self.arranques_motor_instalacao
-                
-                uso = arranques_ativo - base
-                if uso < 0: uso = 0
-                
-                falta = plano.intervalo_valor - uso
-                dados['rodado'] = f"{uso} part."
-                
-                if falta < 0:
-                    vencido = True
-                    dados['restante'] = f"Vencido há {abs(falta)} part."
-                else:
-                    dados['restante'] = f"{falta} part."
-                
-                if plano.intervalo_valor > 0:
-                    dados['progresso_pct'] = (uso / plano.intervalo_valor) * 100
-
-                if not vencido and uso >= (plano.intervalo_valor * 0.9): 
-                    atencao = True
-
-            # --- 3. Lógica para TEMPO (DIAS/MESES) ---
-            elif plano.unidade in ['DIAS', 'MESES']:
-                base_data = plano.ultima_execucao_data
-                if not base_data:
-                    base_data = self.data_instalacao or hoje
-                
-                dias_passados = (hoje - base_data).days
-                
-                limite_dias = plano.intervalo_valor
-                if plano.unidade == 'MESES':
-                    limite_dias = plano.intervalo_valor * 30
-                
-                falta_dias = limite_dias - dias_passados
-                
-                # Exibição Amigável de Rodado
-                if dias_passados > 30:
-                    dados['rodado'] = f"{dias_passados // 30} meses"
-                else:
-                    dados['rodado'] = f"{dias_passados} dias"
-                
-                # Lógica de Vencimento
-                if falta_dias < 0:
-                    vencido = True
-                    dias_vencidos = abs(falta_dias)
-                    if dias_vencidos > 30:
-                        dados['restante'] = f"Vencido há {dias_vencidos // 30} meses"
-                    else:
-                        dados['restante'] = f"Vencido há {dias_vencidos} dias"
-                else:
-                    dados['restante'] = f"{falta_dias} dias"
-                
-                if limite_dias > 0:
-                    dados['progresso_pct'] = (dias_passados / limite_dias) * 100
-
-                if not vencido and dias_passados >= (limite_dias * 0.9): 
-                    atencao = True
-
-            # Ajuste Final de Status e Cores
-            if vencido:
-                dados['status'] = 'VENCIDO'
-                dados['cor'] = 'danger' # Vermelho
-                dados['progresso_pct'] = 100 
-                
-            elif atencao:
-                dados['status'] = 'ATENÇÃO'
-                dados['cor'] = 'warning' # Amarelo
-
-            lista_status.append(dados)
-
-        return lista_status
-
-# --- 3. PLANOS DE PREVENTIVA (Mantém Igual) ---
+        if hasattr(self, '_detalhes_preventivas'):
+            return self._detalhes_preventivas
+
+        from .services import calcular_detalhes_preventivas
+        return calcular_detalhes_preventivas([self])[self.pk]
+
+# --- 3. PLANOS DE PREVENTIVA ---
+
+def calcular_vencimento(plano, posicao, horas_ativo=None, arranques_ativo=None):
+    """
+    Calcula as colunas materializadas de vencimento de um plano.
+
+    HORAS/ARRANQUES: contador em que vence / entra em atenção e o saldo
+    restante em relação ao contador atual do ativo (None se não há ativo).
+    DIAS/MESES: data em que vence / entra em atenção.
+
+    Segue exatamente as regras de get_detalhes_preventivas. A migration
+    0010 tem uma cópia congelada: ao mudar as regras aqui, não mexa nela.
+    """
+    campos = dict.fromkeys((
+        'contador_vencimento', 'contador_alerta', 'saldo_contador', 'saldo_alerta',
+        'data_vencimento', 'data_alerta',
+    ))
+    intervalo = plano.intervalo_valor or 0
+
+    if plano.unidade in UNIDADES_CONTADOR:
+        if plano.unidade == 'HORAS':
+            instalacao, contador = posicao.hora_motor_instalacao, horas_ativo
+        else:
+            instalacao, contador = posicao.arranques_motor_instalacao, arranques_ativo
+
+        base = plano.ultima_execucao_valor
+        if base == 0 and instalacao:
+            base = instalacao
+
+        margem_atencao = math.ceil(intervalo * PCT_ATENCAO)
+        campos['contador_vencimento'] = base + intervalo
+        campos['contador_alerta'] = base + margem_atencao
+        if contador is not None:
+            # O uso nunca é negativo, por isso o saldo é limitado ao intervalo
+            campos['saldo_contador'] = min(base + intervalo - contador, intervalo)
+            campos['saldo_alerta'] = min(base + margem_atencao - contador, margem_atencao)
+
+    elif plano.unidade in UNIDADES_TEMPO:
+        base_data = plano.ultima_execucao_data or posicao.data_instalacao
+        if base_data:
+            limite = intervalo * DIAS_POR_MES if plano.unidade == 'MESES' else intervalo
+            campos['data_vencimento'] = base_data + timedelta(days=limite)
+            campos['data_alerta'] = base_data + timedelta(days=math.ceil(limite * PCT_ATENCAO))
+
+    return campos
+
+
+def plano_vencido(saldo_contador, data_vencimento, hoje):
+    """
+    Regra única de "vencido" sobre as colunas materializadas: saldo negativo
+    ou data de vencimento já passada (vencer hoje ainda não é vencido).
+    PlanoPreventivaQuerySet.vencidos aplica a mesma regra em SQL.
+    """
+    return (saldo_contador is not None and saldo_contador < 0) or (
+        data_vencimento is not None and data_vencimento < hoje
+    )
+
+
+class PlanoPreventivaQuerySet(models.QuerySet):
+    """
+    Consultas de vencimento 100% em SQL, sobre as colunas materializadas
+    (saldo_* para contadores, data_* para tempo). Cada ramo é um range scan
+    em um índice (tenant, coluna).
+    """
+
+    def vencidos(self, hoje=None):
+        # Mesma regra de plano_vencido
+        hoje = hoje or timezone.localdate()
+        return self.filter(Q(saldo_contador__lt=0) | Q(data_vencimento__lt=hoje))
+
+    def em_atencao(self, hoje=None):
+        hoje = hoje or timezone.localdate()
+        return self.filter(
+            Q(saldo_contador__gte=0, saldo_alerta__lte=0)
+            | Q(data_vencimento__gte=hoje, data_alerta__lte=hoje)
+        )
+
+    def vencendo_ate(self, limite, unidade='HORAS'):
+        """
+        limite = data  -> planos por tempo que vencem até essa data.
+        limite = int   -> planos por contador (HORAS ou ARRANQUES) com saldo <= limite.
+        Planos já vencidos também entram.
+        """
+        if isinstance(limite, int):
+            return self.filter(unidade=unidade, saldo_contador__lte=limite)
+        return self.filter(data_vencimento__lte=limite)
+
+    def recalcular_saldos(self, horas, arranques=0):
+        """
+        Atualiza o saldo dos planos por contador após mudança do horímetro /
+        arranques do ativo. Um UPDATE por unidade, sem carregar nada em memória.
+        """
+        atualizados = 0
+        for unidade, contador in (('HORAS', horas), ('ARRANQUES', arranques)):
+            atualizados += self.filter(unidade=unidade, contador_vencimento__isnull=False).update(
+                saldo_contador=Least(F('contador_vencimento') - contador, F('intervalo_valor')),
+                saldo_alerta=Least(
+                    F('contador_alerta') - contador,
+                    F('contador_alerta') - F('contador_vencimento') + F('intervalo_valor'),
+                ),
+            )
+        return atualizados
+
+    def recalcular_saldos_pelos_ativos(self):
+        """
+        Como recalcular_saldos, mas cada plano usa o contador atual do seu
+        próprio ativo (subquery no Motor/Equipamento, mesma regra de ativo_pai).
+        Serve para muitos ativos de uma vez: um UPDATE por unidade, qualquer
+        que seja o nº de ativos.
+        """
+        do_motor = Motor.objects.filter(componentes=OuterRef('posicao_id'))
+        do_equipamento = Equipamento.objects.filter(componentes=OuterRef('posicao_id'))
+        contadores = {
+            'HORAS': Coalesce(
+                Subquery(do_motor.values('horas_totais')[:1]),
+                Subquery(do_equipamento.values('horas_totais')[:1]),
+            ),
+            # Equipamento não tem arranques: conta como 0 (ver recalcular_vencimentos)
+            'ARRANQUES': Coalesce(Subquery(do_motor.values('total_arranques')[:1]), 0),
+        }
+        atualizados = 0
+        for unidade, contador in contadores.items():
+            atualizados += self.filter(
+                Q(posicao__motor__isnull=False) | Q(posicao__equipamento__isnull=False),
+                unidade=unidade, contador_vencimento__isnull=False,
+            ).update(
+                saldo_contador=Least(F('contador_vencimento') - contador, F('intervalo_valor')),
+                saldo_alerta=Least(
+                    F('contador_alerta') - contador,
+                    F('contador_alerta') - F('contador_vencimento') + F('intervalo_valor'),
+                ),
+            )
+        return atualizados
+
+    def recalcular_vencimentos(self):
+        """
+        Recalcula as colunas de vencimento (calcular_vencimento) dos planos do
+        QuerySet. Lê tudo em um SELECT e grava um UPDATE por resultado distinto:
+        planos iguais em itens iguais (ex.: todas as velas trocadas juntas)
+        caem no mesmo UPDATE, sem o CASE por linha do bulk_update.
+        """
+        linhas = self.order_by().values_list(
+            'pk', 'unidade', 'intervalo_valor', 'ultima_execucao_valor', 'ultima_execucao_data',
+            'posicao__hora_motor_instalacao', 'posicao__arranques_motor_instalacao', 'posicao__data_instalacao',
+            'posicao__motor_id', 'posicao__motor__horas_totais', 'posicao__motor__total_arranques',
+            'posicao__equipamento_id', 'posicao__equipamento__horas_totais',
+        )
+        grupos = {}
+        for (pk, unidade, intervalo, ult_valor, ult_data, hora_inst, arr_inst, data_inst,
+             motor_id, m_horas, m_arr, eqp_id, e_horas) in linhas:
+            plano = SimpleNamespace(
+                unidade=unidade, intervalo_valor=intervalo,
+                ultima_execucao_valor=ult_valor, ultima_execucao_data=ult_data,
+            )
+            posicao = SimpleNamespace(
+                hora_motor_instalacao=hora_inst, arranques_motor_instalacao=arr_inst, data_instalacao=data_inst,
+            )
+            # Mesma regra de ativo_pai / atualizar_vencimento
+            if motor_id:
+                horas, arranques = m_horas, m_arr
+            elif eqp_id:
+                horas, arranques = e_horas, 0
+            else:
+                horas = arranques = None
+            campos = calcular_vencimento(plano, posicao, horas, arranques)
+            grupos.setdefault(tuple(campos.items()), []).append(pk)
+
+        modelo = self.model
+        for campos, pks in grupos.items():
+            modelo.objects.filter(pk__in=pks).update(**dict(campos))
+        return sum(len(pks) for pks in grupos.values())
+
+
 class PlanoPreventiva(TenantAwareModel):
     posicao = models.ForeignKey(
         PosicaoComponente, 
@@ -322,49 +498,160 @@ class PlanoPreventiva(TenantAwareModel):
         verbose_name="Data Última Execução"
     )
 
+    # --- Vencimento materializado (mantido por calcular_vencimento) ---
+    contador_vencimento = models.IntegerField(null=True, blank=True, editable=False)
+    contador_alerta = models.IntegerField(null=True, blank=True, editable=False)
+    saldo_contador = models.IntegerField(null=True, blank=True, editable=False)
+    saldo_alerta = models.IntegerField(null=True, blank=True, editable=False)
+    data_vencimento = models.DateField(null=True, blank=True, editable=False)
+    data_alerta = models.DateField(null=True, blank=True, editable=False)
+
+    CAMPOS_VENCIMENTO = (
+        'contador_vencimento', 'contador_alerta', 'saldo_contador', 'saldo_alerta',
+        'data_vencimento', 'data_alerta',
+    )
+
+    objects = TenantManager.from_queryset(PlanoPreventivaQuerySet)()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'saldo_contador'], name='plano_tenant_saldo_idx'),
+            models.Index(fields=['tenant', 'saldo_alerta'], name='plano_tenant_saldo_alerta_idx'),
+            models.Index(fields=['tenant', 'data_vencimento'], name='plano_tenant_vencimento_idx'),
+            models.Index(fields=['tenant', 'data_alerta'], name='plano_tenant_data_alerta_idx'),
+            # Planos de um conjunto de posições (motor de cálculo, reset na intervenção)
+            models.Index(fields=['tenant', 'posicao'], name='plano_tenant_posicao_idx'),
+        ]
+        constraints = [
+            # Evita o mesmo plano duas vezes no item (ex.: preventiva em massa repetida)
+            models.UniqueConstraint(
+                fields=['posicao', 'tarefa', 'tipo_servico', 'unidade'],
+                name='plano_unico_por_posicao',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.tarefa} (A cada {self.intervalo_valor} {self.get_unidade_display()})"
 
+    def atualizar_vencimento(self, posicao=None):
+        """Recalcula as colunas de vencimento (não salva)."""
+        posicao = posicao or self.posicao
+        ativo = posicao.ativo_pai
+        horas = ativo.horas_totais if ativo else None
+        arranques = getattr(ativo, 'total_arranques', 0) if ativo else None
+        for campo, valor in calcular_vencimento(self, posicao, horas, arranques).items():
+            setattr(self, campo, valor)
+
+    def save(self, *args, **kwargs):
+        self.atualizar_vencimento()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(self.CAMPOS_VENCIMENTO)
+        super().save(*args, **kwargs)
+
+
+class PlanoPadrao(TenantAwareModel):
+    """
+    Preventiva padrão de um Modelo de Motor. Ao criar um motor desse modelo,
+    cada item cujo nome_base coincide recebe uma cópia do plano
+    (ver components.services.provisionar_estrutura).
+    """
+    modelo = models.ForeignKey(
+        'assets.ModeloMotor',
+        related_name='planos_padrao',
+        on_delete=models.CASCADE
+    )
+    nome_base = models.CharField(
+        max_length=100,
+        verbose_name="Item",
+        help_text="Nome base do item, sem o número. Ex: Pistão (vale para Pistão #1, #2...)"
+    )
+    tarefa = models.CharField(max_length=100, verbose_name="Nome da Tarefa")
+    tipo_servico = models.CharField(max_length=50, choices=TIPOS_SERVICO_OPCOES, verbose_name="Gatilho de Reset")
+    unidade = models.CharField(max_length=20, choices=UNIDADES_MEDIDA, default='HORAS', verbose_name="Controlar por")
+    intervalo_valor = models.PositiveIntegerField(verbose_name="Intervalo")
+
+    class Meta:
+        verbose_name = "Plano Padrão"
+        verbose_name_plural = "Planos Padrão"
+        ordering = ['nome_base', 'id']
+
+    def __str__(self):
+        return f"{self.nome_base}: {self.tarefa} (A cada {self.intervalo_valor} {self.get_unidade_display()})"
+
 # --- 4. OS MENUS (Proxies - Filtros Visuais) ---
 
+# Slugs criados por criar_estrutura_inicial_motor. O que não for nenhum deles
+# (grupos personalizados ou itens sem grupo) cai em "Outros".
+SLUGS_MENU = ('oleo', 'filtros', 'perifericos', 'ignicao', 'cilindros', 'cabecotes')
+
+
+class MenuManager(TenantManager.from_queryset(PosicaoComponenteQuerySet)):
+    """Cada menu enxerga apenas os itens do seu grupo (slug)."""
+
+    def __init__(self, grupo_slug=None):
+        super().__init__()
+        self.grupo_slug = grupo_slug
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.grupo_slug:
+            return qs.filter(grupo__slug=self.grupo_slug)
+        return qs.exclude(grupo__slug__in=SLUGS_MENU)
+
+
 class MenuOleo(PosicaoComponente):
+    objects = MenuManager('oleo')
+
     class Meta:
         proxy = True
         verbose_name = "Item de Óleo"
         verbose_name_plural = "1. Sistema de Óleo"
 
 class MenuFiltros(PosicaoComponente):
+    objects = MenuManager('filtros')
+
     class Meta:
         proxy = True
         verbose_name = "Item de Filtro"
         verbose_name_plural = "2. Filtros (Ar/Gás)"
 
 class MenuPerifericos(PosicaoComponente):
+    objects = MenuManager('perifericos')
+
     class Meta:
         proxy = True
         verbose_name = "Periférico"
         verbose_name_plural = "3. Periféricos"
 
 class MenuIgnicao(PosicaoComponente):
+    objects = MenuManager('ignicao')
+
     class Meta:
         proxy = True
         verbose_name = "Item de Ignição"
         verbose_name_plural = "4. Ignição / Elétrica"
 
 class MenuCilindros(PosicaoComponente):
+    objects = MenuManager('cilindros')
+
     class Meta:
         proxy = True
         verbose_name = "Item de Cilindro"
         verbose_name_plural = "5. Cilindros (Power Pack)"
 
 class MenuCabecotes(PosicaoComponente):
+    objects = MenuManager('cabecotes')
+
     class Meta:
         proxy = True
         verbose_name = "Item de Cabeçote"
         verbose_name_plural = "6. Cabeçotes"
 
 class MenuOutros(PosicaoComponente):
+    objects = MenuManager()
+
     class Meta:
         proxy = True
         verbose_name = "Outro Item"
-        verbose_name_plural = "7. Outros / Personalizados"
\ No newline at end of file
+        verbose_name_plural = "7. Outros / Personalizados"
@@ -0,0 +1,656 @@
+import heapq
+from datetime import date, timedelta
+from functools import partial
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Exists, OuterRef, QuerySet
+from django.utils import timezone
+
+from src.apps.core.cache import cache_blueprints, cache_preventivas
+
+from .models import (
+    GrupoComponente,
+    PosicaoComponente,
+    PlanoPreventiva,
+    PlanoPadrao,
+    TIPOS_SERVICO_OPCOES,
+    UNIDADES_MEDIDA,
+    PCT_ATENCAO,
+    DIAS_POR_MES,
+    UNIDADES_CONTADOR,
+    UNIDADES_TEMPO,
+    calcular_vencimento,
+    plano_vencido,
+)
+
+# --- MOTOR DE CÁLCULO DAS PREVENTIVAS (EM LOTE) ---
+#
+# Em vez de percorrer plano a plano (um SELECT por componente + lazy load do
+# ativo pai), carregamos tudo em poucas queries, montamos colunas NumPy e
+# calculamos uso/falta/status/progresso de TODOS os planos de uma vez.
+# O formato de saída é o mesmo de PosicaoComponente.get_detalhes_preventivas.
+
+UNIDADE_CODIGO = {'HORAS': 0, 'ARRANQUES': 1, 'DIAS': 2, 'MESES': 3}
+SUFIXO_CONTADOR = {0: 'h', 1: 'part.'}
+
+_TIPOS_DISPLAY = dict(TIPOS_SERVICO_OPCOES)
+_UNIDADES_DISPLAY = dict(UNIDADES_MEDIDA)
+
+_CAMPOS_PLANO = (
+    'id', 'posicao_id', 'tarefa', 'tipo_servico', 'unidade',
+    'intervalo_valor', 'ultima_execucao_valor', 'ultima_execucao_data',
+)
+
+
+def _ordinal(d):
+    return d.toordinal() if d else 0
+
+
+def _colunas_de_queryset(qs):
+    """Uma única query (com JOIN nos ativos) para as colunas das posições."""
+    linhas = qs.values_list(
+        'id', 'hora_motor_instalacao', 'arranques_motor_instalacao', 'data_instalacao',
+        'motor_id', 'equipamento_id',
+        'motor__horas_totais', 'motor__total_arranques', 'equipamento__horas_totais',
+    ).order_by()
+
+    colunas = []
+    for pid, hora_inst, arr_inst, data_inst, motor_id, eqp_id, m_horas, m_arr, e_horas in linhas:
+        if motor_id:
+            ativo = (True, m_horas, m_arr)
+        elif eqp_id:
+            ativo = (True, e_horas, 0)
+        else:
+            ativo = (False, 0, 0)
+        colunas.append((pid, hora_inst, arr_inst, _ordinal(data_inst)) + ativo)
+    return colunas
+
+
+def _colunas_de_instancias(posicoes):
+    """
+    Lê as colunas direto das instâncias. Ativos que não vieram por
+    select_related são buscados em uma query por tipo (nunca um por linha).
+    """
+    from src.apps.assets.models import Motor, Equipamento
+
+    campo_motor = PosicaoComponente._meta.get_field('motor')
+    campo_eqp = PosicaoComponente._meta.get_field('equipamento')
+
+    motores_faltando = {
+        p.motor_id for p in posicoes if p.motor_id and not campo_motor.is_cached(p)
+    }
+    eqps_faltando = {
+        p.equipamento_id for p in posicoes
+        if not p.motor_id and p.equipamento_id and not campo_eqp.is_cached(p)
+    }
+    motores = {
+        mid: (horas, arr) for mid, horas, arr in
+        Motor.objects.filter(id__in=motores_faltando).values_list('id', 'horas_totais', 'total_arranques')
+    } if motores_faltando else {}
+    eqps = {
+        eid: (horas, 0) for eid, horas in
+        Equipamento.objects.filter(id__in=eqps_faltando).values_list('id', 'horas_totais')
+    } if eqps_faltando else {}
+
+    colunas = []
+    for p in posicoes:
+        if p.motor_id:
+            if p.motor_id in motores:
+                horas, arr = motores[p.motor_id]
+            else:
+                horas, arr = p.motor.horas_totais, p.motor.total_arranques
+            ativo = (True, horas, arr)
+        elif p.equipamento_id:
+            if p.equipamento_id in eqps:
+                horas, arr = eqps[p.equipamento_id]
+            else:
+                horas, arr = p.equipamento.horas_totais, 0
+            ativo = (True, horas, arr)
+        else:
+            ativo = (False, 0, 0)
+        colunas.append(
+            (p.pk, p.hora_motor_instalacao, p.arranques_motor_instalacao, _ordinal(p.data_instalacao)) + ativo
+        )
+    return colunas
+
+
+def _planos_de_instancias(posicoes):
+    """Usa o prefetch de 'planos_preventiva' quando TODAS as posições o têm."""
+    if posicoes and all(
+        'planos_preventiva' in getattr(p, '_prefetched_objects_cache', {}) for p in posicoes
+    ):
+        return [
+            tuple(getattr(plano, campo) for campo in _CAMPOS_PLANO)
+            for p in posicoes for plano in p.planos_preventiva.all()
+        ]
+    return list(
+        PlanoPreventiva.objects
+        .filter(posicao_id__in=[p.pk for p in posicoes])
+        .order_by('posicao_id', 'id')
+        .values_list(*_CAMPOS_PLANO)
+    )
+
+
+def _calcular(colunas_posicoes, planos, hoje):
+    resultado = {c[0]: [] for c in colunas_posicoes if c[4]}
+    if not planos or not resultado:
+        return resultado
+
+    indice = {c[0]: i for i, c in enumerate(colunas_posicoes)}
+    planos = [pl for pl in planos if pl[1] in resultado]
+    if not planos:
+        return resultado
+
+    # --- Colunas por posição ---
+    _, hora_inst, arr_inst, data_inst, _, horas_ativo, arr_ativo = (
+        np.array(col, dtype=np.int64) for col in zip(*colunas_posicoes)
+    )
+
+    # --- Colunas por plano ---
+    pos = np.fromiter((indice[pl[1]] for pl in planos), dtype=np.int64, count=len(planos))
+    unidade = np.fromiter((UNIDADE_CODIGO.get(pl[4], -1) for pl in planos), dtype=np.int64, count=len(planos))
+    intervalo = np.fromiter((pl[5] for pl in planos), dtype=np.int64, count=len(planos))
+    ult_valor = np.fromiter((pl[6] for pl in planos), dtype=np.int64, count=len(planos))
+    ult_data = np.fromiter((_ordinal(pl[7]) for pl in planos), dtype=np.int64, count=len(planos))
+
+    eh_horas = unidade == 0
+    eh_contador = eh_horas | (unidade == 1)
+    eh_tempo = (unidade == 2) | (unidade == 3)
+
+    # 1. HORAS / ARRANQUES: base = último contador (ou snapshot da instalação)
+    inst = np.where(eh_horas, hora_inst[pos], arr_inst[pos])
+    base = np.where((ult_valor == 0) & (inst != 0), inst, ult_valor)
+    contador = np.where(eh_horas, horas_ativo[pos], arr_ativo[pos])
+    uso_contador = np.maximum(contador - base, 0)
+
+    # 2. DIAS / MESES: base = última execução, instalação ou hoje
+    hoje_ord = hoje.toordinal()
+    data_pos = data_inst[pos]
+    base_data = np.where(ult_data > 0, ult_data, np.where(data_pos > 0, data_pos, hoje_ord))
+    dias = hoje_ord - base_data
+
+    limite = np.where(unidade == 3, intervalo * DIAS_POR_MES, intervalo)
+    uso = np.where(eh_contador, uso_contador, dias)
+    falta = limite - uso
+
+    conhecido = eh_contador | eh_tempo
+    vencido = conhecido & (falta < 0)
+    atencao = conhecido & ~vencido & (uso >= limite * PCT_ATENCAO)
+    com_limite = conhecido & (limite > 0)
+    pct = np.where(com_limite, uso / np.where(limite > 0, limite, 1) * 100, 0.0)
+
+    # --- Montagem dos dicionários (mesmo formato da versão por linha) ---
+    for i, pl in enumerate(planos):
+        cod = int(unidade[i])
+        dados = {
+            'id_plano': pl[0],
+            'tarefa': pl[2],
+            'tipo': _TIPOS_DISPLAY.get(pl[3], pl[3]),
+            'frequencia': f"{pl[5]} {_UNIDADES_DISPLAY.get(pl[4], pl[4])}",
+            'ultima_data': pl[7],
+            'ultimo_valor': pl[6],
+            'rodado': '-',
+            'restante': '-',
+            'status': 'EM DIA',
+            'cor': 'success',
+            'progresso_pct': float(pct[i]) if com_limite[i] else 0,
+        }
+
+        if cod in SUFIXO_CONTADOR:
+            sufixo = SUFIXO_CONTADOR[cod]
+            u, f = int(uso[i]), int(falta[i])
+            dados['rodado'] = f"{u} {sufixo}"
+            dados['restante'] = f"Vencido há {abs(f)} {sufixo}" if f < 0 else f"{f} {sufixo}"
+        elif cod >= 0:
+            d, f = int(dias[i]), int(falta[i])
+            dados['rodado'] = f"{d // DIAS_POR_MES} meses" if d > DIAS_POR_MES else f"{d} dias"
+            if f < 0:
+                dv = abs(f)
+                dados['restante'] = (
+                    f"Vencido há {dv // DIAS_POR_MES} meses" if dv > DIAS_POR_MES else f"Vencido há {dv} dias"
+                )
+            else:
+                dados['restante'] = f"{f} dias"
+
+        if vencido[i]:
+            dados['status'] = 'VENCIDO'
+            dados['cor'] = 'danger'
+            dados['progresso_pct'] = 100
+        elif atencao[i]:
+            dados['status'] = 'ATENÇÃO'
+            dados['cor'] = 'warning'
+
+        resultado[pl[1]].append(dados)
+
+    return resultado
+
+
+def calcular_detalhes_preventivas(posicoes, hoje=None):
+    """
+    Calcula os detalhes de preventiva de várias posições de uma vez.
+
+    Aceita um QuerySet de PosicaoComponente (2 queries no total, qualquer que
+    seja o tamanho) ou uma lista de instâncias já carregadas (aproveita
+    select_related/prefetch_related quando existirem). As instâncias passam
+    por cache_preventivas: só as posições sem cache são calculadas.
+
+    Retorna {posicao_id: [dados, ...]}. Posições sem ativo pai retornam [].
+    """
+    hoje = hoje or date.today()
+
+    if not isinstance(posicoes, QuerySet):
+        por_tenant = {}
+        for p in posicoes:
+            por_tenant.setdefault(p.tenant_id, {})[p.pk] = p
+        resultado = {}
+        for tenant_id, por_id in por_tenant.items():
+            resultado.update(cache_preventivas.obter_muitos(
+                tenant_id, 'detalhes', por_id,
+                lambda ids: _calcular_instancias([por_id[i] for i in ids], hoje),
+                extra=(hoje.isoformat(),),
+            ))
+        return resultado
+
+    colunas = _colunas_de_queryset(posicoes)
+    planos = list(
+        PlanoPreventiva.objects
+        .filter(posicao__in=posicoes.order_by().values('pk'))
+        .order_by('posicao_id', 'id')
+        .values_list(*_CAMPOS_PLANO)
+    )
+    resultado = _calcular(colunas, planos, hoje)
+    for c in colunas:
+        resultado.setdefault(c[0], [])
+    return resultado
+
+
+def _calcular_instancias(posicoes, hoje):
+    colunas = _colunas_de_instancias(posicoes)
+    planos = _planos_de_instancias(posicoes)
+    resultado = _calcular(colunas, planos, hoje)
+    for c in colunas:
+        resultado.setdefault(c[0], [])
+    return resultado
+
+
+def carregar_detalhes_preventivas(posicoes, hoje=None):
+    """
+    Calcula em lote e guarda o resultado em cada instância, para que
+    get_detalhes_preventivas / status_preventivas não façam novas queries.
+    """
+    posicoes = list(posicoes)
+    resultado = calcular_detalhes_preventivas(posicoes, hoje=hoje)
+    for p in posicoes:
+        p._detalhes_preventivas = resultado.get(p.pk, [])
+    return resultado
+
+
+def detalhes_preventivas_tenant(tenant, hoje=None):
+    """Todas as posições (Motores e Equipamentos) de uma empresa."""
+    return calcular_detalhes_preventivas(
+        PosicaoComponente.objects.filter(tenant=tenant), hoje=hoje
+    )
+
+
+# --- PROVISIONAMENTO DA ESTRUTURA DO MOTOR ---
+#
+# A árvore grupos -> itens é montada em memória e gravada com um INSERT para
+# os grupos e outro para os itens (o SQLite pode dividir em lotes pelo limite
+# de variáveis). Quantidade pode ser fixa (int) ou o nome do campo qtd_* do Motor.
+
+ESTRUTURA_MOTOR = (
+    # (grupo, slug, ordem, [(nome_base, quantidade), ...])
+    ("Sistema de Óleo", "oleo", 10, [
+        ("Óleo Lubrificante", 1),
+        ("Filtro de Óleo", 'qtd_filtros_oleo'),
+        ("Trocador de Calor", 'qtd_trocadores_oleo'),
+    ]),
+    ("Periféricos", "perifericos", 30, [
+        ("Turbo", 'qtd_turbos'),
+        ("Intercooler", 'qtd_intercoolers'),
+        ("Alternador", 'qtd_alternadores'),
+        ("Damper", 'qtd_dampers'),
+        ("Compensador de Escape", 'qtd_compensadores'),
+        ("Resistência de Aquec.", 'qtd_resistencias'),
+        ("Válvula Bypass", 'qtd_bypass'),
+    ]),
+    ("Filtros", "filtros", 20, [
+        ("Filtro de Ar", 'qtd_filtros_ar'),
+        ("Pré-Filtro de Ar", 'qtd_pre_filtros_ar'),
+        ("Filtro de Gás", 'qtd_filtros_gas'),
+    ]),
+    ("Cilindros", "cilindros", 40, [
+        ("Pistão", 'qtd_pistoes'),
+        ("Camisa", 'qtd_camisas'),
+        ("Bronzina", 'qtd_bronzinas'),
+        ("Biela", 'qtd_bielas'),
+        ("Vela de Ignição", 'qtd_velas'),
+    ]),
+    ("Ignição", "ignicao", 50, [
+        ("Bobina", 'qtd_bobinas'),
+        ("Cabo de Vela", 'qtd_cabos_vela'),
+        ("Bateria", 'qtd_baterias'),
+        ("Motor de Arranque", 'qtd_motores_partida'),
+    ]),
+    ("Cabeçotes", "cabecotes", 60, [
+        ("Cabeçote", 'qtd_cilindros'),
+    ]),
+)
+
+
+def montar_estrutura(motor):
+    """Grupos e itens (não salvos) de um motor. Os itens já apontam para o objeto do grupo."""
+    grupos, itens = [], []
+    for nome_grupo, slug, ordem, componentes in ESTRUTURA_MOTOR:
+        grupo = GrupoComponente(tenant_id=motor.tenant_id, motor=motor, nome=nome_grupo, slug=slug, ordem=ordem)
+        grupos.append(grupo)
+        for nome_base, quantidade in componentes:
+            if isinstance(quantidade, str):
+                quantidade = getattr(motor, quantidade)
+            if not quantidade or quantidade <= 0:
+                continue
+            for i in range(1, quantidade + 1):
+                itens.append(PosicaoComponente(
+                    tenant_id=motor.tenant_id,
+                    motor=motor,
+                    grupo=grupo,
+                    nome=f"{nome_base} #{i}" if quantidade > 1 else nome_base,
+                    hora_motor_instalacao=motor.horas_totais,
+                    nome_base=nome_base,
+                    numero=i,
+                ))
+    return grupos, itens
+
+
+# --- BLUEPRINT POR MODELO (PlanoPadrao compilado) ---
+#
+# {modelo_id: {nome_base: ((tarefa, tipo_servico, unidade, intervalo), ...)}}
+# Fica em cache_blueprints; os signals de PlanoPadrao/ModeloMotor invalidam o tenant.
+
+def _compilar_blueprints(modelo_ids):
+    compilados = {mid: {} for mid in modelo_ids}
+    linhas = PlanoPadrao.objects.filter(modelo_id__in=modelo_ids).order_by('id').values_list(
+        'modelo_id', 'nome_base', 'tarefa', 'tipo_servico', 'unidade', 'intervalo_valor'
+    )
+    for modelo_id, nome_base, *plano in linhas:
+        planos = compilados[modelo_id].setdefault(nome_base.strip(), [])
+        # Mesma chave de PlanoPreventiva.Meta.constraints: (tarefa, tipo, unidade)
+        if all(p[:3] != tuple(plano[:3]) for p in planos):
+            planos.append(tuple(plano))
+    return {
+        mid: {nome: tuple(lista) for nome, lista in planos.items()}
+        for mid, planos in compilados.items()
+    }
+
+
+def blueprints_modelos(tenant_id, modelo_ids):
+    """Planos padrão compilados dos modelos. Os que não estão em cache vêm em uma query."""
+    return cache_blueprints.obter_muitos(tenant_id, 'blueprint', set(modelo_ids), _compilar_blueprints)
+
+
+def invalidar_blueprint(tenant_id):
+    cache_blueprints.invalidar(tenant_id)
+
+
+def montar_planos(motor, itens, blueprint):
+    """Cópias (não salvas) dos planos padrão para os itens do motor, já com o vencimento calculado."""
+    planos = []
+    for item in itens:
+        for tarefa, tipo_servico, unidade, intervalo in blueprint.get(item.nome_base, ()):
+            plano = PlanoPreventiva(
+                tenant_id=motor.tenant_id, posicao=item, tarefa=tarefa,
+                tipo_servico=tipo_servico, unidade=unidade, intervalo_valor=intervalo,
+            )
+            vencimento = calcular_vencimento(plano, item, motor.horas_totais, motor.total_arranques)
+            for campo, valor in vencimento.items():
+                setattr(plano, campo, valor)
+            planos.append(plano)
+    return planos
+
+
+@transaction.atomic
+def provisionar_estrutura(motores):
+    """
+    Cria grupos, itens e preventivas padrão de motores já salvos: um
+    bulk_create para cada tabela, qualquer que seja a quantidade.
+    """
+    blueprints = {}
+    for tenant_id in {m.tenant_id for m in motores}:
+        blueprints.update(blueprints_modelos(tenant_id, {m.modelo_id for m in motores if m.tenant_id == tenant_id}))
+
+    grupos, itens, por_motor = [], [], []
+    for motor in motores:
+        g, i = montar_estrutura(motor)
+        grupos.extend(g)
+        itens.extend(i)
+        por_motor.append((motor, i))
+
+    # bulk_create preenche o pk dos grupos; os itens resolvem grupo_id na hora do insert
+    GrupoComponente.objects.bulk_create(grupos)
+    PosicaoComponente.objects.bulk_create(itens)
+
+    planos = []
+    for motor, itens_motor in por_motor:
+        planos.extend(montar_planos(motor, itens_motor, blueprints[motor.modelo_id]))
+    if planos:
+        PlanoPreventiva.objects.bulk_create(planos)
+    return grupos, itens
+
+
+@transaction.atomic
+def provisionar_motores(motores):
+    """
+    Onboarding em massa: salva os motores novos e toda a estrutura deles com
+    um número fixo de INSERTs (motores, grupos, itens, preventivas).
+
+    bulk_create não dispara o post_save, então a estrutura não é duplicada
+    pelo signal. Motores que já têm pk não são reinseridos.
+    """
+    from src.apps.assets.models import Motor
+
+    motores = list(motores)
+    novos = [m for m in motores if m.pk is None]
+    for motor in novos:
+        motor.aplicar_quantidades_padrao()
+    Motor.objects.bulk_create(novos)
+
+    provisionar_estrutura(motores)
+    return motores
+
+
+# --- PREVENTIVA EM MASSA ---
+
+LOTE_PREVENTIVA_MASSA = 1000
+
+
+def criar_planos_em_massa(posicoes, tarefa, tipo_servico, unidade, intervalo_valor, tenant_id=None,
+                          lote=LOTE_PREVENTIVA_MASSA):
+    """
+    Cria o mesmo plano em todas as posições do QuerySet, em lotes de
+    bulk_create dentro de uma transação. Posições que já têm um plano
+    equivalente (mesma tarefa/tipo_servico/unidade) são puladas.
+
+    Retorna (criados, ignorados).
+    """
+    equivalente = PlanoPreventiva.objects.filter(
+        posicao=OuterRef('pk'), tarefa=tarefa, tipo_servico=tipo_servico, unidade=unidade,
+    )
+    posicoes = posicoes.order_by().select_related('motor', 'equipamento')
+    total = posicoes.count()
+    alvo = posicoes.exclude(Exists(equivalente)).order_by('pk')
+
+    criados = 0
+    tenants = set()
+    with transaction.atomic():
+        buffer = []
+        for posicao in alvo.iterator(chunk_size=lote):
+            tenants.add(posicao.tenant_id or tenant_id)
+            plano = PlanoPreventiva(
+                tenant_id=posicao.tenant_id or tenant_id,
+                posicao=posicao,
+                tarefa=tarefa,
+                tipo_servico=tipo_servico,
+                unidade=unidade,
+                intervalo_valor=intervalo_valor,
+                ultima_execucao_valor=0,
+            )
+            # bulk_create não passa pelo save(): vencimento calculado aqui
+            plano.atualizar_vencimento(posicao)
+            buffer.append(plano)
+            if len(buffer) >= lote:
+                criados += _gravar_lote(buffer)
+                buffer = []
+        if buffer:
+            criados += _gravar_lote(buffer)
+        cache_preventivas.invalidar_no_commit(tenants)
+
+    return criados, total - criados
+
+
+def _gravar_lote(planos):
+    # ignore_conflicts cobre uma criação concorrente entre o filtro e o INSERT
+    PlanoPreventiva.objects.bulk_create(planos, ignore_conflicts=True)
+    return len(planos)
+
+
+# --- PREVISÃO DE VENCIMENTO (HORAS / ARRANQUES) ---
+#
+# "Faltam 120 h" vira uma data: saldo do plano / taxa de uso do ativo
+# (mediana dos últimos JANELA_TAXA_DIAS dias de histórico). Todos os planos
+# por contador do tenant são projetados de uma vez com NumPy, e o resultado
+# fica em cache_preventivas até a próxima atualização de contador/preventiva.
+
+JANELA_TAXA_DIAS = 28
+
+
+def prever_vencimentos(tenant_id, hoje=None):
+    """
+    Data prevista de vencimento de cada plano por contador do tenant.
+
+    Retorna {plano_id: {'saldo', 'taxa_diaria', 'dias_restantes', 'data_prevista'}};
+    sem histórico de uso suficiente, os três últimos vêm None.
+    """
+    hoje = hoje or timezone.localdate()
+    return cache_preventivas.obter(
+        tenant_id, ('previsoes', hoje.isoformat()), partial(_projetar_vencimentos, tenant_id, hoje),
+    )
+
+
+def _projetar_vencimentos(tenant_id, hoje):
+    from src.apps.assets.services import taxas_de_uso
+
+    taxas = taxas_de_uso(tenant_id, hoje, JANELA_TAXA_DIAS)
+    planos = list(
+        PlanoPreventiva.objects
+        .filter(tenant_id=tenant_id, unidade__in=UNIDADES_CONTADOR, saldo_contador__isnull=False)
+        .values_list('pk', 'unidade', 'saldo_contador', 'posicao__motor_id', 'posicao__equipamento_id')
+    )
+    if not planos:
+        return {}
+
+    sem_taxa = (np.nan, np.nan)
+
+    def taxa_do_plano(unidade, motor_id, equipamento_id):
+        # Mesma regra de ativo_pai: o Motor tem prioridade sobre o Equipamento
+        chave = ('motor', motor_id) if motor_id else ('equipamento', equipamento_id)
+        return taxas.get(chave, sem_taxa)[UNIDADE_CODIGO[unidade]]
+
+    n = len(planos)
+    saldo = np.fromiter((pl[2] for pl in planos), dtype=np.float64, count=n)
+    taxa = np.fromiter((taxa_do_plano(pl[1], pl[3], pl[4]) for pl in planos), dtype=np.float64, count=n)
+
+    com_taxa = taxa > 0
+    dias = np.where(com_taxa, np.ceil(saldo / np.where(com_taxa, taxa, 1)), 0).astype(np.int64)
+
+    previsoes = {}
+    for pl, ok, t, d in zip(planos, com_taxa.tolist(), taxa.tolist(), dias.tolist()):
+        previsoes[pl[0]] = {
+            'saldo': pl[2],
+            'taxa_diaria': round(t, 2) if ok else None,
+            'dias_restantes': d if ok else None,
+            'data_prevista': hoje + timedelta(days=d) if ok else None,
+        }
+    return previsoes
+
+
+# --- AGENDA DE PREVENTIVAS (PRÓXIMOS N DIAS, FROTA INTEIRA) ---
+
+CAMPOS_AGENDA = (
+    'pk', 'tarefa', 'unidade', 'posicao_id', 'posicao__nome',
+    'posicao__motor_id', 'posicao__motor__nome', 'posicao__equipamento_id', 'posicao__equipamento__nome',
+)
+
+
+def _item_agenda(linha, data, hoje, estimada):
+    if linha['posicao__motor_id']:
+        ativo = ('motor', linha['posicao__motor_id'], linha['posicao__motor__nome'])
+    else:
+        ativo = ('equipamento', linha['posicao__equipamento_id'], linha['posicao__equipamento__nome'])
+    return data, ativo, {
+        'plano_id': linha['pk'],
+        'tarefa': linha['tarefa'],
+        'unidade': linha['unidade'],
+        'posicao_id': linha['posicao_id'],
+        'posicao': linha['posicao__nome'],
+        'data': data,
+        'estimada': estimada,
+        'vencido': plano_vencido(linha.get('saldo_contador'), linha.get('data_vencimento'), hoje),
+    }
+
+
+def agenda_preventivas(tenant_id, ate=None, hoje=None, dias=30):
+    """
+    Tudo o que está vencido ou vence até `ate` (padrão: hoje + `dias`),
+    Motores e Equipamentos juntos, agrupado por ativo e ordenado pela data.
+
+    Sem olhar posição por posição: os planos por data vêm ordenados do índice
+    (tenant, data_vencimento); os por contador usam a data prevista em cache
+    (prever_vencimentos) e são buscados pelo índice (tenant, saldo_contador).
+    As duas filas ordenadas são intercaladas com heapq.merge.
+
+    Retorna [{'tipo', 'ativo_id', 'ativo', 'proxima', 'planos': [...]}],
+    do ativo com o vencimento mais próximo para o mais distante.
+    """
+    hoje = hoje or timezone.localdate()
+    ate = ate or hoje + timedelta(days=dias)
+    planos = PlanoPreventiva.objects.filter(tenant_id=tenant_id)
+
+    # --- 1. Por data: a coluna materializada já responde ---
+    por_data = (
+        _item_agenda(linha, linha['data_vencimento'], hoje, False)
+        for linha in planos.filter(unidade__in=UNIDADES_TEMPO, data_vencimento__lte=ate)
+        .order_by('data_vencimento', 'pk')
+        .values(*CAMPOS_AGENDA, 'data_vencimento')
+    )
+
+    # --- 2. Por contador: data prevista pela taxa de uso; vencido sem taxa conta como hoje ---
+    previsoes = prever_vencimentos(tenant_id, hoje)
+    datas = {
+        pk: p['data_prevista'] for pk, p in previsoes.items()
+        if p['data_prevista'] is not None and p['data_prevista'] <= ate
+    }
+    # O maior saldo dentro da janela limita a busca no índice de saldo
+    limite = max([0, *(previsoes[pk]['saldo'] for pk in datas)])
+    por_contador = []
+    for linha in (
+        planos.filter(unidade__in=UNIDADES_CONTADOR, saldo_contador__lte=limite)
+        .values(*CAMPOS_AGENDA, 'saldo_contador')
+    ):
+        data = datas.get(linha['pk'])
+        if data is None and linha['saldo_contador'] <= 0:
+            data = hoje
+        if data is not None:
+            por_contador.append(_item_agenda(linha, data, hoje, linha['pk'] in datas))
+    por_contador.sort(key=lambda item: (item[0], item[2]['plano_id']))
+
+    # --- 3. Intercala e agrupa por ativo (ordem da primeira data de cada ativo) ---
+    agenda = {}
+    for data, ativo, item in heapq.merge(por_data, por_contador, key=lambda item: item[0]):
+        grupo = agenda.get(ativo[:2])
+        if grupo is None:
+            grupo = agenda[ativo[:2]] = {
+                'tipo': ativo[0], 'ativo_id': ativo[1], 'ativo': ativo[2], 'proxima': data, 'planos': [],
+            }
+        grupo['planos'].append(item)
+    return list(agenda.values())
@@ -1,77 +1,73 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from src.apps.assets.models import Motor
-from src.apps.components.models import PosicaoComponente, GrupoComponente
+from src.apps.assets.models import Motor, Equipamento, ModeloMotor
+from src.apps.components.models import PosicaoComponente, PlanoPreventiva, PlanoPadrao
+from src.apps.components.services import provisionar_estrutura, invalidar_blueprint
+from src.apps.core.cache import cache_preventivas
+
+CAMPOS_CONTADOR = {'horas_totais', 'total_arranques'}
+CAMPOS_SNAPSHOT = {'hora_motor_instalacao', 'arranques_motor_instalacao', 'data_instalacao'}
+
+
+def _alterou(update_fields, campos):
+    # save() sem update_fields pode ter alterado qualquer coisa
+    return update_fields is None or bool(campos & set(update_fields))
 
 @receiver(post_save, sender=Motor)
 def criar_estrutura_inicial_motor(sender, instance, created, **kwargs):
     if not created: return
+    # Grupos e itens em 2 INSERTs (ver components.services.provisionar_estrutura)
+    provisionar_estrutura([instance])
+
+
+@receiver(post_save, sender=PlanoPadrao)
+@receiver(post_delete, sender=PlanoPadrao)
+def invalidar_blueprint_plano(sender, instance, **kwargs):
+    # Próximo motor do tenant recompila os planos padrão
+    invalidar_blueprint(instance.tenant_id)
+
+
+@receiver(post_save, sender=ModeloMotor)
+@receiver(post_delete, sender=ModeloMotor)
+def invalidar_blueprint_modelo(sender, instance, **kwargs):
+    # Um id reaproveitado (ex.: após rollback) não pode herdar o cache antigo
+    invalidar_blueprint(instance.tenant_id)
+
+
+# --- VENCIMENTOS MATERIALIZADOS (PlanoPreventiva.saldo_*) ---
+
+@receiver(post_save, sender=Motor)
+def atualizar_saldos_motor(sender, instance, created, update_fields=None, **kwargs):
+    if created or not _alterou(update_fields, CAMPOS_CONTADOR):
+        return
+    PlanoPreventiva.objects.filter(posicao__motor=instance).recalcular_saldos(
+        instance.horas_totais, instance.total_arranques
+    )
+    cache_preventivas.invalidar_no_commit([instance.tenant_id])
+
+
+@receiver(post_save, sender=Equipamento)
+def atualizar_saldos_equipamento(sender, instance, created, update_fields=None, **kwargs):
+    if created or not _alterou(update_fields, CAMPOS_CONTADOR):
+        return
+    # Se a posição tiver Motor, é o Motor que manda (ver ativo_pai)
+    PlanoPreventiva.objects.filter(
+        posicao__motor__isnull=True, posicao__equipamento=instance
+    ).recalcular_saldos(instance.horas_totais, 0)
+    cache_preventivas.invalidar_no_commit([instance.tenant_id])
+
+
+@receiver(post_save, sender=PosicaoComponente)
+def atualizar_vencimentos_posicao(sender, instance, created, update_fields=None, **kwargs):
+    # O snapshot da instalação é a base dos planos que nunca foram executados
+    if created or not _alterou(update_fields, CAMPOS_SNAPSHOT | {'motor', 'equipamento'}):
+        return
+    instance.recalcular_vencimentos()
+    cache_preventivas.invalidar_no_commit([instance.tenant_id])
+
 
-    # --- Helpers ---
-    def get_grupo(nome, slug, ordem):
-        g, _ = GrupoComponente.objects.get_or_create(
-            tenant=instance.tenant, motor=instance, slug=slug,
-            defaults={'nome': nome, 'ordem': ordem}
-        )
-        return g
-
-    def criar_itens(grupo_obj, nome_base, quantidade):
-        if not quantidade or quantidade <= 0: return
-        itens = []
-        for i in range(1, quantidade + 1):
-            nome_final = f"{nome_base} #{i}" if quantidade > 1 else nome_base
-            
-            # Adicionamos o item à lista com os campos de ordenação preenchidos
-            itens.append(PosicaoComponente(
-                tenant=instance.tenant, 
-                motor=instance, 
-                grupo=grupo_obj,
-                nome=nome_final, 
-                hora_motor_instalacao=instance.horas_totais,
-                
-                # --- PREENCHIMENTO DA ORDENAÇÃO ---
-                nome_base=nome_base,  # Ex: "Cabeçote"
-                numero=i              # Ex: 1, 2, 10...
-            ))
-        PosicaoComponente.objects.bulk_create(itens)
-
-    # 1. SISTEMA DE ÓLEO
-    gp_oleo = get_grupo("Sistema de Óleo", "oleo", 10)
-    criar_itens(gp_oleo, "Óleo Lubrificante", 1) # <--- FIXO (Default 1)
-    criar_itens(gp_oleo, "Filtro de Óleo", instance.qtd_filtros_oleo)
-    criar_itens(gp_oleo, "Trocador de Calor", instance.qtd_trocadores_oleo)
-
-    # 2. PERIFÉRICOS
-    gp_perif = get_grupo("Periféricos", "perifericos", 30)
-    criar_itens(gp_perif, "Turbo", instance.qtd_turbos)
-    criar_itens(gp_perif, "Intercooler", instance.qtd_intercoolers)
-    criar_itens(gp_perif, "Alternador", instance.qtd_alternadores)
-    criar_itens(gp_perif, "Damper", instance.qtd_dampers)
-    criar_itens(gp_perif, "Compensador de Escape", instance.qtd_compensadores)
-    criar_itens(gp_perif, "Resistência de Aquec.", instance.qtd_resistencias)
-    criar_itens(gp_perif, "Válvula Bypass", instance.qtd_bypass)
-
-    # 3. FILTROS
-    gp_filtros = get_grupo("Filtros", "filtros", 20)
-    criar_itens(gp_filtros, "Filtro de Ar", instance.qtd_filtros_ar)
-    criar_itens(gp_filtros, "Pré-Filtro de Ar", instance.qtd_pre_filtros_ar)
-    criar_itens(gp_filtros, "Filtro de Gás", instance.qtd_filtros_gas)
-
-    # 4. CILINDROS (Agora detalhado e incluindo VELAS)
-    gp_cilindros = get_grupo("Cilindros", "cilindros", 40)
-    criar_itens(gp_cilindros, "Pistão", instance.qtd_pistoes)
-    criar_itens(gp_cilindros, "Camisa", instance.qtd_camisas)
-    criar_itens(gp_cilindros, "Bronzina", instance.qtd_bronzinas)
-    criar_itens(gp_cilindros, "Biela", instance.qtd_bielas)
-    criar_itens(gp_cilindros, "Vela de Ignição", instance.qtd_velas)
-
-    # 5. IGNIÇÃO (Sem velas)
-    gp_ignicao = get_grupo("Ignição", "ignicao", 50)
-    criar_itens(gp_ignicao, "Bobina", instance.qtd_bobinas)
-    criar_itens(gp_ignicao, "Cabo de Vela", instance.qtd_cabos_vela)
-    criar_itens(gp_ignicao, "Bateria", instance.qtd_baterias)
-    criar_itens(gp_ignicao, "Motor de Arranque", instance.qtd_motores_partida)
-
-    # Extras (Cabeçotes, se quiser manter a lógica de 1 por cilindro)
-    gp_cabecotes = get_grupo("Cabeçotes", "cabecotes", 60)
-    criar_itens(gp_cabecotes, "Cabeçote", instance.qtd_cilindros)
\ No newline at end of file
+@receiver(post_save, sender=PlanoPreventiva)
+@receiver(post_delete, sender=PlanoPreventiva)
+def invalidar_cache_plano(sender, instance, **kwargs):
+    # Plano editado/apagado no admin: o saldo ou a unidade podem ter mudado
+    cache_preventivas.invalidar_no_commit([instance.tenant_id])
@@ -1,3 +1,558 @@
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from src.apps.assets.models import Equipamento, LeituraContador, MarcaMotor, ModeloMotor, Motor
+from src.apps.assets.services import registrar_leituras
+from src.apps.core.models import Tenant, User
+from .models import (
+    GrupoComponente, PosicaoComponente, PlanoPreventiva, PlanoPadrao, SLUGS_MENU,
+    MenuOleo, MenuFiltros, MenuPerifericos, MenuIgnicao, MenuCilindros, MenuCabecotes, MenuOutros,
+)
+from .services import agenda_preventivas, calcular_detalhes_preventivas, prever_vencimentos
+
+
+class ChangelistQueryCountTests(TestCase):
+    """O changelist de componentes (e dos menus proxy) não pode crescer em queries com o nº de linhas."""
+
+    URLS = [
+        'admin:components_posicaocomponente_changelist',
+        'admin:components_menuoleo_changelist',
+        'admin:components_menufiltros_changelist',
+        'admin:components_menuperifericos_changelist',
+        'admin:components_menuignicao_changelist',
+        'admin:components_menucilindros_changelist',
+        'admin:components_menucabecotes_changelist',
+        'admin:components_menuoutros_changelist',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(nome="Empresa Teste")
+        marca = MarcaMotor.objects.create(tenant=cls.tenant, nome="Jenbacher")
+        cls.modelo = ModeloMotor.objects.create(tenant=cls.tenant, marca=marca, nome="J620")
+        cls.user = User.objects.create_superuser(email="admin@teste.com", password="x", tenant=cls.tenant)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def criar_motor(self, nome, cilindros):
+        motor = Motor.objects.create(
+            tenant=self.tenant, nome=nome, modelo=self.modelo, numero_serie=nome,
+            localizacao="Sala 1", qtd_cilindros=cilindros, horas_totais=1000, total_arranques=50,
+        )
+        PlanoPreventiva.objects.bulk_create([
+            PlanoPreventiva(
+                tenant=self.tenant, posicao=posicao, tarefa="Inspeção",
+                tipo_servico='INSPECAO', unidade=unidade, intervalo_valor=500,
+            )
+            for posicao in PosicaoComponente.objects.filter(motor=motor)
+            for unidade in ('HORAS', 'MESES')
+        ])
+        return motor
+
+    def contar_queries(self, url):
+        cache.clear()  # Pior caso: nenhuma posição com status em cache
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(url))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_nao_cresce_com_linhas(self):
+        self.criar_motor("Pequeno", cilindros=1)
+        poucas = {url: self.contar_queries(url) for url in self.URLS}
+
+        for i in range(3):
+            self.criar_motor(f"Grande {i}", cilindros=20)
+        self.assertGreater(PosicaoComponente.objects.count(), 100)
+
+        for url in self.URLS:
+            with self.subTest(url=url):
+                self.assertEqual(self.contar_queries(url), poucas[url])
+
+
+class MenuProxyTests(TestCase):
+    """Cada menu proxy lista apenas o seu grupo; 'Outros' fica com o resto."""
+
+    def test_menus_filtram_por_slug_do_grupo(self):
+        tenant = Tenant.objects.create(nome="Empresa Teste")
+        marca = MarcaMotor.objects.create(tenant=tenant, nome="Caterpillar")
+        modelo = ModeloMotor.objects.create(tenant=tenant, marca=marca, nome="G3520")
+        motor = Motor.objects.create(
+            tenant=tenant, nome="GMG 1", modelo=modelo, numero_serie="1", localizacao="Sala 1", qtd_cilindros=4,
+        )
+        extra = GrupoComponente.objects.create(tenant=tenant, motor=motor, nome="Arrefecimento", slug="arrefecimento")
+        PosicaoComponente.objects.create(tenant=tenant, motor=motor, grupo=extra, nome="Bomba d'água")
+        PosicaoComponente.objects.create(tenant=tenant, motor=motor, nome="Item avulso")
+
+        menus = {
+            'oleo': MenuOleo, 'filtros': MenuFiltros, 'perifericos': MenuPerifericos, 'ignicao': MenuIgnicao,
+            'cilindros': MenuCilindros, 'cabecotes': MenuCabecotes,
+        }
+        total = 0
+        for slug, menu in menus.items():
+            with self.subTest(slug=slug):
+                itens = menu.objects.all()
+                self.assertTrue(itens.exists())
+                self.assertEqual(set(itens.values_list('grupo__slug', flat=True)), {slug})
+                total += itens.count()
+
+        outros = MenuOutros.objects.all()
+        self.assertEqual(set(outros.values_list('nome', flat=True)), {"Bomba d'água", "Item avulso"})
+        self.assertFalse(outros.filter(grupo__slug__in=SLUGS_MENU).exists())
+        self.assertEqual(total + outros.count(), PosicaoComponente.objects.count())
+
+
+class ProvisionamentoTests(TestCase):
+    """A estrutura do motor é gravada só com INSERTs em lote (sem SELECT/get_or_create por grupo)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(nome="Empresa Teste")
+        marca = MarcaMotor.objects.create(tenant=cls.tenant, nome="Jenbacher")
+        cls.modelo = ModeloMotor.objects.create(tenant=cls.tenant, marca=marca, nome="J620")
+
+    def novo_motor(self, nome, cilindros):
+        return Motor(
+            tenant=self.tenant, nome=nome, modelo=self.modelo, numero_serie=nome,
+            localizacao="Sala 1", qtd_cilindros=cilindros, horas_totais=300,
+        )
+
+    def estrutura(self, motor):
+        return sorted(
+            PosicaoComponente.objects.filter(motor=motor)
+            .values_list('grupo__slug', 'grupo__ordem', 'nome', 'nome_base', 'numero', 'hora_motor_instalacao')
+        )
+
+    def assertApenasInserts(self, ctx):
+        comandos = {q['sql'].split()[0] for q in ctx.captured_queries}
+        self.assertEqual(comandos - {'SAVEPOINT', 'RELEASE'}, {'INSERT'})
+
+    def test_signal_grava_estrutura_em_lote(self):
+        motor = self.novo_motor("GMG 1", 20)
+        with CaptureQueriesContext(connection) as ctx:
+            motor.save()
+        self.assertApenasInserts(ctx)
+        self.assertEqual(GrupoComponente.objects.filter(motor=motor).count(), 6)
+        self.assertEqual(PosicaoComponente.objects.filter(motor=motor, grupo__slug='cabecotes').count(), 20)
+        self.assertIn(("cilindros", 40, "Pistão #20", "Pistão", 20, 300), self.estrutura(motor))
+
+    def test_provisionar_motores_em_massa(self):
+        referencia = self.novo_motor("Ref", 12)
+        referencia.save()
+
+        from .services import provisionar_motores
+        motores = [self.novo_motor(f"M{i}", 12) for i in range(50)]
+        with CaptureQueriesContext(connection) as ctx:
+            provisionar_motores(motores)
+        self.assertApenasInserts(ctx)
+
+        esperado = self.estrutura(referencia)
+        for motor in motores:
+            self.assertEqual(motor.qtd_pistoes, 12)
+            self.assertEqual(self.estrutura(motor), esperado)
+
+    def test_motor_nasce_com_planos_padrao_do_modelo(self):
+        PlanoPadrao.objects.bulk_create([
+            PlanoPadrao(tenant=self.tenant, modelo=self.modelo, nome_base="Pistão", tarefa="Inspeção",
+                        tipo_servico='INSPECAO', unidade='HORAS', intervalo_valor=1000),
+            PlanoPadrao(tenant=self.tenant, modelo=self.modelo, nome_base="Pistão", tarefa="Troca",
+                        tipo_servico='SUBSTITUICAO', unidade='MESES', intervalo_valor=24),
+        ])
+        # bulk_create não dispara signal: o cache é invalidado como faria o admin
+        PlanoPadrao.objects.create(tenant=self.tenant, modelo=self.modelo, nome_base="Óleo Lubrificante",
+                                   tarefa="Troca de óleo", tipo_servico='SUBSTITUICAO', intervalo_valor=500)
+
+        motor = self.novo_motor("GMG 20", 20)
+        motor.save()
+        planos = PlanoPreventiva.objects.filter(posicao__motor=motor)
+        self.assertEqual(planos.count(), 41)
+        troca_oleo = planos.get(tarefa="Troca de óleo")
+        self.assertEqual((troca_oleo.contador_vencimento, troca_oleo.saldo_contador), (800, 500))
+
+        # Blueprint já compilado: o próximo motor só faz INSERTs
+        segundo = self.novo_motor("GMG 4", 4)
+        with CaptureQueriesContext(connection) as ctx:
+            segundo.save()
+        self.assertApenasInserts(ctx)
+        self.assertEqual(PlanoPreventiva.objects.filter(posicao__motor=segundo).count(), 9)
+
+        # Editar o blueprint vale para o próximo motor
+        PlanoPadrao.objects.get(tarefa="Troca").delete()
+        terceiro = self.novo_motor("GMG 4B", 4)
+        terceiro.save()
+        self.assertEqual(PlanoPreventiva.objects.filter(posicao__motor=terceiro).count(), 5)
+
+
+class PreventivaEmMassaTests(TestCase):
+    """A ação em massa grava em lote e não duplica planos equivalentes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(nome="Empresa Teste")
+        marca = MarcaMotor.objects.create(tenant=cls.tenant, nome="Jenbacher")
+        modelo = ModeloMotor.objects.create(tenant=cls.tenant, marca=marca, nome="J620")
+        cls.motor = Motor.objects.create(
+            tenant=cls.tenant, nome="GMG 1", modelo=modelo, numero_serie="1", localizacao="Sala 1",
+            qtd_cilindros=20, horas_totais=1200,
+        )
+        cls.user = User.objects.create_superuser(email="admin@teste.com", password="x", tenant=cls.tenant)
+
+    def aplicar(self, **extra):
+        dados = {
+            'action': 'adicionar_preventiva_em_massa', 'apply': '1', 'select_across': '1',
+            '_selected_action': PosicaoComponente.objects.filter(nome_base="Vela de Ignição").first().pk,
+            'tarefa': "Troca de vela", 'tipo_servico': 'SUBSTITUICAO', 'unidade': 'HORAS', 'intervalo_valor': 2000,
+        }
+        dados.update(extra)
+        url = reverse('admin:components_menucilindros_changelist') + '?q=Vela'
+        return self.client.post(url, dados)
+
+    def test_acao_em_massa_ignora_duplicados(self):
+        self.client.force_login(self.user)
+        velas = PosicaoComponente.objects.filter(motor=self.motor, nome_base="Vela de Ignição")
+        self.assertEqual(velas.count(), 20)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.aplicar().status_code, 302)
+        inserts = [q for q in ctx.captured_queries if 'INTO "components_planopreventiva"' in q['sql']]
+        self.assertEqual(len(inserts), 1)
+
+        self.aplicar()
+        planos = PlanoPreventiva.objects.filter(posicao__in=velas, tarefa="Troca de vela")
+        self.assertEqual(planos.count(), 20)
+        self.assertEqual(set(planos.values_list('saldo_contador', flat=True)), {2000})
+
+    def test_confirmacao_mostra_contagens(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('admin:components_menucilindros_changelist'), {
+            'action': 'adicionar_preventiva_em_massa', 'select_across': '1', 'index': '0',
+            '_selected_action': PosicaoComponente.objects.filter(grupo__slug='cilindros').first().pk,
+        })
+        self.assertContains(response, "Cilindros: <strong>100</strong>", html=False)
+        self.assertNotContains(response, "Pistão #1")
+
+
+class PrevisaoVencimentoTests(TestCase):
+    """Saldo em horas/arranques vira data pela taxa de uso do histórico, com cache até o próximo contador."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(nome="Empresa Teste")
+        marca = MarcaMotor.objects.create(tenant=cls.tenant, nome="Jenbacher")
+        modelo = ModeloMotor.objects.create(tenant=cls.tenant, marca=marca, nome="J620")
+        cls.motor = Motor.objects.create(
+            tenant=cls.tenant, nome="GMG 1", modelo=modelo, numero_serie="1", localizacao="Sala 1",
+            qtd_cilindros=20, horas_totais=1200, total_arranques=50,
+        )
+        vela = PosicaoComponente.objects.filter(motor=cls.motor, nome_base="Vela de Ignição").first()
+        cls.horas = PlanoPreventiva.objects.create(
+            tenant=cls.tenant, posicao=vela, tarefa="Troca de vela", tipo_servico='SUBSTITUICAO',
+            unidade='HORAS', intervalo_valor=500, ultima_execucao_valor=1000,
+        )
+        cls.arranques = PlanoPreventiva.objects.create(
+            tenant=cls.tenant, posicao=vela, tarefa="Inspeção", tipo_servico='INSPECAO',
+            unidade='ARRANQUES', intervalo_valor=100, ultima_execucao_valor=0,
+        )
+
+    def registrar_historico(self, hoje):
+        # 20 h/dia nos últimos 5 dias; sem leitura de arranques
+        registrar_leituras([
+            LeituraContador(
+                tenant=self.tenant, ativo_tipo='motor', ativo_id=self.motor.pk,
+                registrado_em=timezone.make_aware(datetime.combine(hoje - timedelta(days=i), time(12))),
+                horas=1200 - 20 * i,
+            )
+            for i in range(5, -1, -1)
+        ])
+
+    def test_previsao_pela_taxa_e_cache(self):
+        hoje = timezone.localdate()
+        self.registrar_historico(hoje)
+
+        previsoes = prever_vencimentos(self.tenant.pk, hoje)
+        self.assertEqual(previsoes[self.horas.pk], {
+            'saldo': 300, 'taxa_diaria': 20.0, 'dias_restantes': 15, 'data_prevista': hoje + timedelta(days=15),
+        })
+        self.assertEqual(previsoes[self.arranques.pk]['data_prevista'], None)
+        with self.assertNumQueries(0):
+            self.assertEqual(prever_vencimentos(self.tenant.pk, hoje), previsoes)
+
+        # Horímetro novo: saldo 240 h; a mediana ignora o salto de hoje
+        with self.captureOnCommitCallbacks(execute=True):
+            self.motor.horas_totais = 1260
+            self.motor.save()
+        self.assertEqual(prever_vencimentos(self.tenant.pk, hoje)[self.horas.pk]['dias_restantes'], 12)
+
+    def test_agenda_intercala_data_e_contador(self):
+        hoje = timezone.localdate()
+        self.registrar_historico(hoje)
+        PlanoPreventiva.objects.create(
+            tenant=self.tenant, posicao=self.horas.posicao, tarefa="Limpeza", tipo_servico='LIMPEZA',
+            unidade='DIAS', intervalo_valor=20, ultima_execucao_data=hoje - timedelta(days=15),
+        )
+        prever_vencimentos(self.tenant.pk, hoje)
+
+        # Previsões em cache: uma query por tipo de plano, qualquer que seja o tamanho da frota
+        with self.assertNumQueries(2):
+            agenda = agenda_preventivas(self.tenant.pk, hoje=hoje, dias=30)
+        self.assertEqual(len(agenda), 1)
+        self.assertEqual((agenda[0]['tipo'], agenda[0]['ativo_id']), ('motor', self.motor.pk))
+        self.assertEqual(
+            [(p['tarefa'], p['data'], p['estimada']) for p in agenda[0]['planos']],
+            [("Limpeza", hoje + timedelta(days=5), False), ("Troca de vela", hoje + timedelta(days=15), True)],
+        )
+        self.assertEqual(agenda_preventivas(self.tenant.pk, hoje=hoje, dias=10)[0]['proxima'], hoje + timedelta(days=5))
+
+
+HOJE = date(2026, 6, 1)
+
+
+class CenarioFronteiras:
+    """
+    Um plano por posição, nas fronteiras de cada regra (90% = atenção, saldo
+    0 = ainda não vencido, MESES = 30 dias, instalação como base, intervalo
+    zero, posição sem ativo). Motor: 1000 h / 200 arranques; equipamento: 500 h.
+    """
+
+    # (descrição, ativo, unidade, intervalo, último valor, dias desde a última data,
+    #  posição: (horas na instalação, arranques na instalação, dias desde a instalação), status esperado)
+    CASOS = [
+        ("horas: uso 0", 'motor', 'HORAS', 100, 1000, None, (0, 0, None), 'EM DIA'),
+        ("horas: 89%", 'motor', 'HORAS', 100, 911, None, (0, 0, None), 'EM DIA'),
+        ("horas: 90% exato", 'motor', 'HORAS', 100, 910, None, (0, 0, None), 'ATENÇÃO'),
+        ("horas: saldo 0", 'motor', 'HORAS', 100, 900, None, (0, 0, None), 'ATENÇÃO'),
+        ("horas: saldo -1", 'motor', 'HORAS', 100, 899, None, (0, 0, None), 'VENCIDO'),
+        ("horas: base na instalação", 'motor', 'HORAS', 100, 0, None, (950, 0, None), 'EM DIA'),
+        ("horas: sem base", 'motor', 'HORAS', 100, 0, None, (0, 0, None), 'VENCIDO'),
+        ("horas: última > contador", 'motor', 'HORAS', 100, 1100, None, (0, 0, None), 'EM DIA'),
+        ("horas: intervalo 0", 'motor', 'HORAS', 0, 1000, None, (0, 0, None), 'ATENÇÃO'),
+        ("arranques: 90%", 'motor', 'ARRANQUES', 10, 191, None, (0, 0, None), 'ATENÇÃO'),
+        ("arranques: saldo -1", 'motor', 'ARRANQUES', 10, 189, None, (0, 0, None), 'VENCIDO'),
+        ("arranques: base na instalação", 'motor', 'ARRANQUES', 10, 0, None, (0, 195, None), 'EM DIA'),
+        ("equipamento: horas 95%", 'equipamento', 'HORAS', 100, 405, None, (0, 0, None), 'ATENÇÃO'),
+        ("equipamento: sem arranques", 'equipamento', 'ARRANQUES', 10, 0, None, (0, 0, None), 'EM DIA'),
+        ("dias: 80%", 'motor', 'DIAS', 10, 0, 8, (0, 0, None), 'EM DIA'),
+        ("dias: 90% exato", 'motor', 'DIAS', 10, 0, 9, (0, 0, None), 'ATENÇÃO'),
+        ("dias: vence hoje", 'motor', 'DIAS', 10, 0, 10, (0, 0, None), 'ATENÇÃO'),
+        ("dias: vencido há 1", 'motor', 'DIAS', 10, 0, 11, (0, 0, None), 'VENCIDO'),
+        ("dias: intervalo 0", 'motor', 'DIAS', 0, 0, None, (0, 0, None), 'ATENÇÃO'),
+        ("meses: 90% pela instalação", 'equipamento', 'MESES', 2, 0, None, (0, 0, 54), 'ATENÇÃO'),
+        ("meses: vencido há 41 dias", 'motor', 'MESES', 2, 0, 101, (0, 0, None), 'VENCIDO'),
+        ("meses: sem data nenhuma", 'motor', 'MESES', 2, 0, None, (0, 0, None), 'EM DIA'),
+        ("sem ativo", None, 'HORAS', 100, 0, None, (0, 0, None), None),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(nome="Empresa Teste")
+        marca = MarcaMotor.objects.create(tenant=cls.tenant, nome="Jenbacher")
+        modelo = ModeloMotor.objects.create(tenant=cls.tenant, marca=marca, nome="J620")
+        ativos = {
+            'motor': {'motor': Motor.objects.create(
+                tenant=cls.tenant, nome="GMG 1", modelo=modelo, numero_serie="1", localizacao="-",
+                qtd_cilindros=4, horas_totais=1000, total_arranques=200,
+            )},
+            'equipamento': {'equipamento': Equipamento.objects.create(
+                tenant=cls.tenant, nome="Compressor", localizacao="-", horas_totais=500,
+            )},
+            None: {},
+        }
+        antes = lambda dias: None if dias is None else HOJE - timedelta(days=dias)
+        cls.posicoes = {}
+        for descricao, ativo, unidade, intervalo, ultimo, dias, (h_inst, a_inst, d_inst), _ in cls.CASOS:
+            posicao = PosicaoComponente.objects.create(
+                tenant=cls.tenant, nome=descricao, hora_motor_instalacao=h_inst,
+                arranques_motor_instalacao=a_inst, data_instalacao=antes(d_inst), **ativos[ativo],
+            )
+            PlanoPreventiva.objects.create(
+                tenant=cls.tenant, posicao=posicao, tarefa=descricao, tipo_servico='INSPECAO', unidade=unidade,
+                intervalo_valor=intervalo, ultima_execucao_valor=ultimo, ultima_execucao_data=antes(dias),
+            )
+            cls.posicoes[descricao] = posicao
+
+    def queryset(self):
+        return PosicaoComponente.objects.filter(pk__in=[p.pk for p in self.posicoes.values()])
+
+
+class StatusSqlTests(CenarioFronteiras, TestCase):
+    """with_preventive_status (no banco) concorda com o motor em Python em toda fronteira."""
+
+    def test_anotacao_igual_ao_calculo_em_python(self):
+        detalhes = calcular_detalhes_preventivas(self.queryset(), hoje=HOJE)
+        anotadas = {p.pk: p for p in self.queryset().with_preventive_status(hoje=HOJE)}
+        situacao = {'VENCIDO': 2, 'ATENÇÃO': 1, 'EM DIA': 0, None: 0}
+
+        for descricao, *_, esperado in self.CASOS:
+            with self.subTest(descricao):
+                posicao = self.posicoes[descricao]
+                python, sql = detalhes[posicao.pk], anotadas[posicao.pk]
+                self.assertEqual([d['status'] for d in python], [esperado] if esperado else [])
+                self.assertEqual(
+                    (sql.preventivas_vencidas, sql.preventivas_atencao, sql.preventivas_em_dia, sql.situacao_preventiva),
+                    (int(esperado == 'VENCIDO'), int(esperado == 'ATENÇÃO'), int(esperado == 'EM DIA'), situacao[esperado]),
+                )
+                if python:
+                    self.assertAlmostEqual(sql.pior_progresso_pct, python[0]['progresso_pct'])
+                else:
+                    self.assertIsNone(sql.pior_progresso_pct)
+
+
+def _detalhes_referencia(posicao, hoje):
+    """O laço plano a plano que get_detalhes_preventivas fazia antes do motor em NumPy."""
+    ativo = posicao.ativo_pai
+    if not ativo:
+        return []
+    contadores = {'HORAS': ativo.horas_totais, 'ARRANQUES': getattr(ativo, 'total_arranques', 0)}
+    instalacao = {'HORAS': posicao.hora_motor_instalacao, 'ARRANQUES': posicao.arranques_motor_instalacao}
+    sufixo = {'HORAS': 'h', 'ARRANQUES': 'part.'}
+    lista = []
+    for plano in posicao.planos_preventiva.order_by('id'):
+        dados = {
+            'id_plano': plano.id, 'tarefa': plano.tarefa, 'tipo': plano.get_tipo_servico_display(),
+            'frequencia': f"{plano.intervalo_valor} {plano.get_unidade_display()}",
+            'ultima_data': plano.ultima_execucao_data, 'ultimo_valor': plano.ultima_execucao_valor,
+            'rodado': '-', 'restante': '-', 'status': 'EM DIA', 'cor': 'success', 'progresso_pct': 0,
+        }
+        if plano.unidade in contadores:
+            base = plano.ultima_execucao_valor
+            if base == 0 and instalacao[plano.unidade]:
+                base = instalacao[plano.unidade]
+            uso = max(contadores[plano.unidade] - base, 0)
+            limite = plano.intervalo_valor
+            falta = limite - uso
+            dados['rodado'] = f"{uso} {sufixo[plano.unidade]}"
+            dados['restante'] = (
+                f"Vencido há {abs(falta)} {sufixo[plano.unidade]}" if falta < 0 else f"{falta} {sufixo[plano.unidade]}"
+            )
+        else:
+            base_data = plano.ultima_execucao_data or posicao.data_instalacao or hoje
+            uso = (hoje - base_data).days
+            limite = plano.intervalo_valor * (30 if plano.unidade == 'MESES' else 1)
+            falta = limite - uso
+            dados['rodado'] = f"{uso // 30} meses" if uso > 30 else f"{uso} dias"
+            if falta >= 0:
+                dados['restante'] = f"{falta} dias"
+            elif abs(falta) > 30:
+                dados['restante'] = f"Vencido há {abs(falta) // 30} meses"
+            else:
+                dados['restante'] = f"Vencido há {abs(falta)} dias"
+        if limite > 0:
+            dados['progresso_pct'] = (uso / limite) * 100
+        if falta < 0:
+            dados.update(status='VENCIDO', cor='danger', progresso_pct=100)
+        elif uso >= limite * 0.9:
+            dados.update(status='ATENÇÃO', cor='warning')
+        lista.append(dados)
+    return lista
+
+
+class MotorVetorizadoTests(CenarioFronteiras, TestCase):
+    """O motor em NumPy devolve exatamente o que o laço antigo devolvia."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Uma posição com planos de contador e de data misturados.
+        motor = cls.posicoes["horas: uso 0"].motor
+        mista = PosicaoComponente.objects.create(
+            tenant=cls.tenant, motor=motor, nome="Mista", hora_motor_instalacao=700,
+            data_instalacao=HOJE - timedelta(days=40),
+        )
+        for unidade, intervalo, ultimo in [('MESES', 1, 0), ('HORAS', 250, 0), ('DIAS', 0, 0), ('ARRANQUES', 50, 120)]:
+            PlanoPreventiva.objects.create(
+                tenant=cls.tenant, posicao=mista, tarefa=unidade, tipo_servico='TROCA', unidade=unidade,
+                intervalo_valor=intervalo, ultima_execucao_valor=ultimo,
+            )
+        cls.posicoes["mista"] = mista
+
+    def setUp(self):
+        cache.clear()
+
+    def test_queryset_e_instancias_iguais_ao_laco_antigo(self):
+        esperado = {
+            p.pk: _detalhes_referencia(p, HOJE)
+            for p in self.queryset().select_related('motor', 'equipamento')
+        }
+        self.assertEqual(calcular_detalhes_preventivas(self.queryset(), hoje=HOJE), esperado)
+        instancias = list(self.queryset().select_related('motor', 'equipamento').prefetch_related('planos_preventiva'))
+        self.assertEqual(calcular_detalhes_preventivas(instancias, hoje=HOJE), esperado)
+
+
+class VencimentosMaterializadosTests(CenarioFronteiras, TestCase):
+    """vencidos/em_atencao/vencendo_ate (colunas saldo_*/data_*) concordam com o cálculo em Python."""
+
+    # Sem data nenhuma o Python conta a partir de hoje (uso sempre 0): não há
+    # data fixa para materializar, e com intervalo 0 esse plano fica em
+    # atenção para sempre sem que as colunas o vejam.
+    FORA_DAS_COLUNAS = {"dias: intervalo 0"}
+
+    def planos(self):
+        return PlanoPreventiva.objects.filter(posicao__in=self.queryset()).exclude(tarefa__in=self.FORA_DAS_COLUNAS)
+
+    def assertColunasIguaisAoPython(self):
+        planos = self.planos()
+        vencidos = set(planos.vencidos(hoje=HOJE).values_list('pk', flat=True))
+        atencao = set(planos.em_atencao(hoje=HOJE).values_list('pk', flat=True))
+        self.assertFalse(vencidos & atencao)
+        for lista in calcular_detalhes_preventivas(self.queryset(), hoje=HOJE).values():
+            for d in lista:
+                if d['tarefa'] in self.FORA_DAS_COLUNAS:
+                    continue
+                with self.subTest(d['tarefa']):
+                    self.assertEqual(d['id_plano'] in vencidos, d['status'] == 'VENCIDO')
+                    self.assertEqual(d['id_plano'] in atencao, d['status'] == 'ATENÇÃO')
+
+    def ids(self, *tarefas):
+        return set(PlanoPreventiva.objects.filter(tarefa__in=tarefas).values_list('pk', flat=True))
+
+    def test_fronteiras(self):
+        self.assertColunasIguaisAoPython()
+        self.assertIn(self.ids("horas: saldo 0").pop(), self.planos().em_atencao(hoje=HOJE).values_list('pk', flat=True))
+        self.assertEqual(
+            set(self.planos().vencendo_ate(0).values_list('pk', flat=True)),
+            self.ids("horas: saldo 0", "horas: saldo -1", "horas: sem base", "horas: intervalo 0"),
+        )
+        self.assertEqual(
+            set(self.planos().vencendo_ate(HOJE).values_list('pk', flat=True)),
+            self.ids("dias: vence hoje", "dias: vencido há 1", "meses: vencido há 41 dias"),
+        )
+
+    def test_agenda_usa_a_mesma_regra_de_vencido(self):
+        cache.clear()
+        agenda = agenda_preventivas(self.tenant.pk, hoje=HOJE, dias=0)
+        vencidos = set(self.planos().vencidos(hoje=HOJE).values_list('pk', flat=True))
+        itens = {p['tarefa']: p for grupo in agenda for p in grupo['planos']}
+        for item in itens.values():
+            self.assertEqual(item['vencido'], item['plano_id'] in vencidos, item['tarefa'])
+        # Vence hoje / saldo 0: entram na agenda de hoje, mas ainda não estão vencidos
+        self.assertFalse(itens["dias: vence hoje"]['vencido'])
+        self.assertFalse(itens["horas: saldo 0"]['vencido'])
+        self.assertTrue(itens["dias: vencido há 1"]['vencido'])
+
+    def test_sinais_mantem_as_colunas(self):
+        motor = Motor.objects.get(pk=self.posicoes["horas: uso 0"].motor_id)
+        motor.horas_totais += 10
+        motor.save(update_fields=['horas_totais'])
+        self.assertColunasIguaisAoPython()
+        self.assertTrue(self.planos().vencidos(hoje=HOJE).filter(tarefa="horas: saldo 0").exists())
+
+        equipamento = Equipamento.objects.get(pk=self.posicoes["equipamento: horas 95%"].equipamento_id)
+        equipamento.horas_totais += 10
+        equipamento.save()
+        self.assertColunasIguaisAoPython()
+        self.assertTrue(self.planos().vencidos(hoje=HOJE).filter(tarefa="equipamento: horas 95%").exists())
 
-# Create your tests here.
+        plano = PlanoPreventiva.objects.get(tarefa="horas: saldo -1")
+        plano.ultima_execucao_valor = motor.horas_totais
+        plano.save()
+        posicao = PosicaoComponente.objects.get(pk=self.posicoes["horas: sem base"].pk)
+        posicao.hora_motor_instalacao = 1000
+        posicao.save(update_fields=['hora_motor_instalacao'])
+        self.assertColunasIguaisAoPython()
+        self.assertFalse(self.planos().vencidos(hoje=HOJE).filter(tarefa__in=["horas: saldo -1", "horas: sem base"]).exists())
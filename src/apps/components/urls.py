@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import PosicaoComponenteDetailView
+from .views import AgendaPreventivasView, PosicaoComponenteDetailView
 
 app_name = 'components'
 
 urlpatterns = [
     # Exemplo de URL: /components/item/15/
     path('item/<int:pk>/', PosicaoComponenteDetailView.as_view(), name='posicaocomponente_detail'),
+    path('agenda/', AgendaPreventivasView.as_view(), name='agenda_preventivas'),
 ]
\ No newline at end of file
@@ -1,6 +1,12 @@
+from datetime import date
+
+from django.views import View
 from django.views.generic import DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
+from src.apps.maintenance.arquivo import anos_arquivados, historico_posicao
 from .models import PosicaoComponente
+from .services import agenda_preventivas
 
 class PosicaoComponenteDetailView(LoginRequiredMixin, DetailView):
     model = PosicaoComponente
@@ -9,5 +15,27 @@ class PosicaoComponenteDetailView(LoginRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Opcional: Adiciona dados extras se precisar no futuro
-        return context
\ No newline at end of file
+        # Histórico: tabela quente; o arquivo frio só quando pedido (?arquivo=1)
+        incluir_arquivo = self.request.GET.get('arquivo') == '1'
+        context['historico'] = historico_posicao(self.object, incluir_arquivo=incluir_arquivo)
+        context['incluir_arquivo'] = incluir_arquivo
+        context['tem_arquivo'] = bool(anos_arquivados(self.object.tenant_id))
+        return context
+
+
+class AgendaPreventivasView(LoginRequiredMixin, View):
+    """
+    Agenda da frota: preventivas vencidas ou que vencem na janela, por ativo.
+    GET ?dias=30 (padrão) ou ?ate=2026-06-30
+    """
+    raise_exception = True  # API: 403 em vez de redirecionar para o login
+
+    def get(self, request, *args, **kwargs):
+        try:
+            ate = date.fromisoformat(request.GET['ate']) if 'ate' in request.GET else None
+            dias = int(request.GET.get('dias', 30))
+        except ValueError:
+            return JsonResponse({'erro': "Parâmetros inválidos: use ?dias=N ou ?ate=AAAA-MM-DD."}, status=400)
+
+        agenda = agenda_preventivas(request.user.tenant_id, ate=ate, dias=dias)
+        return JsonResponse({'agenda': agenda})
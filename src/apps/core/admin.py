@@ -1,4 +1,17 @@
+import json
+
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList, IS_FACETS_VAR
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.translation import gettext as _
 from .models import Tenant, User
 
 # 1. Registra os modelos básicos
@@ -50,4 +63,163 @@ class TenantModelAdmin(admin.ModelAdmin):
         if request.user.is_superuser and not request.user.tenant_id:
             return qs
         # Senão, vê apenas da sua empresa
-        return qs.filter(tenant_id=request.user.tenant_id)
\ No newline at end of file
+        return qs.filter(tenant_id=request.user.tenant_id)
+
+    @property
+    def media(self):
+        media = super().media
+        # Filtros com busca (FiltroAutocomplete) precisam do select2 na changelist
+        if any(isinstance(f, (list, tuple)) and issubclass(f[1], FiltroAutocomplete) for f in self.list_filter):
+            media += AutocompleteSelect(None, self.admin_site).media
+        return media
+
+
+# 3. Changelists grandes (Livro de Ocorrências e afins)
+CURSOR_VAR = 'apos'
+
+
+def estimar_contagem(queryset):
+    """Linhas estimadas pelo planejador (PostgreSQL), sem ler a tabela; None em outros bancos."""
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plano = json.loads(queryset.order_by().explain(format='json'))
+    return int(plano[0]['Plan']['Plan Rows'])
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Paginator do admin sem COUNT(*) em listas grandes: se o planejador estima
+    mais que `limite_contagem_exata` linhas, a estimativa vira o total
+    (mostrado como "≈ N" na paginação).
+    """
+    limite_contagem_exata = 10_000
+    contagem_estimada = False
+
+    @cached_property
+    def count(self):
+        estimativa = estimar_contagem(self.object_list)
+        if estimativa is not None and estimativa > self.limite_contagem_exata:
+            self.contagem_estimada = True
+            return estimativa
+        return self.object_list.count()
+
+
+class ChangeListKeyset(ChangeList):
+    """
+    Changelist paginada por cursor (keyset): a página seguinte é "depois da
+    última linha mostrada" (?apos=...), que o banco resolve descendo o índice
+    da ordenação, em vez de OFFSET, que lê e descarta as páginas anteriores.
+    Vale para ordenações só com colunas não nulas do próprio modelo e
+    terminadas em algo único (o -pk que o admin acrescenta); nos demais casos,
+    em "mostrar tudo" ou com list_editable, volta à paginação numerada.
+    """
+    keyset = False
+    cursor = None
+    url_primeira_pagina = None
+    url_proxima_pagina = None
+
+    def get_queryset(self, request, exclude_parameters=None):
+        # O cursor não é filtro do admin nem deve sobreviver nos links de filtro/ordenação
+        if CURSOR_VAR in self.params:
+            self.cursor = self.params.pop(CURSOR_VAR)
+            self.filter_params.pop(CURSOR_VAR, None)
+            self.remove_facet_link = self.get_query_string(remove=[IS_FACETS_VAR])
+            self.add_facet_link = self.get_query_string({IS_FACETS_VAR: True})
+        return super().get_queryset(request, exclude_parameters)
+
+    def campos_keyset(self):
+        """[(campo, decrescente)] da ordenação atual, ou None se não der para paginar por cursor."""
+        campos = []
+        for item in self.queryset.query.order_by:
+            if not isinstance(item, str):
+                return None
+            nome = item.removeprefix('-')
+            try:
+                campo = self.opts.pk if nome == 'pk' else self.opts.get_field(nome)
+            except FieldDoesNotExist:
+                return None
+            if not campo.concrete or campo.is_relation or campo.null:
+                return None
+            campos.append((campo, item.startswith('-')))
+        return campos if any(campo.unique for campo, _ in campos) else None
+
+    def depois_do_cursor(self, campos):
+        try:
+            valores = [campo.to_python(v) for (campo, _), v in zip(campos, json.loads(self.cursor), strict=True)]
+        except (ValueError, TypeError, ValidationError):
+            raise IncorrectLookupParameters
+        # (a, b) < (A, B)  ==  a <= A AND (a < A OR (a = A AND b < B));
+        # o "a <= A" redundante é o que vira condição de índice
+        condicao, iguais = Q(), {}
+        for (campo, decrescente), valor in zip(campos, valores):
+            condicao |= Q(**iguais, **{f'{campo.attname}__{"lt" if decrescente else "gt"}': valor})
+            iguais[campo.attname] = valor
+        primeiro, decrescente = campos[0]
+        return Q(**{f'{primeiro.attname}__{"lte" if decrescente else "gte"}': valores[0]}) & condicao
+
+    def get_results(self, request):
+        campos = self.campos_keyset()
+        if not campos or self.show_all or self.list_editable:
+            return super().get_results(request)
+
+        queryset = self.queryset
+        if self.cursor:
+            queryset = queryset.filter(self.depois_do_cursor(campos))
+        linhas = list(queryset[:self.list_per_page + 1])
+        self.result_list = linhas[:self.list_per_page]
+        if len(linhas) > self.list_per_page:
+            ultima = self.result_list[-1]
+            cursor = json.dumps([campo.value_from_object(ultima) for campo, _ in campos], cls=DjangoJSONEncoder)
+            self.url_proxima_pagina = self.get_query_string({CURSOR_VAR: cursor})
+        self.url_primeira_pagina = self.get_query_string()
+        self.keyset = True
+
+        # Total (estimado, se o paginator do admin for o PaginadorEstimado) só para exibição
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = self.paginator.count
+        self.show_full_result_count = self.model_admin.show_full_result_count
+        self.full_result_count = self.root_queryset.count() if self.show_full_result_count else None
+        self.show_admin_actions = not self.show_full_result_count or bool(self.full_result_count)
+        self.can_show_all = self.result_count <= self.list_max_show_all
+        self.multi_page = bool(self.cursor or self.url_proxima_pagina)
+
+
+class FiltroAutocomplete(admin.FieldListFilter):
+    """
+    Filtro de FK com busca (autocomplete do admin) no lugar da lista com todos
+    os objetos relacionados; só o selecionado é lido do banco. O admin do
+    modelo relacionado precisa de search_fields.
+    Uso: list_filter = [('motor', FiltroAutocomplete)]
+    """
+    template = 'admin/filtro_autocomplete.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        # Mesmo parâmetro do filtro de FK padrão: links antigos continuam valendo
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        valores = params.get(self.lookup_kwarg) or [None]
+        super().__init__(field, request, params, model, model_admin, field_path)
+        campo = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+            required=False,
+        )
+        self.selecionado = valores[-1]
+        self.widget = campo.widget.render(
+            self.lookup_kwarg, self.selecionado, attrs={'onchange': 'this.form.submit()', 'style': 'width: 100%'},
+        )
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        # Demais parâmetros da changelist vão como campos ocultos do formulário do filtro
+        self.ocultos = [
+            (nome, valor)
+            for nome, valores in changelist.filter_params.items() if nome != self.lookup_kwarg
+            for valor in valores
+        ]
+        yield {
+            'selected': self.selecionado is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display': _('All'),
+        }
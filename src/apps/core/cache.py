@@ -0,0 +1,147 @@
+"""
+Cache por tenant com versão (settings.CACHES['default']).
+
+Cada escopo (ex.: 'preventivas') tem um contador de versão por tenant, e a
+versão faz parte de todas as chaves do escopo. Invalidar é um INCR: as
+entradas antigas ficam inalcançáveis na hora, sem procurar chaves, e saem
+do backend pelo timeout / LRU.
+
+    preventivas = CacheTenant('preventivas')
+    painel = preventivas.obter(tenant_id, ('painel', hoje), lambda: calcular(...))
+    preventivas.invalidar_no_commit([tenant_id])
+
+Com o backend em memória local (padrão sem CACHE_URL) cada processo tem a
+sua cópia e não vê o INCR dos outros: o timeout cai para
+CACHE_TENANT_TIMEOUT_LOCAL, que limita por quanto tempo um worker pode servir
+um valor já invalidado em outro. Em produção, use um backend compartilhado.
+
+Hits, misses, gravações e invalidações são contados por escopo, somando
+todos os tenants, no processo: ver estatisticas().
+"""
+import threading
+import time
+from collections import Counter
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from .tenancy import usar_tenant
+
+_ESTATISTICAS = Counter()
+_LOCK = threading.Lock()
+
+
+def _contar(escopo, evento, n=1):
+    if n:
+        with _LOCK:
+            _ESTATISTICAS[(escopo, evento)] += n
+
+
+def estatisticas():
+    """{escopo: {'hits', 'misses', 'gravacoes', 'invalidacoes', 'taxa_acerto'}} deste processo."""
+    with _LOCK:
+        contagens = dict(_ESTATISTICAS)
+    resultado = {}
+    for (escopo, evento), n in contagens.items():
+        resultado.setdefault(escopo, dict.fromkeys(('hits', 'misses', 'gravacoes', 'invalidacoes'), 0))[evento] = n
+    for dados in resultado.values():
+        consultas = dados['hits'] + dados['misses']
+        dados['taxa_acerto'] = round(dados['hits'] / consultas, 3) if consultas else None
+    return resultado
+
+
+def zerar_estatisticas():
+    with _LOCK:
+        _ESTATISTICAS.clear()
+
+
+class CacheTenant:
+
+    def __init__(self, escopo, timeout=None, alias='default'):
+        self.escopo = escopo
+        self._timeout = timeout
+        self.alias = alias
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    @property
+    def timeout(self):
+        timeout = self._timeout or settings.CACHE_TENANT_TIMEOUT
+        if isinstance(self.backend, LocMemCache):
+            # Versão por processo: só o timeout curto limita o dado velho nos outros workers
+            timeout = min(timeout, settings.CACHE_TENANT_TIMEOUT_LOCAL)
+        return timeout
+
+    def _chave_versao(self, tenant_id):
+        return f'{self.escopo}:versao:{tenant_id}'
+
+    def versao(self, tenant_id):
+        # Começa no relógio (ns), não em 1: se o backend descartar o contador,
+        # a versão nova nunca repete uma antiga e nada velho volta a ser lido
+        return self.backend.get_or_set(self._chave_versao(tenant_id), time.time_ns, timeout=None)
+
+    def invalidar(self, tenant_id):
+        """O(1): as entradas do tenant neste escopo deixam de ser encontradas."""
+        _contar(self.escopo, 'invalidacoes')
+        try:
+            self.backend.incr(self._chave_versao(tenant_id))
+        except ValueError:
+            pass  # Nada em cache ainda para este tenant
+
+    def invalidar_no_commit(self, tenant_ids):
+        # Depois do COMMIT: um leitor concorrente não recoloca no cache dados antigos
+        for tenant_id in set(tenant_ids):
+            transaction.on_commit(partial(self.invalidar, tenant_id))
+
+    def chave(self, tenant_id, partes, versao=None):
+        versao = self.versao(tenant_id) if versao is None else versao
+        return ':'.join([self.escopo, str(tenant_id), str(versao), *map(str, partes)])
+
+    def obter(self, tenant_id, partes, calcular):
+        """Valor em cache para (tenant, partes) ou calcular(), gravado na versão atual."""
+        chave = self.chave(tenant_id, partes)
+        valor = self.backend.get(chave)
+        if valor is not None:
+            _contar(self.escopo, 'hits')
+            return valor
+        _contar(self.escopo, 'misses')
+        # Calculado sempre no tenant da chave: nada de outro contexto vai para o cache dele
+        with usar_tenant(tenant_id):
+            valor = calcular()
+        self.backend.set(chave, valor, self.timeout)
+        _contar(self.escopo, 'gravacoes')
+        return valor
+
+    def obter_muitos(self, tenant_id, nome, ids, calcular, extra=()):
+        """
+        Versão em lote: {id: valor} com um get_many, calcular(faltando) só para
+        os ids sem cache e um set_many. calcular deve devolver {id: valor}.
+        """
+        versao = self.versao(tenant_id)
+        chaves = {self.chave(tenant_id, (nome, *extra, i), versao): i for i in ids}
+        encontrados = {chaves[c]: v for c, v in self.backend.get_many(list(chaves)).items()}
+        faltando = [i for i in chaves.values() if i not in encontrados]
+        _contar(self.escopo, 'hits', len(encontrados))
+        _contar(self.escopo, 'misses', len(faltando))
+        if faltando:
+            with usar_tenant(tenant_id):
+                calculados = calcular(faltando)
+            self.backend.set_many(
+                {self.chave(tenant_id, (nome, *extra, i), versao): v for i, v in calculados.items()},
+                self.timeout,
+            )
+            _contar(self.escopo, 'gravacoes', len(calculados))
+            encontrados.update(calculados)
+        return encontrados
+
+
+# Contadores, manutenções e planos: previsões, painel e tabela de preventivas
+cache_preventivas = CacheTenant('preventivas')
+
+# Planos padrão compilados por modelo de motor
+cache_blueprints = CacheTenant('blueprints')
@@ -0,0 +1,56 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from src.apps.core.particoes import (
+    MESES_A_FRENTE, TABELAS_PARTICIONADAS, criar_particoes, desanexar_particoes,
+    particoes, proximo_mes, suporta_particoes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mantém as partições mensais das tabelas de histórico (registros de "
+        "manutenção e movimentos de estoque): cria os meses à frente e, opcionalmente, "
+        "desanexa os meses antigos para arquivamento. Só PostgreSQL; rodar mensalmente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses-a-frente', type=int, default=MESES_A_FRENTE,
+            help="Quantos meses futuros manter com partição própria",
+        )
+        parser.add_argument(
+            '--desanexar-ate', metavar='AAAA-MM',
+            help="Desanexa as partições de meses anteriores a este (ficam como tabelas soltas)",
+        )
+        parser.add_argument('--listar', action='store_true', help="Só lista as partições atuais")
+
+    def handle(self, *args, **opts):
+        if not suporta_particoes():
+            self.stdout.write(self.style.WARNING("Banco sem particionamento (não é PostgreSQL): nada a fazer."))
+            return
+
+        desanexar_ate = None
+        if opts['desanexar_ate']:
+            try:
+                desanexar_ate = datetime.strptime(opts['desanexar_ate'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError("--desanexar-ate deve estar no formato AAAA-MM.")
+
+        ate = date.today()
+        for _ in range(opts['meses_a_frente']):
+            ate = proximo_mes(ate)
+
+        for tabela in TABELAS_PARTICIONADAS:
+            if opts['listar']:
+                for nome, _ in particoes(tabela):
+                    self.stdout.write(nome)
+                continue
+            for nome in criar_particoes(tabela, ate):
+                self.stdout.write(f"Criada: {nome}")
+            if desanexar_ate:
+                for nome in desanexar_particoes(tabela, desanexar_ate):
+                    self.stdout.write(f"Desanexada: {nome}")
+
+        self.stdout.write(self.style.SUCCESS("Partições em dia."))
@@ -0,0 +1,25 @@
+from .tenancy import SEM_TENANT, TODOS_OS_TENANTS, usar_tenant
+
+
+class TenantMiddleware:
+    """
+    Define o tenant atual (core.tenancy) a partir do usuário logado, para
+    que todo manager de TenantAwareModel filtre pela empresa dele.
+    Deve vir depois do AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with usar_tenant(self.tenant_da_requisicao(request)):
+            return self.get_response(request)
+
+    def tenant_da_requisicao(self, request):
+        user = request.user
+        if not user.is_authenticated:
+            return SEM_TENANT
+        if user.tenant_id:
+            return user.tenant_id
+        # Mesma regra do TenantModelAdmin: superusuário sem empresa vê tudo
+        return TODOS_OS_TENANTS if user.is_superuser else SEM_TENANT
@@ -2,6 +2,7 @@ import uuid
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
+from .tenancy import SEM_TENANT, TODOS_OS_TENANTS, tenant_atual, todos_os_tenants
 
 # 1. Gerenciador de Usuários (Login por Email)
 class CustomUserManager(BaseUserManager):
@@ -51,9 +52,41 @@ class User(AbstractUser):
     def __str__(self):
         return self.email
 
-# 4. Classe Abstrata para proteger os outros Apps
+# 4. Manager que confina as queries ao tenant atual
+class TenantManager(models.Manager):
+    """
+    Manager padrão dos TenantAwareModel: tenant_id do contexto (definido pelo
+    TenantMiddleware ou por core.tenancy.usar_tenant) é sempre o primeiro
+    filtro. Sem tenant no contexto ou dentro de todos_os_tenants(), não filtra.
+    Combine com um QuerySet próprio via TenantManager.from_queryset(...).
+    """
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        tenant_id = tenant_atual()
+        if tenant_id is None or tenant_id is TODOS_OS_TENANTS:
+            return qs
+        if tenant_id is SEM_TENANT:
+            return qs.none()
+        return qs.filter(tenant_id=tenant_id)
+
+
+# 5. Classe Abstrata para proteger os outros Apps
 class TenantAwareModel(models.Model):
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE)
+
+    objects = TenantManager()
     
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
+
+    # Unicidade vale para a tabela inteira: o _default_manager (TenantManager)
+    # esconderia as linhas de outras empresas e o form passaria direto para
+    # o IntegrityError no INSERT
+    def validate_unique(self, exclude=None):
+        with todos_os_tenants():
+            super().validate_unique(exclude=exclude)
+
+    def validate_constraints(self, exclude=None):
+        with todos_os_tenants():
+            super().validate_constraints(exclude=exclude)
\ No newline at end of file
@@ -0,0 +1,196 @@
+"""
+Particionamento mensal (PostgreSQL) das tabelas de histórico append-only.
+
+Cada tabela vira uma tabela particionada por RANGE da coluna de data, com
+uma partição por mês (<tabela>_pAAAA_MM) e uma partição padrão
+(<tabela>_padrao) para datas fora da janela preparada. Filtros por data
+(changelists, relatórios) só leem as partições do período, e um mês antigo
+pode ser desanexado inteiro para arquivamento.
+
+O Django continua vendo "id" como chave primária; no banco a PK passa a ser
+(id, coluna da partição), exigência do PostgreSQL. Em outros bancos
+(SQLite nos testes) as tabelas ficam como estão e tudo aqui é no-op.
+"""
+import re
+from datetime import date, timedelta
+
+from django.db import connection
+
+# tabela -> coluna de data que define a partição
+TABELAS_PARTICIONADAS = {
+    'maintenance_registromanutencao': 'data_ocorrencia',
+    'inventory_movimentoestoque': 'data_movimento',
+}
+MESES_A_FRENTE = 12
+
+
+def suporta_particoes(conexao=None):
+    return (conexao or connection).vendor == 'postgresql'
+
+
+def proximo_mes(mes):
+    return (mes.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def meses(inicio, fim):
+    """Primeiro dia de cada mês de `inicio` a `fim` (inclusive)."""
+    atual = inicio.replace(day=1)
+    while atual <= fim:
+        yield atual
+        atual = proximo_mes(atual)
+
+
+def nome_particao(tabela, mes):
+    return f'{tabela}_p{mes:%Y_%m}'
+
+
+def mes_da_particao(tabela, nome):
+    """Mês de uma partição pelo nome; None para a padrão ou nomes de fora."""
+    encontrado = re.fullmatch(rf'{re.escape(tabela)}_p(\d{{4}})_(\d{{2}})', nome)
+    return date(int(encontrado[1]), int(encontrado[2]), 1) if encontrado else None
+
+
+# ==========================================================
+# 1. CONVERSÃO (migrations)
+# ==========================================================
+
+def _esta_particionada(cursor, tabela):
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace",
+        [tabela],
+    )
+    return cursor.fetchone() is not None
+
+
+def _trocar_tabela(cursor, tabela, criar_nova, chave_primaria):
+    """
+    Recria `tabela` a partir de `criar_nova` (SQL com {nova} e {tabela}),
+    copiando linhas, sequência do id, índices e FKs com os mesmos nomes
+    (as migrations seguintes referenciam os índices pelo nome).
+    """
+    nova = f'{tabela}_nova'
+    cursor.execute(
+        "SELECT indexname, indexdef FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND tablename = %s AND indexname <> %s",
+        [tabela, f'{tabela}_pkey'],
+    )
+    indices = cursor.fetchall()
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [tabela],
+    )
+    fks = cursor.fetchall()
+    cursor.execute(
+        "SELECT attidentity <> '' FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'id'",
+        [tabela],
+    )
+    identidade = cursor.fetchone()[0]
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [tabela])
+    sequencia = cursor.fetchone()[0]
+
+    cursor.execute(criar_nova.format(nova=nova, tabela=tabela))
+    cursor.execute(f'ALTER TABLE {nova} ADD CONSTRAINT {nova}_pkey PRIMARY KEY ({chave_primaria})')
+    cursor.execute(f'INSERT INTO {nova} SELECT * FROM {tabela}')
+
+    if identidade:
+        # A coluna nova tem sua própria sequência: continua de onde a antiga parou
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{nova}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {nova}"
+        )
+    elif sequencia:
+        # serial antigo: a sequência passa a pertencer à tabela nova (não cai no DROP)
+        cursor.execute(f'ALTER SEQUENCE {sequencia} OWNED BY {nova}.id')
+
+    cursor.execute(f'DROP TABLE {tabela}')
+    cursor.execute(f'ALTER TABLE {nova} RENAME TO {tabela}')
+    cursor.execute(f'ALTER TABLE {tabela} RENAME CONSTRAINT {nova}_pkey TO {tabela}_pkey')
+    for _, definicao in indices:
+        cursor.execute(definicao)
+    for nome, definicao in fks:
+        cursor.execute(f'ALTER TABLE {tabela} ADD CONSTRAINT {nome} {definicao}')
+
+
+def particionar_tabela(schema_editor, tabela, coluna, meses_a_frente=MESES_A_FRENTE):
+    """Converte a tabela em particionada por mês, com os dados existentes."""
+    if not suporta_particoes(schema_editor.connection):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        if _esta_particionada(cursor, tabela):
+            return
+        cursor.execute(f'SELECT MIN({coluna})::date, MAX({coluna})::date FROM {tabela}')
+        primeiro, ultimo = cursor.fetchone()
+
+        hoje = date.today()
+        fim = max(ultimo or hoje, hoje)
+        for _ in range(meses_a_frente):
+            fim = proximo_mes(fim)
+        criar = (
+            'CREATE TABLE {nova} (LIKE {tabela} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ({coluna})'
+        )
+        # As partições precisam existir antes da cópia: criadas na tabela nova
+        _trocar_tabela(cursor, tabela, criar + ';' + _sql_particoes(
+            '{nova}', tabela, primeiro or hoje, fim,
+        ), f'id, {coluna}')
+
+
+def desparticionar_tabela(schema_editor, tabela, coluna):
+    """Volta para uma tabela comum (reverso da migration)."""
+    if not suporta_particoes(schema_editor.connection):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        if not _esta_particionada(cursor, tabela):
+            return
+        criar = 'CREATE TABLE {nova} (LIKE {tabela} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS)'
+        _trocar_tabela(cursor, tabela, criar, 'id')
+
+
+def _sql_particoes(pai, tabela, inicio, fim):
+    comandos = [
+        f"CREATE TABLE IF NOT EXISTS {nome_particao(tabela, mes)} PARTITION OF {pai} "
+        f"FOR VALUES FROM ('{mes.isoformat()}') TO ('{proximo_mes(mes).isoformat()}')"
+        for mes in meses(inicio, fim)
+    ]
+    comandos.append(f'CREATE TABLE IF NOT EXISTS {tabela}_padrao PARTITION OF {pai} DEFAULT')
+    return ';'.join(comandos)
+
+
+# ==========================================================
+# 2. MANUTENÇÃO (command particoes_historico)
+# ==========================================================
+
+def particoes(tabela):
+    """[(nome, mês)] das partições da tabela; a padrão vem com mês None."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass ORDER BY c.relname",
+            [tabela],
+        )
+        return [(nome, mes_da_particao(tabela, nome)) for (nome,) in cursor.fetchall()]
+
+
+def criar_particoes(tabela, ate):
+    """Cria as partições mensais que faltam, do mês atual até `ate`."""
+    existentes = {nome for nome, _ in particoes(tabela)}
+    novas = [m for m in meses(date.today(), ate) if nome_particao(tabela, m) not in existentes]
+    if novas:
+        with connection.cursor() as cursor:
+            cursor.execute(_sql_particoes(tabela, tabela, novas[0], novas[-1]))
+    return [nome_particao(tabela, m) for m in novas]
+
+
+def desanexar_particoes(tabela, ate):
+    """
+    Desanexa as partições de meses anteriores a `ate`: viram tabelas comuns
+    com o mesmo nome, fora das consultas, prontas para exportar e apagar.
+    """
+    desanexadas = []
+    with connection.cursor() as cursor:
+        for nome, mes in particoes(tabela):
+            if mes is not None and proximo_mes(mes) <= ate:
+                cursor.execute(f'ALTER TABLE {tabela} DETACH PARTITION {nome}')
+                desanexadas.append(nome)
+    return desanexadas
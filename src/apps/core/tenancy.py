@@ -0,0 +1,31 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Valores especiais do tenant atual (além do id de um Tenant)
+TODOS_OS_TENANTS = object()  # Escape explícito: superusuário sem empresa, jobs em lote
+SEM_TENANT = object()        # Anônimo / usuário sem empresa: não enxerga nada
+
+_tenant_atual = ContextVar('tenant_atual', default=None)
+
+
+def tenant_atual():
+    """
+    Tenant do contexto (requisição ou job). None = nenhum definido: shell,
+    commands e migrations rodam sem filtro, como antes do TenantManager.
+    """
+    return _tenant_atual.get()
+
+
+@contextmanager
+def usar_tenant(tenant_id):
+    """Confina os managers dos TenantAwareModel ao tenant dentro do bloco."""
+    token = _tenant_atual.set(tenant_id)
+    try:
+        yield
+    finally:
+        _tenant_atual.reset(token)
+
+
+def todos_os_tenants():
+    """Escape explícito para rotinas que precisam enxergar todas as empresas."""
+    return usar_tenant(TODOS_OS_TENANTS)
@@ -0,0 +1,315 @@
+import re
+from datetime import date, timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from src.apps.assets.models import Equipamento, MarcaMotor, ModeloMotor, Motor
+from src.apps.components.models import MenuCilindros, PlanoPreventiva, PosicaoComponente
+from src.apps.components.services import provisionar_motores
+from src.apps.inventory.models import (
+    CategoriaPeca, CatalogoPeca, EstoqueItem, LocalEstoque, MovimentoEstoque, SerialPeca,
+)
+from src.apps.maintenance.models import RegistroManutencao
+from .cache import CacheTenant, estatisticas, zerar_estatisticas
+from .models import Tenant, User
+from .particoes import desparticionar_tabela, mes_da_particao, meses, nome_particao, particionar_tabela
+from .tenancy import todos_os_tenants, usar_tenant
+
+
+class CacheTenantTests(TestCase):
+    """Invalidação por versão: O(1), isolada por tenant e segura contra despejo do contador."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a = Tenant.objects.create(nome="Empresa A")
+        cls.b = Tenant.objects.create(nome="Empresa B")
+
+    def setUp(self):
+        zerar_estatisticas()
+        self.cache = CacheTenant('teste')
+        self.chamadas = 0
+
+    def calcular(self):
+        self.chamadas += 1
+        return self.chamadas
+
+    def test_versao_invalida_so_o_tenant(self):
+        self.assertEqual(self.cache.obter(self.a.pk, ('valor',), self.calcular), 1)
+        self.assertEqual(self.cache.obter(self.b.pk, ('valor',), self.calcular), 2)
+        self.assertEqual(self.cache.obter(self.a.pk, ('valor',), self.calcular), 1)
+
+        self.cache.invalidar(self.a.pk)
+        self.assertEqual(self.cache.obter(self.a.pk, ('valor',), self.calcular), 3)
+        self.assertEqual(self.cache.obter(self.b.pk, ('valor',), self.calcular), 2)
+
+        # Contador despejado pelo backend: a versão nova não reaproveita a antiga
+        cache.delete(self.cache._chave_versao(self.a.pk))
+        self.assertEqual(self.cache.obter(self.a.pk, ('valor',), self.calcular), 4)
+
+        self.assertEqual(estatisticas()['teste'], {
+            'hits': 2, 'misses': 4, 'gravacoes': 4, 'invalidacoes': 1, 'taxa_acerto': 0.333,
+        })
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'compartilhado': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    })
+    def test_memoria_local_usa_timeout_curto(self):
+        # Cada worker tem a sua versão: só a expiração leva a invalidação aos outros
+        self.assertEqual(CacheTenant('teste').timeout, settings.CACHE_TENANT_TIMEOUT_LOCAL)
+        self.assertEqual(CacheTenant('teste', alias='compartilhado').timeout, settings.CACHE_TENANT_TIMEOUT)
+
+    def test_estatisticas_so_para_staff(self):
+        url = reverse('core:estatisticas_cache')
+        usuario = User.objects.create_user(email="tecnico@teste.com", password="x", tenant=self.a)
+        self.client.force_login(usuario)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        usuario.is_staff = True
+        usuario.save()
+        self.assertIn('cache', self.client.get(url).json())
+
+
+class TenantManagerTests(TestCase):
+    """O manager padrão confina as queries ao tenant do contexto; o escape é explícito."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a = Tenant.objects.create(nome="Empresa A")
+        cls.b = Tenant.objects.create(nome="Empresa B")
+        for tenant in (cls.a, cls.b):
+            LocalEstoque.objects.create(tenant=tenant, nome="Armário")
+        cls.posicao_b = PosicaoComponente.objects.create(tenant=cls.b, nome="Pistão #1")
+
+    def test_filtro_pelo_contexto(self):
+        self.assertEqual(LocalEstoque.objects.count(), 2)  # shell/commands: sem filtro
+        with usar_tenant(self.a.pk):
+            qs = LocalEstoque.objects.filter(nome="Armário")
+            self.assertEqual(list(qs.values_list('tenant_id', flat=True)), [self.a.pk])
+            self.assertIn('WHERE ("inventory_localestoque"."tenant_id" = ', str(qs.query))
+            # Compõe com os QuerySets/managers próprios dos apps
+            self.assertFalse(PosicaoComponente.objects.with_preventive_status().exists())
+            self.assertFalse(MenuCilindros.objects.exists())
+            with todos_os_tenants():
+                self.assertEqual(LocalEstoque.objects.count(), 2)
+
+    def test_unicidade_enxerga_todos_os_tenants(self):
+        # MarcaMotor.nome é único na tabela: o admin do tenant B mostra erro no form, não um 500
+        MarcaMotor.objects.create(tenant=self.a, nome="CAT")
+        usuario = User.objects.create_user(email="admin@b.com", password="x", tenant=self.b, is_staff=True, is_superuser=True)
+        self.client.force_login(usuario)
+        response = self.client.post(reverse('admin:assets_marcamotor_add'), {'nome': "CAT"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('nome', response.context['adminform'].form.errors)
+        self.assertEqual(MarcaMotor.objects.filter(nome="CAT").count(), 1)
+
+    def test_middleware_isola_as_views(self):
+        url = reverse('components:posicaocomponente_detail', args=[self.posicao_b.pk])
+        usuario = User.objects.create_user(email="tecnico@teste.com", password="x", tenant=self.a)
+        self.client.force_login(usuario)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class PlanoDeConsultaTests(TestCase):
+    """
+    Regressão de índices: as consultas quentes de um tenant grande (com outro
+    tenant ao lado) não podem varrer a tabela inteira. SQLite: nada de
+    "SCAN <tabela>" no EXPLAIN QUERY PLAN; PostgreSQL: nada de "Seq Scan"
+    com enable_seqscan desligado (só sobra se não houver índice utilizável).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.grande = cls.popular(Tenant.objects.create(nome="Empresa Grande"), motores=10, linhas=3000)
+        cls.popular(Tenant.objects.create(nome="Empresa Pequena"), motores=1, linhas=100)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    @classmethod
+    def popular(cls, tenant, motores, linhas):
+        marca = MarcaMotor.objects.create(tenant=tenant, nome=f"Marca {tenant.nome}")
+        modelo = ModeloMotor.objects.create(tenant=tenant, marca=marca, nome="J620")
+        provisionar_motores([
+            Motor(tenant=tenant, nome=f"GMG {i}", modelo=modelo, numero_serie=str(i), localizacao="-", qtd_cilindros=20)
+            for i in range(motores)
+        ])
+        equipamento = Equipamento.objects.create(tenant=tenant, nome="Compressor", localizacao="-")
+        PosicaoComponente.objects.bulk_create([
+            PosicaoComponente(tenant=tenant, equipamento=equipamento, nome=f"Válvula #{i}") for i in range(motores * 10)
+        ])
+        posicoes = list(PosicaoComponente.objects.filter(tenant=tenant).select_related('motor'))
+        hoje = date.today()
+        PlanoPreventiva.objects.bulk_create([
+            PlanoPreventiva(
+                tenant=tenant, posicao=p, tarefa="Inspeção", tipo_servico='INSPECAO', unidade='DIAS',
+                intervalo_valor=30, data_vencimento=hoje + timedelta(days=i % 90),
+            )
+            for i, p in enumerate(posicoes)
+        ])
+        RegistroManutencao.objects.bulk_create([
+            RegistroManutencao(
+                tenant=tenant, posicao=p, motor=p.motor, equipamento=p.equipamento,
+                data_ocorrencia=hoje - timedelta(days=i % 365), horimetro_na_execucao=i,
+            )
+            for i, p in ((i, posicoes[i % len(posicoes)]) for i in range(linhas))
+        ])
+
+        categoria = CategoriaPeca.objects.create(tenant=tenant, nome="Geral")
+        local = LocalEstoque.objects.create(tenant=tenant, nome="Almoxarifado")
+        catalogos = CatalogoPeca.objects.bulk_create([
+            CatalogoPeca(tenant=tenant, nome=f"Peça {i}", categoria=categoria, codigo_fabricante=f"PN-{i}")
+            for i in range(linhas // 10)
+        ])
+        itens = EstoqueItem.objects.bulk_create([
+            EstoqueItem(tenant=tenant, catalogo=c, local=local, quantidade=10) for c in catalogos
+        ])
+        SerialPeca.objects.bulk_create([
+            SerialPeca(tenant=tenant, item_estoque=itens[i % len(itens)], serial_number=f"SN-{i}")
+            for i in range(linhas)
+        ])
+        MovimentoEstoque.objects.bulk_create([
+            MovimentoEstoque(tenant=tenant, item=itens[i % len(itens)], tipo='ENTRADA', quantidade=1)
+            for i in range(linhas)
+        ])
+        return tenant
+
+    def plano(self, qs):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return qs.explain()
+
+    def assertSemVarredura(self, qs):
+        tabela = qs.model._meta.db_table
+        plano = self.plano(qs)
+        if connection.vendor == 'postgresql':
+            self.assertNotIn(f'Seq Scan on {tabela}', plano)
+        else:
+            self.assertIsNone(re.search(rf'\bSCAN {tabela}\b', plano), plano)
+
+    def test_consultas_quentes_usam_indice(self):
+        motor = Motor.objects.filter(tenant=self.grande).first()
+        equipamento = Equipamento.objects.get(tenant=self.grande)
+        posicao_ids = list(PosicaoComponente.objects.filter(motor=motor).values_list('pk', flat=True)[:50])
+        item = EstoqueItem.objects.filter(tenant=self.grande).first()
+
+        with usar_tenant(self.grande.pk):
+            consultas = {
+                'posições do motor': PosicaoComponente.objects.filter(motor=motor),
+                'posições do equipamento': PosicaoComponente.objects.filter(equipamento=equipamento),
+                'menu de cilindros': MenuCilindros.objects.all(),
+                'planos das posições': PlanoPreventiva.objects.filter(posicao_id__in=posicao_ids),
+                'planos vencendo': PlanoPreventiva.objects.vencendo_ate(date.today()),
+                'livro de ocorrências': RegistroManutencao.objects.all()[:100],
+                'histórico do motor': RegistroManutencao.objects.filter(motor=motor)[:50],
+                'histórico do componente': RegistroManutencao.objects.filter(posicao_id=posicao_ids[0]),
+                'estoque da peça': EstoqueItem.objects.filter(catalogo_id=item.catalogo_id),
+                'seriais do item': SerialPeca.objects.filter(item_estoque=item),
+                'rastreio por serial': SerialPeca.objects.filter(serial_number="SN-10"),
+                'movimentações': MovimentoEstoque.objects.all()[:100],
+                'razão do item': MovimentoEstoque.objects.filter(item=item).order_by('id'),
+            }
+            for nome, qs in consultas.items():
+                with self.subTest(nome):
+                    self.assertSemVarredura(qs)
+
+
+class ParticoesTests(TestCase):
+    """Nomes e meses das partições; fora do PostgreSQL o command é no-op."""
+
+    def test_nomes_e_meses(self):
+        tabela = 'maintenance_registromanutencao'
+        janela = list(meses(date(2025, 11, 15), date(2026, 2, 1)))
+        self.assertEqual(janela, [date(2025, 11, 1), date(2025, 12, 1), date(2026, 1, 1), date(2026, 2, 1)])
+        nome = nome_particao(tabela, janela[1])
+        self.assertEqual(nome, 'maintenance_registromanutencao_p2025_12')
+        self.assertEqual(mes_da_particao(tabela, nome), date(2025, 12, 1))
+        self.assertIsNone(mes_da_particao(tabela, f'{tabela}_padrao'))
+
+    def test_command(self):
+        saida = StringIO()
+        call_command('particoes_historico', '--desanexar-ate', '2025-01', stdout=saida)
+        if connection.vendor != 'postgresql':
+            self.assertIn("nada a fazer", saida.getvalue())
+
+    def estrutura(self, tabela):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT contype, conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = %s::regclass AND contype IN ('p', 'f')",
+                [tabela],
+            )
+            restricoes = cursor.fetchall()
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s", [tabela],
+            )
+            indices = {nome for (nome,) in cursor.fetchall()}
+            cursor.execute(f'SELECT tableoid::regclass::text, COUNT(*) FROM {tabela} GROUP BY 1')
+            linhas = dict(cursor.fetchall())
+        return {
+            'pk': [definicao for tipo, _, definicao in restricoes if tipo == 'p'],
+            'fks': {(nome, definicao) for tipo, nome, definicao in restricoes if tipo == 'f'},
+            'indices': indices,
+            'linhas': linhas,
+        }
+
+    @skipUnless(connection.vendor == 'postgresql', "Particionamento só existe no PostgreSQL")
+    def test_conversao_de_tabela_populada(self):
+        tabela = 'maintenance_registromanutencao'
+        tenant = Tenant.objects.create(nome="Empresa Teste")
+        modelo = ModeloMotor.objects.create(
+            tenant=tenant, marca=MarcaMotor.objects.create(tenant=tenant, nome="Jenbacher"), nome="J620",
+        )
+        motor = Motor.objects.create(
+            tenant=tenant, nome="GMG 1", modelo=modelo, numero_serie="1", localizacao="-", qtd_cilindros=4,
+        )
+        posicao = PosicaoComponente.objects.filter(motor=motor).first()
+        registros = RegistroManutencao.objects.bulk_create([
+            RegistroManutencao(
+                tenant=tenant, posicao=posicao, motor=motor,
+                data_ocorrencia=date(2026, mes, dia), horimetro_na_execucao=mes * 100 + dia,
+            )
+            for mes in (1, 2, 3, 4) for dia in (1, 15, 28)
+        ])
+
+        # A migration converteu a tabela vazia: volta ao formato comum e converte de novo, com dados.
+        # As FKs são DEFERRABLE: checadas agora, senão o DROP da tabela antiga espera o fim do teste.
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        with connection.schema_editor() as editor:
+            desparticionar_tabela(editor, tabela, 'data_ocorrencia')
+        antes = self.estrutura(tabela)
+        self.assertEqual(antes['pk'], ['PRIMARY KEY (id)'])
+        self.assertEqual(antes['linhas'], {tabela: 12})
+
+        with connection.schema_editor() as editor:
+            particionar_tabela(editor, tabela, 'data_ocorrencia')
+        depois = self.estrutura(tabela)
+        self.assertEqual(depois['pk'], ['PRIMARY KEY (id, data_ocorrencia)'])
+        self.assertEqual(depois['fks'], antes['fks'])
+        self.assertEqual(depois['indices'], antes['indices'])
+        self.assertEqual(depois['linhas'], {nome_particao(tabela, date(2026, mes, 1)): 3 for mes in (1, 2, 3, 4)})
+
+        # A sequência do id continua de onde parou
+        novo, = RegistroManutencao.objects.bulk_create([
+            RegistroManutencao(
+                tenant=tenant, posicao=posicao, motor=motor, data_ocorrencia=date(2026, 3, 2), horimetro_na_execucao=0,
+            ),
+        ])
+        self.assertGreater(novo.pk, max(r.pk for r in registros))
+
+        # Poda: um mês só lê a partição dele
+        plano = RegistroManutencao.objects.filter(
+            data_ocorrencia__gte=date(2026, 3, 1), data_ocorrencia__lt=date(2026, 4, 1),
+        ).explain()
+        self.assertIn(nome_particao(tabela, date(2026, 3, 1)), plano)
+        for mes in (1, 2, 4):
+            self.assertNotIn(nome_particao(tabela, date(2026, mes, 1)), plano)
+        self.assertNotIn(f'{tabela}_padrao', plano)
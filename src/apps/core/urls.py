@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import EstatisticasCacheView
+
+app_name = 'core'
+
+urlpatterns = [
+    path('cache/', EstatisticasCacheView.as_view(), name='estatisticas_cache'),
+]
@@ -0,0 +1,16 @@
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import JsonResponse
+from django.views import View
+
+from .cache import estatisticas
+
+
+class EstatisticasCacheView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Hits/misses do cache por escopo (todos os tenants somados) neste processo, para dimensionar o backend."""
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({'cache': estatisticas()})
@@ -0,0 +1,113 @@
+from functools import partial
+
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from src.apps.components.models import PlanoPreventiva
+from src.apps.core.cache import cache_preventivas
+from src.apps.core.tenancy import TODOS_OS_TENANTS, todos_os_tenants
+from src.apps.inventory.models import EstoqueItem
+
+LIMITE_ESTOQUE_BAIXO = 50
+
+
+# ==========================================================
+# 1. CONTAGENS DE PREVENTIVAS (GROUP BY no banco)
+# ==========================================================
+
+def _contagens(hoje):
+    # Mesmas regras de PlanoPreventivaQuerySet.vencidos / em_atencao
+    vencido = Q(saldo_contador__lt=0) | Q(data_vencimento__lt=hoje)
+    atencao = (
+        Q(saldo_contador__gte=0, saldo_alerta__lte=0)
+        | Q(data_vencimento__gte=hoje, data_alerta__lte=hoje)
+    )
+    return {
+        'vencidos': Count('pk', filter=vencido),
+        'atencao': Count('pk', filter=atencao),
+        'total': Count('pk'),
+    }
+
+
+def _do_tenant(qs, tenant_id):
+    # TODOS_OS_TENANTS: superusuário sem empresa (mesma regra do TenantModelAdmin)
+    return qs if tenant_id is TODOS_OS_TENANTS else qs.filter(tenant_id=tenant_id)
+
+
+def _com_em_dia(linhas):
+    for linha in linhas:
+        linha['em_dia'] = linha['total'] - linha['vencidos'] - linha['atencao']
+    return linhas
+
+
+def _calcular_visao_geral(tenant_id, hoje):
+    # Só planos com ativo (ativo_pai): posição solta não tem contador nem entra no detalhamento
+    planos = _do_tenant(PlanoPreventiva.objects, tenant_id).filter(
+        Q(posicao__motor__isnull=False) | Q(posicao__equipamento__isnull=False)
+    ).order_by()
+    contagens = _contagens(hoje)
+
+    por_motor = (
+        planos.filter(posicao__motor__isnull=False)
+        .values(ativo_id=F('posicao__motor_id'), nome=F('posicao__motor__nome'))
+        .annotate(**contagens)
+        .order_by('-vencidos', '-atencao', 'nome')
+    )
+    # Mesma regra de ativo_pai: posição com Motor conta só no Motor
+    por_equipamento = (
+        planos.filter(posicao__motor__isnull=True, posicao__equipamento__isnull=False)
+        .values(ativo_id=F('posicao__equipamento_id'), nome=F('posicao__equipamento__nome'))
+        .annotate(**contagens)
+        .order_by('-vencidos', '-atencao', 'nome')
+    )
+    # Grupos são por ativo (um "Ignição" por motor): a frota soma pelo slug
+    por_grupo = (
+        planos.filter(posicao__grupo__isnull=False)
+        .values(slug=F('posicao__grupo__slug'))
+        .annotate(nome=Max('posicao__grupo__nome'), **contagens)
+        .order_by('-vencidos', '-atencao', 'nome')
+    )
+    return {
+        'hoje': hoje,
+        'tenant': _com_em_dia([planos.aggregate(**contagens)])[0],
+        'motores': _com_em_dia(list(por_motor)),
+        'equipamentos': _com_em_dia(list(por_equipamento)),
+        'grupos': _com_em_dia(list(por_grupo)),
+    }
+
+
+def visao_geral(tenant_id, hoje=None):
+    """
+    Contagens vencido / atenção / em dia dos planos por Motor, Equipamento,
+    grupo e do tenant inteiro: 4 queries agregadas sobre as colunas de
+    vencimento materializadas, sem percorrer posições.
+
+    Fica em cache_preventivas por dia: invalidado depois de cada manutenção,
+    leitura de contador ou plano alterado. Com TODOS_OS_TENANTS (a frota de
+    todas as empresas) vai sempre ao banco, porque a invalidação é por tenant.
+    """
+    hoje = hoje or timezone.localdate()
+    if tenant_id is TODOS_OS_TENANTS:
+        with todos_os_tenants():
+            return _calcular_visao_geral(tenant_id, hoje)
+    return cache_preventivas.obter(
+        tenant_id, ('painel', hoje.isoformat()), partial(_calcular_visao_geral, tenant_id, hoje),
+    )
+
+
+# ==========================================================
+# 2. ESTOQUE BAIXO (sempre do banco)
+# ==========================================================
+
+def itens_estoque_baixo(tenant_id, limite=LIMITE_ESTOQUE_BAIXO):
+    """
+    Itens no mínimo de segurança ou abaixo dele. Fora do cache: uma query só,
+    e um ajuste manual de estoque aparece na hora.
+    """
+    return list(
+        _do_tenant(EstoqueItem.objects, tenant_id).filter(
+            minimo_seguranca__gt=0, quantidade__lte=F('minimo_seguranca'),
+        )
+        .order_by(F('quantidade') - F('minimo_seguranca'), 'catalogo__nome')
+        .values('pk', 'quantidade', 'minimo_seguranca', peca=F('catalogo__nome'), nome_local=F('local__nome'))[:limite]
+    )
@@ -0,0 +1,86 @@
+from datetime import date
+
+from django.test import TestCase
+from django.urls import reverse
+
+from src.apps.assets.models import MarcaMotor, ModeloMotor, Motor
+from src.apps.components.models import PlanoPreventiva, PosicaoComponente
+from src.apps.core.models import Tenant, User
+from src.apps.inventory.models import CategoriaPeca, CatalogoPeca, EstoqueItem, LocalEstoque
+from .services import visao_geral
+
+
+class PainelTests(TestCase):
+    """Contagens agregadas no banco, em cache até o próximo contador/manutenção."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(nome="Empresa Teste")
+        marca = MarcaMotor.objects.create(tenant=cls.tenant, nome="Jenbacher")
+        modelo = ModeloMotor.objects.create(tenant=cls.tenant, marca=marca, nome="J620")
+        cls.motor = Motor.objects.create(
+            tenant=cls.tenant, nome="GMG 1", modelo=modelo, numero_serie="1", localizacao="Sala 1",
+            qtd_cilindros=4, horas_totais=1200,
+        )
+        vela = PosicaoComponente.objects.filter(motor=cls.motor, nome_base="Vela de Ignição").first()
+        # Saldos: -100 h (vencido), 50 h (atenção), 800 h (em dia)
+        for ultima in (100, 250, 1000):
+            PlanoPreventiva.objects.create(
+                tenant=cls.tenant, posicao=vela, tarefa=f"Troca {ultima}", tipo_servico='SUBSTITUICAO',
+                unidade='HORAS', intervalo_valor=1000, ultima_execucao_valor=ultima,
+            )
+        categoria = CategoriaPeca.objects.create(tenant=cls.tenant, nome="Ignição")
+        catalogo = CatalogoPeca.objects.create(tenant=cls.tenant, nome="Vela", categoria=categoria)
+        local = LocalEstoque.objects.create(tenant=cls.tenant, nome="Armário A")
+        EstoqueItem.objects.create(tenant=cls.tenant, catalogo=catalogo, local=local, quantidade=1, minimo_seguranca=2)
+        cls.user = User.objects.create_superuser(email="admin@teste.com", password="x", tenant=cls.tenant)
+
+    def test_contagens_cache_e_invalidacao(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard:painel'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Armário A")
+
+        painel = response.context['painel']
+        self.assertEqual(
+            {k: painel['tenant'][k] for k in ('vencidos', 'atencao', 'em_dia')},
+            {'vencidos': 1, 'atencao': 1, 'em_dia': 1},
+        )
+        self.assertEqual([m['nome'] for m in painel['motores']], ["GMG 1"])
+        self.assertEqual([g['slug'] for g in painel['grupos']], ['cilindros'])
+
+        with self.assertNumQueries(0):
+            visao_geral(self.tenant.pk)
+
+        # Horímetro novo: o plano em atenção vence e o painel é recalculado
+        with self.captureOnCommitCallbacks(execute=True):
+            self.motor.horas_totais = 1300
+            self.motor.save()
+        self.assertEqual(visao_geral(self.tenant.pk)['tenant']['vencidos'], 2)
+
+    def test_superusuario_sem_empresa_ve_a_frota_toda(self):
+        outra = Tenant.objects.create(nome="Outra Empresa")
+        marca = MarcaMotor.objects.create(tenant=outra, nome="Cummins")
+        motor = Motor.objects.create(
+            tenant=outra, nome="GMG 9", modelo=ModeloMotor.objects.create(tenant=outra, marca=marca, nome="QSK"),
+            numero_serie="9", localizacao="-", qtd_cilindros=4, horas_totais=500,
+        )
+        vela = PosicaoComponente.objects.filter(motor=motor, nome_base="Vela de Ignição").first()
+        PlanoPreventiva.objects.create(
+            tenant=outra, posicao=vela, tarefa="Troca", tipo_servico='SUBSTITUICAO',
+            unidade='HORAS', intervalo_valor=100, ultima_execucao_valor=300,
+        )
+        # Posição sem ativo: fica fora do total, como fica fora do detalhamento por ativo
+        solta = PosicaoComponente.objects.create(tenant=self.tenant, nome="Reserva")
+        PlanoPreventiva.objects.create(
+            tenant=self.tenant, posicao=solta, tarefa="Inspeção", tipo_servico='INSPECAO',
+            unidade='DIAS', intervalo_valor=10, ultima_execucao_data=date(2020, 1, 1),
+        )
+        self.assertEqual(visao_geral(self.tenant.pk)['tenant']['total'], 3)
+
+        admin = User.objects.create_superuser(email="root@teste.com", password="x")
+        self.client.force_login(admin)
+        painel = self.client.get(reverse('dashboard:painel')).context['painel']
+        self.assertEqual((painel['tenant']['total'], painel['tenant']['vencidos']), (4, 2))
+        self.assertEqual(painel['tenant']['total'], sum(m['total'] for m in painel['motores']))
+        self.assertEqual(sorted(m['nome'] for m in painel['motores']), ["GMG 1", "GMG 9"])
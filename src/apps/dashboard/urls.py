@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import PainelView
+
+app_name = 'dashboard'
+
+urlpatterns = [
+    path('', PainelView.as_view(), name='painel'),
+]
@@ -0,0 +1,20 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.views.generic import TemplateView
+
+from src.apps.core.tenancy import TODOS_OS_TENANTS
+
+from .services import itens_estoque_baixo, visao_geral
+
+
+class PainelView(LoginRequiredMixin, TemplateView):
+    """Visão geral da frota: situação das preventivas e estoque baixo."""
+    template_name = 'dashboard/painel.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        user = self.request.user
+        # Mesma regra do TenantModelAdmin: superusuário sem empresa vê todas
+        tenant_id = TODOS_OS_TENANTS if user.is_superuser and not user.tenant_id else user.tenant_id
+        context['painel'] = visao_geral(tenant_id)
+        context['estoque_baixo'] = itens_estoque_baixo(tenant_id)
+        return context
@@ -1,9 +1,12 @@
+from django import forms
 from django.contrib import admin
+from django.core.exceptions import ValidationError
 from src.apps.core.admin import TenantModelAdmin
 from .models import (
     CategoriaPeca, CatalogoPeca, EstoqueItem, 
     MovimentoEstoque, SerialPeca, Fabricante, LocalEstoque
 )
+from .services import baixar_movimentos, registrar_movimentos
 
 @admin.register(Fabricante)
 class FabricanteAdmin(TenantModelAdmin):
@@ -141,8 +144,43 @@ class EstoqueAdmin(TenantModelAdmin):
             instance.save()
         formset.save_m2m()
 
+class MovimentoEstoqueForm(forms.ModelForm):
+    class Meta:
+        model = MovimentoEstoque
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        item = cleaned_data.get('item')
+        quantidade = cleaned_data.get('quantidade')
+        if cleaned_data.get('tipo') == 'SAIDA' and item and quantidade:
+            # Conferência para o form; a baixa de verdade é condicional no UPDATE
+            if abs(quantidade) > item.quantidade:
+                raise ValidationError(f"Estoque insuficiente. Disponível: {item.quantidade}")
+        return cleaned_data
+
+
 @admin.register(MovimentoEstoque)
 class MovimentoAdmin(TenantModelAdmin):
+    form = MovimentoEstoqueForm
     list_display = ('data_movimento', 'tipo', 'item', 'quantidade', 'origem')
     list_filter = ('tipo', 'data_movimento')
-    search_fields = ('item__catalogo__nome', 'origem')
\ No newline at end of file
+    search_fields = ('item__catalogo__nome', 'origem')
+    list_select_related = ('item__catalogo', 'item__local')
+    autocomplete_fields = ['item']
+
+    # Razão append-only: movimentos são lançados, nunca editados ou apagados
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        if not obj.tenant_id:
+            obj.tenant_id = request.user.tenant_id
+        if obj.tipo != 'SAIDA':
+            registrar_movimentos([obj])
+        elif not baixar_movimentos([obj]):
+            # Outra baixa consumiu o saldo entre a validação do form e o UPDATE
+            raise ValidationError("Estoque insuficiente: a saída não foi lançada.")
\ No newline at end of file
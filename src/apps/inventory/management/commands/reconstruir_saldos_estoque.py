@@ -0,0 +1,41 @@
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from src.apps.inventory.models import EstoqueItem
+from src.apps.inventory.services import reconstruir_saldos
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula o saldo em cache dos itens de estoque a partir do razão "
+        "(MovimentoEstoque), em lotes, e grava checkpoints novos. Rodado "
+        "periodicamente, mantém 'saldo na data' e a conciliação proporcionais "
+        "aos movimentos desde o último checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=uuid.UUID, help="Só os itens deste tenant (id)")
+        parser.add_argument('--lote', type=int, default=500, help="Itens por transação")
+        parser.add_argument(
+            '--completo', action='store_true',
+            help="Ignora os checkpoints e soma o histórico inteiro de cada item",
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Só lista as divergências, sem corrigir nem gravar checkpoints",
+        )
+
+    def handle(self, *args, **opts):
+        itens = EstoqueItem.objects.all()
+        if opts['tenant']:
+            itens = itens.filter(tenant_id=opts['tenant'])
+
+        divergencias = reconstruir_saldos(
+            itens, lote=opts['lote'], completo=opts['completo'], gravar=not opts['dry_run'],
+        )
+
+        for item_id, cache, razao in divergencias:
+            self.stdout.write(f"Item {item_id}: saldo em cache {cache}, razão {razao}")
+        acao = "encontradas" if opts['dry_run'] else "corrigidas"
+        self.stdout.write(self.style.SUCCESS(f"{len(divergencias)} divergência(s) {acao}."))
@@ -0,0 +1,120 @@
+# Generated by Django 5.2.10 on 2026-10-18 16:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def abrir_razao(apps, schema_editor):
+    # Saídas antigas passam a ter sinal negativo e cada item ganha um
+    # movimento de abertura, para que o razão some o saldo atual.
+    EstoqueItem = apps.get_model("inventory", "EstoqueItem")
+    MovimentoEstoque = apps.get_model("inventory", "MovimentoEstoque")
+    MovimentoEstoque.objects.filter(tipo="SAIDA", quantidade__gt=0).update(
+        quantidade=-models.F("quantidade")
+    )
+    somas = dict(
+        MovimentoEstoque.objects.order_by()
+        .values("item_id")
+        .annotate(soma=Sum("quantidade"))
+        .values_list("item_id", "soma")
+    )
+    abertura = []
+    itens = EstoqueItem.objects.values_list("id", "tenant_id", "quantidade")
+    for pk, tenant_id, quantidade in itens.iterator(chunk_size=2000):
+        diferenca = quantidade - (somas.get(pk) or 0)
+        if diferenca:
+            abertura.append(
+                MovimentoEstoque(
+                    tenant_id=tenant_id,
+                    item_id=pk,
+                    tipo="AJUSTE",
+                    quantidade=diferenca,
+                    origem="Saldo inicial",
+                )
+            )
+    MovimentoEstoque.objects.bulk_create(abertura, batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0001_initial"),
+        ("inventory", "0006_alter_catalogopeca_codigo_fabricante_fabricante_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CheckpointEstoque",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("ultimo_movimento_id", models.BigIntegerField()),
+                (
+                    "data",
+                    models.DateTimeField(
+                        help_text="Data do último movimento consolidado"
+                    ),
+                ),
+                ("saldo", models.IntegerField()),
+                ("criado_em", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Checkpoint de Estoque",
+                "verbose_name_plural": "Checkpoints de Estoque",
+                "ordering": ["-data"],
+            },
+        ),
+        migrations.AlterField(
+            model_name="movimentoestoque",
+            name="quantidade",
+            field=models.IntegerField(
+                help_text="Variação do saldo: positiva na entrada, negativa na saída"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="movimentoestoque",
+            index=models.Index(fields=["item", "id"], name="movimento_item_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="movimentoestoque",
+            index=models.Index(
+                fields=["item", "data_movimento"], name="movimento_item_data_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="checkpointestoque",
+            name="item",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="checkpoints",
+                to="inventory.estoqueitem",
+            ),
+        ),
+        migrations.AddField(
+            model_name="checkpointestoque",
+            name="tenant",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to="core.tenant"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="checkpointestoque",
+            index=models.Index(
+                fields=["item", "ultimo_movimento_id"], name="checkpoint_item_mov_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="checkpointestoque",
+            index=models.Index(
+                fields=["item", "data"], name="checkpoint_item_data_idx"
+            ),
+        ),
+        migrations.RunPython(abrir_razao, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.10 on 2026-10-18 16:52
+
+from django.db import migrations, models
+
+
+def zerar_negativos(apps, schema_editor):
+    # Saldos negativos (da época do ler-modificar-salvar) viram zero com um AJUSTE no razão
+    EstoqueItem = apps.get_model("inventory", "EstoqueItem")
+    MovimentoEstoque = apps.get_model("inventory", "MovimentoEstoque")
+    negativos = list(
+        EstoqueItem.objects.filter(quantidade__lt=0).values_list(
+            "id", "tenant_id", "quantidade"
+        )
+    )
+    MovimentoEstoque.objects.bulk_create(
+        [
+            MovimentoEstoque(
+                tenant_id=tenant_id,
+                item_id=pk,
+                tipo="AJUSTE",
+                quantidade=-quantidade,
+                origem="Saldo negativo zerado",
+            )
+            for pk, tenant_id, quantidade in negativos
+        ],
+        batch_size=500,
+    )
+    EstoqueItem.objects.filter(quantidade__lt=0).update(quantidade=0)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0001_initial"),
+        ("inventory", "0007_razao_estoque"),
+    ]
+
+    operations = [
+        migrations.RunPython(zerar_negativos, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="estoqueitem",
+            constraint=models.CheckConstraint(
+                condition=models.Q(("quantidade__gte", 0)),
+                name="estoque_quantidade_nao_negativa",
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0001_initial"),
+        ("inventory", "0008_estoque_quantidade_nao_negativa"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="estoqueitem",
+            index=models.Index(
+                fields=["tenant", "local"], name="estoque_tenant_local_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="movimentoestoque",
+            index=models.Index(
+                fields=["tenant", "data_movimento"], name="movimento_tenant_data_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="movimentoestoque",
+            index=models.Index(
+                fields=["tenant", "item", "id"], name="movimento_tenant_item_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="serialpeca",
+            index=models.Index(
+                fields=["tenant", "item_estoque"], name="serial_tenant_item_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="serialpeca",
+            index=models.Index(
+                fields=["tenant", "serial_number"], name="serial_tenant_numero_idx"
+            ),
+        ),
+    ]
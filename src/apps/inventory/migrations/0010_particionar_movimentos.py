@@ -0,0 +1,24 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:40
+
+from django.db import migrations
+
+from src.apps.core.particoes import desparticionar_tabela, particionar_tabela
+
+
+def particionar(apps, schema_editor):
+    # PostgreSQL: partição por mês de data_movimento; outros bancos: nada muda
+    particionar_tabela(schema_editor, "inventory_movimentoestoque", "data_movimento")
+
+
+def desparticionar(apps, schema_editor):
+    desparticionar_tabela(schema_editor, "inventory_movimentoestoque", "data_movimento")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("inventory", "0009_indices_por_tenant"),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, desparticionar),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from src.apps.core.models import TenantAwareModel
 
@@ -143,11 +143,49 @@ class EstoqueItem(TenantAwareModel):
     class Meta:
         verbose_name = "Item em Estoque"
         verbose_name_plural = "Itens em Estoque"
+        # A unique (tenant, catalogo, local) já serve à busca por peça
         unique_together = ('tenant', 'catalogo', 'local')
+        indexes = [
+            models.Index(fields=['tenant', 'local'], name='estoque_tenant_local_idx'),
+        ]
+        constraints = [
+            # Rede de segurança da baixa condicional: o banco nunca aceita saldo negativo
+            models.CheckConstraint(condition=models.Q(quantidade__gte=0), name='estoque_quantidade_nao_negativa'),
+        ]
 
     def __str__(self):
         return f"{self.catalogo.nome} em {self.local.nome}: {self.quantidade}"
 
+    def save(self, *args, **kwargs):
+        """
+        A quantidade é o saldo em cache do razão (MovimentoEstoque).
+        Alterar a quantidade direto no save() vira um movimento: ENTRADA do
+        saldo inicial na criação, AJUSTE pela diferença nas edições.
+        """
+        novo = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'quantidade' not in update_fields:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            anterior = 0
+            if not novo:
+                # Travado até o COMMIT: uma baixa concorrente não cai entre a leitura e a gravação
+                anterior = (
+                    EstoqueItem.objects.select_for_update().filter(pk=self.pk)
+                    .values_list('quantidade', flat=True).first() or 0
+                )
+            super().save(*args, **kwargs)
+            diferenca = self.quantidade - anterior
+            if diferenca:
+                MovimentoEstoque.objects.create(
+                    tenant_id=self.tenant_id,
+                    item=self,
+                    tipo='ENTRADA' if novo else 'AJUSTE',
+                    quantidade=diferenca,
+                    origem="Saldo inicial" if novo else "Ajuste manual",
+                )
+
 # --- TABELA DE SERIAIS INDIVIDUAIS (Filhos do EstoqueItem) ---
 class SerialPeca(TenantAwareModel):
     item_estoque = models.ForeignKey(EstoqueItem, on_delete=models.CASCADE, related_name='seriais')
@@ -158,6 +196,11 @@ class SerialPeca(TenantAwareModel):
         verbose_name = "Serial Individual"
         verbose_name_plural = "Seriais em Estoque"
         unique_together = ('item_estoque', 'serial_number') 
+        indexes = [
+            models.Index(fields=['tenant', 'item_estoque'], name='serial_tenant_item_idx'),
+            # Rastreio de uma peça pelo nº de série, sem saber o item
+            models.Index(fields=['tenant', 'serial_number'], name='serial_tenant_numero_idx'),
+        ]
 
     def __str__(self):
         return f"SN: {self.serial_number}"
@@ -172,7 +215,7 @@ class MovimentoEstoque(TenantAwareModel):
     
     item = models.ForeignKey(EstoqueItem, on_delete=models.CASCADE, related_name='movimentos')
     tipo = models.CharField(max_length=20, choices=TIPO_MOVIMENTO)
-    quantidade = models.IntegerField()
+    quantidade = models.IntegerField(help_text="Variação do saldo: positiva na entrada, negativa na saída")
     data_movimento = models.DateTimeField(auto_now_add=True)
     origem = models.CharField(max_length=100, help_text="Ex: Manutenção #123", blank=True, null=True)
     
@@ -180,6 +223,41 @@ class MovimentoEstoque(TenantAwareModel):
         verbose_name = "Movimento de Estoque"
         verbose_name_plural = "Histórico de Movimentações"
         ordering = ['-data_movimento']
+        indexes = [
+            # Razão por item: saldo desde o checkpoint e histórico por data
+            models.Index(fields=['item', 'id'], name='movimento_item_id_idx'),
+            models.Index(fields=['item', 'data_movimento'], name='movimento_item_data_idx'),
+            # Histórico de movimentações (ordem padrão) e razão de um item dentro do tenant
+            models.Index(fields=['tenant', 'data_movimento'], name='movimento_tenant_data_idx'),
+            models.Index(fields=['tenant', 'item', 'id'], name='movimento_tenant_item_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.quantidade} un"
+
+
+# --- CHECKPOINTS DO RAZÃO ---
+class CheckpointEstoque(TenantAwareModel):
+    """
+    Saldo consolidado de um item até um movimento (inclusive).
+    Saldo numa data = último checkpoint antes dela + movimentos posteriores,
+    sem somar o histórico inteiro.
+    """
+    item = models.ForeignKey(EstoqueItem, on_delete=models.CASCADE, related_name='checkpoints')
+    # Inteiro (e não FK): o checkpoint continua válido se o movimento for arquivado
+    ultimo_movimento_id = models.BigIntegerField()
+    data = models.DateTimeField(help_text="Data do último movimento consolidado")
+    saldo = models.IntegerField()
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Checkpoint de Estoque"
+        verbose_name_plural = "Checkpoints de Estoque"
+        ordering = ['-data']
+        indexes = [
+            models.Index(fields=['item', 'ultimo_movimento_id'], name='checkpoint_item_mov_idx'),
+            models.Index(fields=['item', 'data'], name='checkpoint_item_data_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.get_tipo_display()} - {self.quantidade} un"
\ No newline at end of file
+        return f"{self.item_id} até #{self.ultimo_movimento_id}: {self.saldo}"
\ No newline at end of file
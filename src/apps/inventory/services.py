@@ -0,0 +1,183 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from src.apps.core.tenancy import todos_os_tenants
+from src.apps.inventory.models import EstoqueItem, MovimentoEstoque, CheckpointEstoque
+
+
+# ==========================================================
+# RAZÃO DE ESTOQUE
+# ==========================================================
+# Toda alteração de saldo grava um MovimentoEstoque (append-only) e
+# EstoqueItem.quantidade é só o saldo em cache. O sinal do movimento
+# é o da variação: ENTRADA positiva, SAIDA negativa, AJUSTE qualquer.
+
+def _delta(tipo: str, quantidade: int) -> int:
+    if tipo == 'ENTRADA':
+        return abs(quantidade)
+    if tipo == 'SAIDA':
+        return -abs(quantidade)
+    return quantidade
+
+
+@transaction.atomic
+def registrar_movimentos(movimentos) -> list:
+    """
+    Grava movimentos de entrada/ajuste (um INSERT) e aplica a variação no
+    saldo em cache: um UPDATE com F() por item, sem ler-modificar-salvar.
+    Saídas que não podem deixar o saldo negativo usam baixar_estoque.
+    """
+    variacao = defaultdict(int)
+    for movimento in movimentos:
+        movimento.quantidade = _delta(movimento.tipo, movimento.quantidade)
+        variacao[movimento.item_id] += movimento.quantidade
+
+    criados = MovimentoEstoque.objects.bulk_create(movimentos)
+    for item_id, delta in variacao.items():
+        if delta:
+            EstoqueItem.objects.filter(pk=item_id).update(quantidade=F('quantidade') + delta)
+    return criados
+
+
+def baixar_movimentos(movimentos) -> bool:
+    """
+    Lança saídas do mesmo item: um único UPDATE condicional pelo total (só
+    desconta se ainda houver saldo) e um INSERT com os movimentos de SAIDA.
+
+    Retorna False (e não grava nada) se o estoque for insuficiente.
+    """
+    movimentos = [m for m in movimentos if m.quantidade]
+    if not movimentos:
+        return True
+    item_id = movimentos[0].item_id
+    total = 0
+    for movimento in movimentos:
+        movimento.tipo = 'SAIDA'
+        movimento.quantidade = _delta('SAIDA', movimento.quantidade)
+        total -= movimento.quantidade
+
+    with transaction.atomic():
+        baixou = EstoqueItem.objects.filter(pk=item_id, quantidade__gte=total).update(
+            quantidade=F('quantidade') - total
+        )
+        if not baixou:
+            return False
+        MovimentoEstoque.objects.bulk_create(movimentos)
+    return True
+
+
+def baixar_estoque_em_partes(item_id: int, partes, *, tenant_id: int) -> bool:
+    """
+    Baixa de várias saídas do mesmo item (ver baixar_movimentos), com um
+    movimento por parte. `partes` é uma lista de (quantidade, origem).
+    """
+    return baixar_movimentos([
+        MovimentoEstoque(tenant_id=tenant_id, item_id=item_id, quantidade=quantidade, origem=origem)
+        for quantidade, origem in partes
+        if quantidade > 0
+    ])
+
+
+def baixar_estoque(item_id: int, quantidade: int, *, tenant_id: int, origem: str = None) -> bool:
+    """
+    Baixa condicional em um único UPDATE: só desconta se ainda houver saldo.
+    Sem ler-modificar-salvar, duas baixas simultâneas nunca deixam o saldo negativo.
+
+    Retorna False (e não altera nada) se o estoque for insuficiente.
+    """
+    return baixar_estoque_em_partes(item_id, [(quantidade, origem)], tenant_id=tenant_id)
+
+
+# ==========================================================
+# SALDOS A PARTIR DO RAZÃO (CHECKPOINTS)
+# ==========================================================
+
+def saldo_em(item_id: int, data) -> int:
+    """
+    Saldo do item no instante `data`: último checkpoint até a data + soma dos
+    movimentos posteriores a ele (custo proporcional aos movimentos desde o
+    checkpoint, não ao histórico inteiro).
+    """
+    checkpoint = (
+        CheckpointEstoque.objects.filter(item_id=item_id, data__lte=data)
+        .order_by('-ultimo_movimento_id')
+        .values('saldo', 'ultimo_movimento_id')
+        .first()
+    ) or {'saldo': 0, 'ultimo_movimento_id': 0}
+
+    soma = MovimentoEstoque.objects.filter(
+        item_id=item_id, id__gt=checkpoint['ultimo_movimento_id'], data_movimento__lte=data,
+    ).aggregate(soma=Sum('quantidade'))['soma']
+    return checkpoint['saldo'] + (soma or 0)
+
+
+def _saldos_do_razao(itens, completo: bool):
+    """
+    Anota em cada item o saldo pelo razão (um SELECT para o lote inteiro):
+    checkpoint mais recente (ou zero se `completo`) + movimentos posteriores.
+    """
+    movimentos = MovimentoEstoque.objects.filter(item=OuterRef('pk')).order_by()
+    if completo:
+        itens = itens.annotate(ck_saldo=Value(0), ck_mov=Value(0))
+    else:
+        checkpoint = CheckpointEstoque.objects.filter(item=OuterRef('pk')).order_by('-ultimo_movimento_id')
+        itens = itens.annotate(
+            ck_saldo=Coalesce(Subquery(checkpoint.values('saldo')[:1]), 0),
+            ck_mov=Coalesce(Subquery(checkpoint.values('ultimo_movimento_id')[:1]), 0),
+        )
+    posteriores = movimentos.filter(id__gt=OuterRef('ck_mov'))
+    return itens.annotate(
+        soma=Coalesce(Subquery(posteriores.values('item').annotate(s=Sum('quantidade')).values('s')), 0),
+        ultimo_mov=Subquery(posteriores.values('item').annotate(m=Max('id')).values('m')),
+        ultima_data=Subquery(posteriores.order_by('-id').values('data_movimento')[:1]),
+    )
+
+
+def reconstruir_saldos(itens=None, *, lote: int = 500, completo: bool = False, gravar: bool = True):
+    """
+    Recalcula EstoqueItem.quantidade a partir do razão, em lotes de itens:
+    por lote, trava os itens (em ordem de id), lê os saldos num SELECT,
+    corrige as divergências com bulk_update e grava um checkpoint novo para
+    os itens que tiveram movimentos desde o último.
+
+    `completo` ignora os checkpoints e soma o histórico inteiro; `gravar=False`
+    só reporta. Retorna a lista de divergências (item_id, cache, razão).
+    Os lotes (que podem misturar tenants) rodam fora do filtro do contexto;
+    quem restringe é o queryset `itens`.
+    """
+    itens = EstoqueItem.objects.all() if itens is None else itens
+    ids = list(itens.order_by('id').values_list('id', flat=True))
+    with todos_os_tenants():
+        return _reconstruir_lotes(ids, lote, completo, gravar)
+
+
+def _reconstruir_lotes(ids, lote, completo, gravar):
+    divergencias = []
+    for inicio in range(0, len(ids), lote):
+        fatia = ids[inicio:inicio + lote]
+        with transaction.atomic():
+            travados = EstoqueItem.objects.filter(id__in=fatia).order_by('id')
+            if gravar:
+                # Baixas concorrentes esperam o lote: cache e razão ficam coerentes
+                list(travados.select_for_update().values_list('id', flat=True))
+
+            corrigir, checkpoints = [], []
+            for item in _saldos_do_razao(travados, completo).only('id', 'tenant_id', 'quantidade'):
+                saldo = item.ck_saldo + item.soma
+                if saldo != item.quantidade:
+                    divergencias.append((item.pk, item.quantidade, saldo))
+                    item.quantidade = saldo
+                    corrigir.append(item)
+                if item.ultimo_mov:
+                    checkpoints.append(CheckpointEstoque(
+                        tenant_id=item.tenant_id, item_id=item.pk, saldo=saldo,
+                        ultimo_movimento_id=item.ultimo_mov, data=item.ultima_data,
+                    ))
+
+            if gravar:
+                EstoqueItem.objects.bulk_update(corrigir, ['quantidade'])
+                CheckpointEstoque.objects.bulk_create(checkpoints)
+
+    return divergencias
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from src.apps.core.models import Tenant
+from .models import CategoriaPeca, CatalogoPeca, CheckpointEstoque, EstoqueItem, LocalEstoque, MovimentoEstoque
+from .services import baixar_estoque, baixar_estoque_em_partes, reconstruir_saldos, saldo_em
+
+
+class RazaoEstoqueTests(TestCase):
+    """Toda alteração de saldo vira movimento; a quantidade é o saldo em cache do razão."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(nome="Empresa Teste")
+        categoria = CategoriaPeca.objects.create(tenant=cls.tenant, nome="Ignição")
+        cls.catalogo = CatalogoPeca.objects.create(tenant=cls.tenant, nome="Vela", categoria=categoria)
+        cls.local = LocalEstoque.objects.create(tenant=cls.tenant, nome="Armário A")
+
+    def setUp(self):
+        self.item = EstoqueItem.objects.create(tenant=self.tenant, catalogo=self.catalogo, local=self.local, quantidade=10)
+
+    def saldo_razao(self):
+        return MovimentoEstoque.objects.filter(item=self.item).aggregate(s=Sum('quantidade'))['s']
+
+    def test_movimentos_acompanham_o_saldo(self):
+        self.assertTrue(baixar_estoque_em_partes(
+            self.item.pk, [(2, "Manutenção #1"), (3, "Manutenção #2")], tenant_id=self.tenant.pk,
+        ))
+        self.assertFalse(baixar_estoque(self.item.pk, 6, tenant_id=self.tenant.pk))
+
+        self.item.quantidade = 8  # ajuste de inventário pelo save()
+        self.item.save()
+
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantidade, 8)
+        self.assertEqual(self.saldo_razao(), 8)
+        self.assertEqual(
+            list(MovimentoEstoque.objects.filter(item=self.item).order_by('id').values_list('tipo', 'quantidade')),
+            [('ENTRADA', 10), ('SAIDA', -2), ('SAIDA', -3), ('AJUSTE', 3)],
+        )
+
+    def test_reconstrucao_e_saldo_na_data(self):
+        baixar_estoque(self.item.pk, 4, tenant_id=self.tenant.pk, origem="Manutenção #1")
+        EstoqueItem.objects.filter(pk=self.item.pk).update(quantidade=99)  # cache corrompido
+
+        self.assertEqual(reconstruir_saldos(gravar=False), [(self.item.pk, 99, 6)])
+        self.assertFalse(CheckpointEstoque.objects.exists())
+
+        self.assertEqual(reconstruir_saldos(), [(self.item.pk, 99, 6)])
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantidade, 6)
+        checkpoint = CheckpointEstoque.objects.get(item=self.item)
+        self.assertEqual(checkpoint.saldo, 6)
+
+        # Depois do checkpoint só os movimentos novos entram na conta
+        MovimentoEstoque.objects.filter(pk__lte=checkpoint.ultimo_movimento_id).delete()
+        baixar_estoque(self.item.pk, 1, tenant_id=self.tenant.pk)
+        self.assertEqual(reconstruir_saldos(), [])
+        self.assertEqual(saldo_em(self.item.pk, timezone.now()), 5)
+        self.assertEqual(saldo_em(self.item.pk, checkpoint.data), 6)
+        self.assertEqual(saldo_em(self.item.pk, checkpoint.data - timedelta(days=1)), 0)
+
+    def test_comando_por_tenant(self):
+        outro = Tenant.objects.create(nome="Outra Empresa")
+        item_outro = EstoqueItem.objects.create(
+            tenant=outro, local=LocalEstoque.objects.create(tenant=outro, nome="Armário B"), quantidade=3,
+            catalogo=CatalogoPeca.objects.create(tenant=outro, nome="Vela", categoria=self.catalogo.categoria),
+        )
+        EstoqueItem.objects.filter(pk__in=[self.item.pk, item_outro.pk]).update(quantidade=99)
+
+        saida = StringIO()
+        call_command('reconstruir_saldos_estoque', '--tenant', str(self.tenant.pk), stdout=saida)
+        self.assertIn(f"Item {self.item.pk}: saldo em cache 99, razão 10", saida.getvalue())
+        self.item.refresh_from_db()
+        item_outro.refresh_from_db()
+        self.assertEqual((self.item.quantidade, item_outro.quantidade), (10, 99))
+
+    def test_banco_recusa_saldo_negativo(self):
+        # Mesmo um UPDATE sem a condição de saldo não passa da CHECK constraint
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            EstoqueItem.objects.filter(pk=self.item.pk).update(quantidade=F('quantidade') - 11)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantidade, 10)
@@ -1,8 +1,9 @@
 from django import forms
 from django.contrib import admin
-from src.apps.core.admin import TenantModelAdmin
+from src.apps.core.admin import ChangeListKeyset, FiltroAutocomplete, PaginadorEstimado, TenantModelAdmin
 from src.apps.components.models import PosicaoComponente
 from .models import RegistroManutencao
+from .services import registrar_intervencoes_em_lote
 
 # --- FORMULÁRIO PERSONALIZADO ---
 class RegistroManutencaoForm(forms.ModelForm):
@@ -65,13 +66,33 @@ class RegistroManutencaoForm(forms.ModelForm):
 
         self.fields['selecao_multipla'].queryset = queryset
 
+    def clean(self):
+        cleaned_data = super().clean()
+        # Só o saldo: a baixa na gravação é condicional e desfaria tudo com um erro 500
+        item_estoque = cleaned_data.get('item_estoque')
+        quantidade = cleaned_data.get('quantidade_utilizada') or 0
+        if item_estoque and quantidade > 0:
+            componentes = cleaned_data.get('selecao_multipla')
+            total = quantidade * (len(componentes) if componentes else 1)
+            if total > item_estoque.quantidade:
+                raise forms.ValidationError(f"Estoque insuficiente. Disponível: {item_estoque.quantidade}")
+        return cleaned_data
+
 
 @admin.register(RegistroManutencao)
 class RegistroManutencaoAdmin(TenantModelAdmin):
     form = RegistroManutencaoForm
     # Adicionado equipamento na lista
     list_display = ('data_ocorrencia', 'get_ativo', 'posicao', 'tipo_atividade', 'quantidade_utilizada')
-    list_filter = ('tipo_atividade', 'motor', 'equipamento')
+    # Filtro por data restringe a consulta às partições do período (core.particoes);
+    # ativos com busca, em vez de carregar todos os motores/equipamentos na lateral
+    list_filter = (
+        'data_ocorrencia', 'tipo_atividade',
+        ('motor', FiltroAutocomplete), ('equipamento', FiltroAutocomplete),
+    )
+    # Milhões de registros: paginação por cursor em (data_ocorrencia, id) e total estimado
+    paginator = PaginadorEstimado
+    show_full_result_count = False
     search_fields = ('motor__nome', 'equipamento__nome', 'posicao__nome', 'observacao')
     
     autocomplete_fields = ['motor', 'equipamento', 'item_estoque'] 
@@ -98,6 +119,9 @@ class RegistroManutencaoAdmin(TenantModelAdmin):
         }),
     )
 
+    def get_changelist(self, request, **kwargs):
+        return ChangeListKeyset
+
     def get_ativo(self, obj):
         return obj.motor if obj.motor else obj.equipamento
     get_ativo.short_description = "Ativo"
@@ -129,32 +153,26 @@ class RegistroManutencaoAdmin(TenantModelAdmin):
                 obj.save()
             return
 
-        # 3. Lógica da Multiplicação (Explosão de Registros)
-        qtd_individual = obj.quantidade_utilizada
-        
-        dados_base = {
-            'tenant_id': obj.tenant_id,
-            'data_ocorrencia': obj.data_ocorrencia,
-            'motor': obj.motor,
-            'equipamento': obj.equipamento, # Importante passar o equipamento
-            'horimetro_na_execucao': obj.horimetro_na_execucao,
-            'arranques_na_execucao': obj.arranques_na_execucao,
-            'tipo_atividade': obj.tipo_atividade,
-            'item_estoque': obj.item_estoque,
-            'quantidade_utilizada': qtd_individual,
-            'responsavel': obj.responsavel,
-            'observacao': obj.observacao,
-            'novo_serial_number': obj.novo_serial_number
-        }
-
-        primeiro = True
-        for componente in componentes:
-            if primeiro:
-                obj.posicao = componente
-                obj.save() 
-                primeiro = False
-            else:
-                RegistroManutencao.objects.create(
-                    posicao=componente,
-                    **dados_base
-                )
\ No newline at end of file
+        # 3. Um registro por componente, gravados em lote (nº fixo de queries)
+        registros = registrar_intervencoes_em_lote(
+            tenant=obj.tenant,
+            usuario=obj.responsavel,
+            posicao_ids=[c.pk for c in componentes],
+            motor_id=obj.motor_id,
+            equipamento_id=None if obj.motor_id else obj.equipamento_id,
+            tipo_atividade=obj.tipo_atividade,
+            horimetro_atual=obj.horimetro_na_execucao,
+            arranques_atual=obj.arranques_na_execucao,
+            data_ocorrencia=obj.data_ocorrencia,
+            estoque_item_id=obj.item_estoque_id,
+            quantidade_por_item=obj.quantidade_utilizada,
+            novo_serial=obj.novo_serial_number,
+            observacao=obj.observacao,
+        )
+
+        # O admin usa o objeto do form para a mensagem e o log: aponta para o primeiro registro
+        primeiro = registros[0]
+        obj.pk = primeiro.pk
+        obj.posicao = primeiro.posicao
+        obj.created_at = primeiro.created_at
+        obj._state.adding = False
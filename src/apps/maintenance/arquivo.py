@@ -0,0 +1,135 @@
+"""
+Arquivo frio do Livro de Ocorrências.
+
+Registros mais antigos que ARQUIVO_MANUTENCAO_IDADE_DIAS saem da tabela e vão
+para arquivos JSONL comprimidos, um por tenant e ano:
+
+    <ARQUIVO_MANUTENCAO_DIR>/<tenant_id>/registros_<ano>.jsonl.gz
+
+A tabela quente (e seus índices) fica só com os anos recentes; o histórico
+antigo continua legível por `registros_arquivados` e `historico_posicao`,
+que devolvem instâncias de RegistroManutencao (não salvas, `arquivado=True`).
+"""
+import gzip
+import json
+import os
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from src.apps.core.tenancy import todos_os_tenants
+from .models import RegistroManutencao
+
+CAMPOS = RegistroManutencao._meta.concrete_fields
+ATRIBUTOS = [campo.attname for campo in CAMPOS]
+
+
+def diretorio(tenant_id):
+    return Path(settings.ARQUIVO_MANUTENCAO_DIR) / str(tenant_id)
+
+
+def caminho_arquivo(tenant_id, ano):
+    return diretorio(tenant_id) / f'registros_{ano}.jsonl.gz'
+
+
+def anos_arquivados(tenant_id):
+    return sorted(
+        int(caminho.name.removeprefix('registros_').removesuffix('.jsonl.gz'))
+        for caminho in diretorio(tenant_id).glob('registros_*.jsonl.gz')
+    )
+
+
+# ==========================================================
+# 1. ARQUIVAMENTO (command arquivar_registros)
+# ==========================================================
+
+def _anexar(caminho, linhas):
+    """Acrescenta um membro gzip ao arquivo e só retorna depois do fsync."""
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho, 'ab') as bruto:
+        with gzip.GzipFile(fileobj=bruto, mode='ab') as arquivo:
+            for linha in linhas:
+                arquivo.write((json.dumps(linha, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n').encode())
+        bruto.flush()
+        os.fsync(bruto.fileno())
+
+
+def arquivar_registros(antes_de=None, tenant_id=None, lote=5000):
+    """
+    Move para o arquivo os registros com data_ocorrencia < antes_de (padrão:
+    hoje - ARQUIVO_MANUTENCAO_IDADE_DIAS). Retorna {(tenant_id, ano): qtd}.
+
+    Cada lote é gravado (com fsync) antes de ser apagado: se o processo cair
+    no meio, a próxima rodada regrava as mesmas linhas e a leitura descarta
+    as duplicadas pelo id.
+    """
+    if antes_de is None:
+        antes_de = date.today() - timedelta(days=settings.ARQUIVO_MANUTENCAO_IDADE_DIAS)
+    movidos = defaultdict(int)
+
+    with todos_os_tenants():
+        registros = RegistroManutencao.objects.filter(data_ocorrencia__lt=antes_de)
+        if tenant_id:
+            registros = registros.filter(tenant_id=tenant_id)
+        registros = registros.order_by('tenant_id', 'data_ocorrencia', 'id').values(*ATRIBUTOS)
+
+        while linhas := list(registros[:lote]):
+            por_arquivo = defaultdict(list)
+            for linha in linhas:
+                por_arquivo[linha['tenant_id'], linha['data_ocorrencia'].year].append(linha)
+            for (tenant, ano), grupo in por_arquivo.items():
+                _anexar(caminho_arquivo(tenant, ano), grupo)
+                movidos[tenant, ano] += len(grupo)
+            with transaction.atomic():
+                RegistroManutencao.objects.filter(pk__in=[linha['id'] for linha in linhas]).delete()
+
+    return dict(movidos)
+
+
+# ==========================================================
+# 2. LEITURA (read-through)
+# ==========================================================
+
+def _registro(linha):
+    registro = RegistroManutencao(**{campo.attname: campo.to_python(linha[campo.attname]) for campo in CAMPOS})
+    registro.arquivado = True
+    return registro
+
+
+def registros_arquivados(tenant_id, desde=None, ate=None, **filtros):
+    """
+    Registros arquivados do tenant, mais recentes primeiro. Só abre os anos
+    de `desde`..`ate`; `filtros` compara atributos por igualdade
+    (posicao_id=..., motor_id=..., equipamento_id=...).
+    """
+    registros, vistos = [], set()
+    for ano in anos_arquivados(tenant_id):
+        if (desde and ano < desde.year) or (ate and ano > ate.year):
+            continue
+        with gzip.open(caminho_arquivo(tenant_id, ano), 'rt', encoding='utf-8') as arquivo:
+            for texto in arquivo:
+                linha = json.loads(texto)
+                if linha['id'] in vistos or any(linha[k] != v for k, v in filtros.items()):
+                    continue
+                vistos.add(linha['id'])
+                registro = _registro(linha)
+                if (desde and registro.data_ocorrencia < desde) or (ate and registro.data_ocorrencia > ate):
+                    continue
+                registros.append(registro)
+    registros.sort(key=lambda r: (r.data_ocorrencia, r.pk), reverse=True)
+    return registros
+
+
+def historico_posicao(posicao, incluir_arquivo=False):
+    """
+    Histórico de intervenções da posição: a tabela quente e, se pedido, o
+    arquivo em seguida (tudo que foi arquivado é mais antigo que o que ficou).
+    """
+    historico = list(posicao.historico_manutencao.all())
+    if incluir_arquivo:
+        historico += registros_arquivados(posicao.tenant_id, posicao_id=posicao.pk)
+    return historico
@@ -0,0 +1,34 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from src.apps.maintenance.arquivo import arquivar_registros
+
+
+class Command(BaseCommand):
+    help = (
+        "Move os registros de manutenção antigos para o arquivo frio "
+        "(JSONL.gz por tenant e ano, em ARQUIVO_MANUTENCAO_DIR). Por padrão "
+        "arquiva o que for mais antigo que ARQUIVO_MANUTENCAO_IDADE_DIAS. "
+        "No PostgreSQL, as partições mensais esvaziadas podem depois ser "
+        "desanexadas com particoes_historico --desanexar-ate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--antes-de', metavar='AAAA-MM-DD', help="Arquiva as ocorrências anteriores a esta data")
+        parser.add_argument('--tenant', help="Só os registros deste tenant (id)")
+        parser.add_argument('--lote', type=int, default=5000, help="Registros gravados/apagados por vez")
+
+    def handle(self, *args, **opts):
+        antes_de = None
+        if opts['antes_de']:
+            try:
+                antes_de = date.fromisoformat(opts['antes_de'])
+            except ValueError:
+                raise CommandError("--antes-de deve estar no formato AAAA-MM-DD.")
+
+        movidos = arquivar_registros(antes_de=antes_de, tenant_id=opts['tenant'], lote=opts['lote'])
+
+        for (tenant_id, ano), quantidade in sorted(movidos.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+            self.stdout.write(f"Tenant {tenant_id}, {ano}: {quantidade} registro(s)")
+        self.stdout.write(self.style.SUCCESS(f"{sum(movidos.values())} registro(s) arquivado(s)."))
@@ -0,0 +1,146 @@
+import statistics
+import threading
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections, transaction
+
+from src.apps.assets.models import MarcaMotor, ModeloMotor, Motor
+from src.apps.components.models import PosicaoComponente
+from src.apps.core.models import Tenant
+from src.apps.inventory.models import CategoriaPeca, CatalogoPeca, EstoqueItem, LocalEstoque
+from src.apps.maintenance.services import registrar_intervencoes_em_lote
+
+
+class Command(BaseCommand):
+    help = (
+        "Roda N threads de intervenções contra o MESMO item de estoque e mede "
+        "intervenções por segundo e o tempo gasto nos comandos que tocam a linha "
+        "do item (espera de lock incluída). Compara a baixa condicional atual com "
+        "o modo anterior (select_for_update no item antes de gravar). "
+        "Cria um tenant temporário e apaga tudo no final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--intervencoes', type=int, default=40, help="Intervenções por thread")
+        parser.add_argument('--velas', type=int, default=4, help="Componentes por intervenção")
+
+    def handle(self, *args, **opts):
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                "SQLite trava o banco inteiro na escrita: os números só servem de referência."
+            ))
+
+        tenant = Tenant.objects.create(nome="Benchmark Estoque")
+        try:
+            cenario = self.montar_cenario(tenant, opts['threads'], opts['velas'])
+            resultados = {
+                'trava o item (anterior)': self.medir(cenario, opts['intervencoes'], travar_item=True),
+                'condicional (atual)': self.medir(cenario, opts['intervencoes'], travar_item=False),
+            }
+        finally:
+            # Motor.modelo e CatalogoPeca.categoria são PROTECT: apaga os filhos antes
+            Motor.objects.filter(tenant=tenant).delete()
+            CatalogoPeca.objects.filter(tenant=tenant).delete()
+            tenant.delete()
+
+        for nome, r in resultados.items():
+            self.stdout.write(
+                f"{nome:<24} {r['por_segundo']:8.1f} intervenções/s  "
+                f"item: média {r['espera_media']:6.2f} ms, p95 {r['espera_p95']:6.2f} ms  "
+                f"({r['repeticoes']} repetições por banco ocupado)"
+            )
+        anterior, atual = resultados.values()
+        self.stdout.write(f"Vazão: {atual['por_segundo'] / anterior['por_segundo']:.2f} da anterior")
+        if anterior['espera_p95']:
+            proporcao = atual['espera_p95'] / anterior['espera_p95']
+            self.stdout.write(f"Tempo na linha do item (p95): {proporcao:.2f} do anterior")
+
+    def montar_cenario(self, tenant, threads, velas):
+        marca = MarcaMotor.objects.create(tenant=tenant, nome=f"Benchmark {tenant.pk}")  # nome é único global
+        modelo = ModeloMotor.objects.create(tenant=tenant, marca=marca, nome="Benchmark")
+        # Um motor por thread: a única linha disputada é a do item de estoque
+        motores = [
+            Motor.objects.create(
+                tenant=tenant, nome=f"Benchmark {i}", modelo=modelo, numero_serie=str(i), localizacao="-",
+                qtd_cilindros=velas, horas_totais=10000, total_arranques=500,
+            )
+            for i in range(threads)
+        ]
+        categoria = CategoriaPeca.objects.create(tenant=tenant, nome="Benchmark")
+        catalogo = CatalogoPeca.objects.create(
+            tenant=tenant, nome="Benchmark", categoria=categoria, aplicacao_universal=True,
+        )
+        local = LocalEstoque.objects.create(tenant=tenant, nome="Benchmark")
+        estoque = EstoqueItem.objects.create(tenant=tenant, catalogo=catalogo, local=local, quantidade=10 ** 9)
+        posicoes = {
+            motor.pk: list(
+                PosicaoComponente.objects.filter(motor=motor, nome_base="Vela de Ignição").values_list('pk', flat=True)
+            )
+            for motor in motores
+        }
+        return tenant, posicoes, estoque
+
+    def medir(self, cenario, n, travar_item):
+        tenant, posicoes, estoque = cenario
+        esperas, repeticoes = [], []
+        trava = threading.Lock()
+
+        def trabalhador(motor_id, posicao_ids):
+            minhas_esperas, minhas_repeticoes = [], 0
+
+            def cronometro(execute, sql, params, many, context):
+                # Só os comandos que travam a linha do item: aí está a disputa (e a espera de lock)
+                disputa = 'inventory_estoqueitem' in sql and (sql.startswith('UPDATE') or 'FOR UPDATE' in sql)
+                if not disputa:
+                    return execute(sql, params, many, context)
+                inicio = time.perf_counter()
+                try:
+                    return execute(sql, params, many, context)
+                finally:
+                    minhas_esperas.append((time.perf_counter() - inicio) * 1000)
+
+            try:
+                with connection.execute_wrapper(cronometro):
+                    for i in range(n):
+                        while True:
+                            try:
+                                with transaction.atomic():
+                                    if travar_item:
+                                        EstoqueItem.objects.select_for_update().get(pk=estoque.pk)
+                                    registrar_intervencoes_em_lote(
+                                        tenant=tenant, usuario="Benchmark", posicao_ids=posicao_ids,
+                                        motor_id=motor_id, tipo_atividade='SUBSTITUICAO',
+                                        horimetro_atual=9000 + i, data_ocorrencia=date.today(),
+                                        estoque_item_id=estoque.pk, quantidade_por_item=1,
+                                    )
+                                break
+                            except OperationalError:
+                                # SQLite: "database is locked"; tenta de novo
+                                minhas_repeticoes += 1
+            finally:
+                connections.close_all()
+                with trava:
+                    esperas.extend(minhas_esperas)
+                    repeticoes.append(minhas_repeticoes)
+
+        threads = [
+            threading.Thread(target=trabalhador, args=(motor_id, ids))
+            for motor_id, ids in posicoes.items()
+        ]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duracao = time.perf_counter() - inicio
+
+        esperas.sort()
+        return {
+            'por_segundo': n * len(threads) / duracao,
+            'espera_media': statistics.fmean(esperas) if esperas else 0.0,
+            'espera_p95': esperas[int(len(esperas) * 0.95)] if esperas else 0.0,
+            'repeticoes': sum(repeticoes),
+        }
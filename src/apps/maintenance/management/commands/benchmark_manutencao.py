@@ -0,0 +1,134 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models.signals import post_save
+
+from src.apps.assets.models import MarcaMotor, ModeloMotor, Motor
+from src.apps.components.models import PosicaoComponente, PlanoPreventiva
+from src.apps.components.services import criar_planos_em_massa
+from src.apps.core.models import Tenant
+from src.apps.inventory.models import CategoriaPeca, CatalogoPeca, EstoqueItem, LocalEstoque
+from src.apps.maintenance.models import RegistroManutencao
+from src.apps.maintenance.signals import orquestrador_manutencao
+
+ATIVIDADES = ('SUBSTITUICAO', 'LIMPEZA', 'INSPECAO', 'LUBRIFICACAO')
+
+
+def _orquestrador_por_linha(sender, instance, created, **kwargs):
+    """Versão anterior do orquestrador (ler-modificar-salvar, um save por plano), só para comparação."""
+    if not created:
+        return
+    if instance.item_estoque and instance.quantidade_utilizada > 0:
+        estoque = instance.item_estoque
+        if estoque.quantidade >= instance.quantidade_utilizada:
+            estoque.quantidade -= instance.quantidade_utilizada
+            estoque.save()
+
+    posicao = instance.posicao
+    atividades_de_troca = ['SUBSTITUICAO', 'INSTALACAO', 'TROCA']
+    if instance.tipo_atividade in atividades_de_troca:
+        posicao.data_instalacao = instance.data_ocorrencia
+        posicao.hora_motor_instalacao = instance.horimetro_na_execucao or 0
+        if instance.arranques_na_execucao is not None:
+            posicao.arranques_motor_instalacao = instance.arranques_na_execucao
+        if instance.novo_serial_number:
+            posicao.serial_number = instance.novo_serial_number
+        posicao.save()
+        planos = PlanoPreventiva.objects.filter(posicao=posicao)
+    else:
+        if instance.tipo_atividade == 'LUBRIFICACAO':
+            posicao.ultimo_engraxamento = instance.data_ocorrencia
+            posicao.save()
+        planos = PlanoPreventiva.objects.filter(posicao=posicao, tipo_servico=instance.tipo_atividade)
+
+    for plano in planos:
+        plano.ultima_execucao_data = instance.data_ocorrencia
+        if plano.unidade == 'HORAS':
+            plano.ultima_execucao_valor = instance.horimetro_na_execucao or 0
+        elif plano.unidade == 'ARRANQUES':
+            valor = instance.arranques_na_execucao
+            if valor is None:
+                valor = instance.motor.total_arranques
+            plano.ultima_execucao_valor = valor or 0
+        plano.save()
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede registros de manutenção por segundo (um .create por registro, com o "
+        "orquestrador) comparando o orquestrador em conjunto com a versão por linha. "
+        "Cria um tenant temporário e apaga tudo no final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--registros', type=int, default=300)
+        parser.add_argument('--cilindros', type=int, default=20)
+
+    def handle(self, *args, **opts):
+        tenant = Tenant.objects.create(nome="Benchmark Manutenção")
+        try:
+            cenario = self.montar_cenario(tenant, opts['cilindros'])
+
+            resultados = {}
+            post_save.disconnect(orquestrador_manutencao, sender=RegistroManutencao)
+            post_save.connect(_orquestrador_por_linha, sender=RegistroManutencao)
+            try:
+                resultados['por linha (anterior)'] = self.medir(cenario, opts['registros'])
+            finally:
+                post_save.disconnect(_orquestrador_por_linha, sender=RegistroManutencao)
+                post_save.connect(orquestrador_manutencao, sender=RegistroManutencao)
+            resultados['em conjunto (atual)'] = self.medir(cenario, opts['registros'])
+        finally:
+            # Motor.modelo e CatalogoPeca.categoria são PROTECT: apaga os filhos antes
+            Motor.objects.filter(tenant=tenant).delete()
+            CatalogoPeca.objects.filter(tenant=tenant).delete()
+            tenant.delete()
+
+        for nome, (por_segundo, queries) in resultados.items():
+            self.stdout.write(f"{nome:<22} {por_segundo:8.1f} registros/s  {queries:5.1f} queries/registro")
+        anterior, atual = resultados.values()
+        self.stdout.write(self.style.SUCCESS(f"Ganho: {atual[0] / anterior[0]:.1f}x"))
+
+    def montar_cenario(self, tenant, cilindros):
+        marca = MarcaMotor.objects.create(tenant=tenant, nome=f"Benchmark {tenant.pk}")  # nome é único global
+        modelo = ModeloMotor.objects.create(tenant=tenant, marca=marca, nome="Benchmark")
+        motor = Motor.objects.create(
+            tenant=tenant, nome="Benchmark", modelo=modelo, numero_serie="-", localizacao="-",
+            qtd_cilindros=cilindros, horas_totais=10000, total_arranques=500,
+        )
+        posicoes = PosicaoComponente.objects.filter(motor=motor)
+        for tipo in ATIVIDADES:
+            for unidade, intervalo in (('HORAS', 2000), ('ARRANQUES', 300), ('MESES', 6)):
+                criar_planos_em_massa(posicoes, f"{tipo} {unidade}", tipo, unidade, intervalo)
+
+        categoria = CategoriaPeca.objects.create(tenant=tenant, nome="Benchmark")
+        catalogo = CatalogoPeca.objects.create(
+            tenant=tenant, nome="Benchmark", categoria=categoria, aplicacao_universal=True,
+        )
+        local = LocalEstoque.objects.create(tenant=tenant, nome="Benchmark")
+        estoque = EstoqueItem.objects.create(tenant=tenant, catalogo=catalogo, local=local, quantidade=10 ** 9)
+        return tenant, motor, list(posicoes), estoque
+
+    def medir(self, cenario, n):
+        tenant, motor, posicoes, estoque = cenario
+        queries = 0
+
+        def contador(execute, sql, params, many, context):
+            # Contador simples: o CaptureQueriesContext guarda só as últimas 9000 queries
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(contador):
+            for i in range(n):
+                RegistroManutencao.objects.create(
+                    tenant=tenant, motor=motor, posicao=posicoes[i % len(posicoes)],
+                    data_ocorrencia=date.today(), horimetro_na_execucao=9000 + i,
+                    tipo_atividade=ATIVIDADES[i % len(ATIVIDADES)],
+                    item_estoque=estoque, quantidade_utilizada=1,
+                )
+        duracao = time.perf_counter() - inicio
+        return n / duracao, queries / n
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.10 on 2026-10-18 16:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0001_initial"),
+        ("maintenance", "0011_registromanutencao_equipamento_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChaveIdempotencia",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("chave", models.CharField(max_length=100)),
+                ("registros_ids", models.JSONField(default=list)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="core.tenant"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Chave de Idempotência",
+                "verbose_name_plural": "Chaves de Idempotência",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("tenant", "chave"),
+                        name="chave_idempotencia_unica_por_tenant",
+                    )
+                ],
+            },
+        ),
+    ]
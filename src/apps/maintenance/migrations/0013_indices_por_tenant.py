@@ -0,0 +1,43 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("assets", "0017_historico_contadores"),
+        ("components", "0014_indices_por_tenant"),
+        ("core", "0001_initial"),
+        ("inventory", "0009_indices_por_tenant"),
+        ("maintenance", "0012_chaveidempotencia"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="registromanutencao",
+            index=models.Index(
+                fields=["tenant", "data_ocorrencia"], name="registro_tenant_data_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="registromanutencao",
+            index=models.Index(
+                fields=["tenant", "motor", "data_ocorrencia"],
+                name="registro_tenant_motor_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="registromanutencao",
+            index=models.Index(
+                fields=["tenant", "equipamento", "data_ocorrencia"],
+                name="registro_tenant_equip_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="registromanutencao",
+            index=models.Index(
+                fields=["tenant", "posicao", "data_ocorrencia"],
+                name="registro_tenant_posicao_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:40
+
+from django.db import migrations
+
+from src.apps.core.particoes import desparticionar_tabela, particionar_tabela
+
+
+def particionar(apps, schema_editor):
+    # PostgreSQL: partição por mês de data_ocorrencia; outros bancos: nada muda
+    particionar_tabela(
+        schema_editor, "maintenance_registromanutencao", "data_ocorrencia"
+    )
+
+
+def desparticionar(apps, schema_editor):
+    desparticionar_tabela(
+        schema_editor, "maintenance_registromanutencao", "data_ocorrencia"
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("maintenance", "0013_indices_por_tenant"),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, desparticionar),
+    ]
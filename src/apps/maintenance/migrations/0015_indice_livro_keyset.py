@@ -0,0 +1,27 @@
+# Generated by Django 5.2.10 on 2026-10-18 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("assets", "0017_historico_contadores"),
+        ("components", "0014_indices_por_tenant"),
+        ("core", "0001_initial"),
+        ("inventory", "0010_particionar_movimentos"),
+        ("maintenance", "0014_particionar_registros"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="registromanutencao",
+            name="registro_tenant_data_idx",
+        ),
+        migrations.AddIndex(
+            model_name="registromanutencao",
+            index=models.Index(
+                fields=["tenant", "data_ocorrencia", "id"],
+                name="registro_tenant_data_id_idx",
+            ),
+        ),
+    ]
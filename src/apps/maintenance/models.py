@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from src.apps.core.models import TenantAwareModel
 from src.apps.assets.models import Motor, Equipamento
@@ -83,6 +83,20 @@ class RegistroManutencao(TenantAwareModel):
         verbose_name = "Registro de Ocorrência"
         verbose_name_plural = "Livro de Ocorrências"
         ordering = ['-data_ocorrencia']
+        indexes = [
+            # Livro de ocorrências: ordem padrão + id, chave da paginação por cursor do admin
+            models.Index(fields=['tenant', 'data_ocorrencia', 'id'], name='registro_tenant_data_id_idx'),
+            # Histórico por ativo / componente
+            models.Index(fields=['tenant', 'motor', 'data_ocorrencia'], name='registro_tenant_motor_idx'),
+            models.Index(fields=['tenant', 'equipamento', 'data_ocorrencia'], name='registro_tenant_equip_idx'),
+            models.Index(fields=['tenant', 'posicao', 'data_ocorrencia'], name='registro_tenant_posicao_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # O orquestrador (post_save) aplica os efeitos dentro deste bloco:
+        # se a baixa de estoque falhar, o INSERT do registro também é desfeito
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def clean(self):
         # Validação para garantir que escolheu UM dos dois
@@ -93,4 +107,25 @@ class RegistroManutencao(TenantAwareModel):
 
     def __str__(self):
         ativo = self.motor if self.motor else self.equipamento
-        return f"{self.data_ocorrencia} - {ativo} ({self.get_tipo_atividade_display()})"
\ No newline at end of file
+        return f"{self.data_ocorrencia} - {ativo} ({self.get_tipo_atividade_display()})"
+
+class ChaveIdempotencia(TenantAwareModel):
+    """
+    Chave enviada pelo cliente (tablet/formulário) ao registrar uma intervenção.
+    Um reenvio com a mesma chave devolve os registros originais, sem repetir
+    baixa de estoque nem reset de preventivas.
+    """
+    chave = models.CharField(max_length=100)
+    # Ids (e não FK): a chave sobrevive ao arquivamento/particionamento dos registros
+    registros_ids = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Chave de Idempotência"
+        verbose_name_plural = "Chaves de Idempotência"
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'chave'], name='chave_idempotencia_unica_por_tenant'),
+        ]
+
+    def __str__(self):
+        return self.chave
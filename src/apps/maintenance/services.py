@@ -1,32 +1,186 @@
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
-from src.apps.maintenance.models import RegistroManutencao
-from src.apps.assets.models import PosicaoComponente, Motor, Equipamento
+from src.apps.maintenance.models import RegistroManutencao, ChaveIdempotencia
+from src.apps.assets.models import Motor, Equipamento
+from src.apps.components.models import PosicaoComponente, PlanoPreventiva
+from src.apps.core.cache import cache_preventivas
 from src.apps.inventory.models import EstoqueItem
+from src.apps.inventory.services import baixar_estoque_em_partes
 
-def registrar_intervencao(
+# Atividades que significam "Peça Nova" (zeram TODOS os planos da posição)
+ATIVIDADES_DE_TROCA = ('SUBSTITUICAO', 'INSTALACAO', 'TROCA')
+
+# Atividades em que o item de estoque é obrigatório
+ATIVIDADES_COM_PECA = ('TROCA', 'SUBSTITUICAO')
+
+
+def aplicar_intervencao(
+    posicao_ids,
+    *,
+    tipo_atividade: str,
+    data_ocorrencia,
+    horimetro: int = None,
+    arranques: int = None,
+    arranques_ativo: int = 0,
+    novo_serial: str = None,
+    peca_instalada_id: int = None,
+):
+    """
+    Efeitos de uma intervenção em várias posições, com comandos em conjunto
+    (nº fixo de queries, qualquer que seja a quantidade de posições):
+
+    1. Troca/Instalação: novo snapshot de instalação nas posições.
+       Lubrificação: data do último engraxamento.
+    2. Reset das preventivas: todos os planos na troca, ou só os planos
+       cujo gatilho é o tipo de serviço executado.
+    3. Recalcula as colunas de vencimento dos planos afetados.
+    """
+    posicoes = PosicaoComponente.objects.filter(id__in=posicao_ids)
+
+    # --- 1. Atualização física do componente ---
+    if tipo_atividade in ATIVIDADES_DE_TROCA:
+        campos = {'data_instalacao': data_ocorrencia, 'hora_motor_instalacao': horimetro or 0}
+        if arranques is not None:
+            campos['arranques_motor_instalacao'] = arranques
+        if novo_serial:
+            campos['serial_number'] = novo_serial
+        if peca_instalada_id is not None:
+            campos['peca_instalada_id'] = peca_instalada_id
+        posicoes.update(**campos)
+    elif tipo_atividade == 'LUBRIFICACAO':
+        posicoes.update(ultimo_engraxamento=data_ocorrencia)
+
+    # --- 2. Reset das preventivas (um UPDATE para todas as unidades) ---
+    planos = PlanoPreventiva.objects.filter(posicao_id__in=posicao_ids)
+    if tipo_atividade not in ATIVIDADES_DE_TROCA:
+        planos = planos.filter(tipo_servico=tipo_atividade)
+
+    # Se não foi informado o nº de arranques, usa o do ativo para não zerar erradamente.
+    # arranques_ativo pode ser uma expressão (ex.: Subquery do Motor) para não custar um SELECT.
+    if arranques is not None:
+        valor_arranques = Value(arranques)
+    elif hasattr(arranques_ativo, 'resolve_expression'):
+        valor_arranques = Coalesce(arranques_ativo, 0)
+    else:
+        valor_arranques = Value(arranques_ativo or 0)
+    planos.update(
+        ultima_execucao_data=data_ocorrencia,
+        ultima_execucao_valor=Case(
+            When(unidade='HORAS', then=Value(horimetro or 0)),
+            When(unidade='ARRANQUES', then=valor_arranques),
+            default=F('ultima_execucao_valor'),
+        ),
+    )
+
+    # --- 3. Vencimentos (o .update() acima não passa pelo save()) ---
+    # Fora da troca o snapshot da posição não muda: bastam os planos resetados
+    planos.recalcular_vencimentos()
+
+
+def validar_intervencao(*, ativo, horimetro_atual, item_estoque=None):
+    """
+    Regras comuns a qualquer intervenção registrada pelo serviço.
+    O saldo de estoque fica com a baixa, que é condicional no UPDATE.
+    """
+    # Validação de Hierarquia (Horas): compara com o horímetro do ativo correto
+    if horimetro_atual is not None and horimetro_atual > ativo.horas_totais:
+        raise ValidationError(
+            f"Erro: O ativo {ativo} tem {ativo.horas_totais}h. "
+            f"Não é possível registrar intervenção futura com {horimetro_atual}h."
+        )
+
+    if item_estoque is None:
+        return
+    catalogo = item_estoque.catalogo
+
+    # Compatibilidade (Motor x Peça): se for MOTOR, validamos rigorosamente o modelo.
+    # Se for EQUIPAMENTO, pulamos a validação de modelo de motor.
+    if isinstance(ativo, Motor) and not catalogo.aplicacao_universal:
+        if not catalogo.modelos_compativeis.filter(id=ativo.modelo_id).exists():
+            raise ValidationError(f"Peça incompatível com o motor {ativo.modelo}.")
+
+
+def reservar_chave(tenant, chave: str):
+    """
+    Idempotência: reserva a chave do cliente dentro da transação corrente.
+    Retorna (reserva, None) na primeira vez, ou (None, registros originais)
+    num reenvio. Um reenvio concorrente espera no índice único até a primeira
+    transação terminar e então recebe os registros dela.
+    """
+    tenant_id = getattr(tenant, 'pk', tenant)
+    existente = ChaveIdempotencia.objects.filter(tenant_id=tenant_id, chave=chave).first()
+    if existente is None:
+        try:
+            with transaction.atomic():
+                return ChaveIdempotencia.objects.create(tenant_id=tenant_id, chave=chave), None
+        except IntegrityError:
+            # Só a violação do índice único (tenant, chave) é um reenvio concorrente
+            existente = ChaveIdempotencia.objects.filter(tenant_id=tenant_id, chave=chave).first()
+            if existente is None:
+                raise
+    registros = RegistroManutencao.objects.order_by().in_bulk(existente.registros_ids)
+    return None, [registros[pk] for pk in existente.registros_ids if pk in registros]
+
+
+def concluir_reserva(reserva, registros):
+    """Guarda na chave reservada os registros que ela passa a representar."""
+    reserva.registros_ids = [registro.pk for registro in registros]
+    reserva.save(update_fields=['registros_ids'])
+
+
+def registrar_intervencoes_em_lote(
     *,
     tenant,
     usuario,
-    posicao_id: int,
+    posicao_ids,
     tipo_atividade: str,
-    horimetro_atual: int, 
+    horimetro_atual: int,
     data_ocorrencia,
-    motor_id: int = None,       # Agora opcional
-    equipamento_id: int = None, # Novo parametro opcional
+    motor_id: int = None,
+    equipamento_id: int = None,
     estoque_item_id: int = None,
+    quantidade_por_item: int = None,
+    arranques_atual: int = None,
     novo_serial: str = None,
-    observacao: str = ""
-) -> RegistroManutencao:
-    
+    observacao: str = "",
+    chave_idempotencia: str = None,
+) -> list:
+    """
+    Registra a mesma intervenção em várias posições de UM ativo, em uma
+    transação e com nº fixo de queries:
+
+    - trava as posições em ordem de id (ordem determinística evita deadlock);
+    - valida ativo, horímetro e compatibilidade da peça uma única vez;
+    - grava os registros com bulk_create e aplica os efeitos em conjunto;
+    - por último, baixa o estoque uma única vez pelo total (quantidade_por_item
+      x posições) com um UPDATE condicional, sem select_for_update no item, e
+      um movimento de SAIDA por registro no razão de estoque.
+
+    Com `chave_idempotencia`, um reenvio da mesma chave devolve os registros
+    originais sem repetir nenhum efeito.
+
+    Retorna a lista de RegistroManutencao criados (na ordem das posições).
+    """
+    posicao_ids = sorted(set(posicao_ids))
+    if not posicao_ids:
+        raise ValidationError("Selecione ao menos um componente.")
+
     with transaction.atomic():
+        # --- 0. Idempotência (uma busca no índice único da chave) ---
+        reserva = None
+        if chave_idempotencia:
+            reserva, originais = reservar_chave(tenant, chave_idempotencia)
+            if originais is not None:
+                return originais
+
         # --- 1. Identificar o Ativo (Motor ou Equipamento) ---
         motor = None
         equipamento = None
-        ativo = None
 
         if motor_id:
-            motor = Motor.objects.get(id=motor_id, tenant=tenant)
+            motor = Motor.objects.select_related('modelo').get(id=motor_id, tenant=tenant)
             ativo = motor
         elif equipamento_id:
             equipamento = Equipamento.objects.get(id=equipamento_id, tenant=tenant)
@@ -34,67 +188,121 @@ def registrar_intervencao(
         else:
             raise ValidationError("É necessário informar o ID do Motor ou do Equipamento para registrar a intervenção.")
 
-        # Busca a posição e trava o registro
-        posicao = PosicaoComponente.objects.select_for_update().get(id=posicao_id, tenant=tenant)
-        
-        # (Opcional) Validação de Integridade: A peça pertence mesmo a este ativo?
-        if posicao.ativo_pai != ativo:
-             raise ValidationError(f"O componente '{posicao.nome}' não pertence ao ativo informado ({ativo}).")
-
-        # --- 2. Validação de Hierarquia (Horas) ---
-        # Compara com o horímetro do ativo correto
-        if horimetro_atual > ativo.horas_totais:
-            raise ValidationError(
-                f"Erro: O ativo {ativo} tem {ativo.horas_totais}h. "
-                f"Não é possível registrar intervenção futura com {horimetro_atual}h."
-            )
+        # Busca as posições e trava os registros (sempre na mesma ordem)
+        posicoes = list(
+            PosicaoComponente.objects.select_for_update()
+            .filter(id__in=posicao_ids, tenant=tenant)
+            .order_by('id')
+        )
+        if len(posicoes) != len(posicao_ids):
+            raise PosicaoComponente.DoesNotExist("Componente não encontrado.")
+
+        # Validação de Integridade: as peças pertencem mesmo a este ativo?
+        for posicao in posicoes:
+            # Mesma regra de ativo_pai: o Motor tem prioridade sobre o Equipamento
+            if motor:
+                pertence = posicao.motor_id == motor.id
+            else:
+                pertence = not posicao.motor_id and posicao.equipamento_id == equipamento.id
+            if not pertence:
+                raise ValidationError(f"O componente '{posicao.nome}' não pertence ao ativo informado ({ativo}).")
 
         item_estoque = None
-        
-        # --- 3. Lógica de Troca de Peças ---
-        if tipo_atividade in ['TROCA', 'SUBSTITUICAO']:
-            if not estoque_item_id:
-                raise ValidationError("Para substituição, informe o Item de Estoque.")
-            
-            item_estoque = EstoqueItem.objects.select_for_update().get(id=estoque_item_id, tenant=tenant)
+        catalogo = None
+        if estoque_item_id:
+            item_estoque = EstoqueItem.objects.select_related('catalogo').get(id=estoque_item_id, tenant=tenant)
             catalogo = item_estoque.catalogo
 
-            # 4. Validação de Compatibilidade (Motor x Peça)
-            # Se for MOTOR, validamos rigorosamente o modelo.
-            # Se for EQUIPAMENTO, validamos apenas se for universal (ou pulamos a validação de modelo de motor).
-            if motor and not catalogo.aplicacao_universal:
-                if not catalogo.modelos_compativeis.filter(id=motor.modelo.id).exists():
-                    raise ValidationError(f"Peça incompatível com o motor {motor.modelo}.")
-            
-            # 5. Baixa no Estoque
-            if item_estoque.quantidade < catalogo.quantidade_por_jogo:
-                raise ValidationError(f"Estoque insuficiente. Disponível: {item_estoque.quantidade}")
-            
-            item_estoque.quantidade -= catalogo.quantidade_por_jogo
-            item_estoque.save()
-
-            # 6. Atualiza a Posição no Ativo
-            posicao.peca_instalada = catalogo
-            posicao.hora_motor_instalacao = horimetro_atual
-            posicao.data_instalacao = data_ocorrencia
-            posicao.serial_number = novo_serial
-            posicao.save()
-
-        elif tipo_atividade == 'LUBRIFICACAO':
-            posicao.ultimo_engraxamento = data_ocorrencia
-            posicao.save()
-
-        # --- 7. Cria o Registro Histórico ---
-        return RegistroManutencao.objects.create(
-            tenant=tenant,
-            responsavel=usuario,
-            motor=motor,              # Salva Motor (se houver)
-            equipamento=equipamento,  # Salva Equipamento (se houver)
-            posicao=posicao,
+        # --- 2. Horímetro e compatibilidade (uma vez para o lote) ---
+        validar_intervencao(ativo=ativo, horimetro_atual=horimetro_atual, item_estoque=item_estoque)
+
+        if item_estoque and quantidade_por_item is None:
+            quantidade_por_item = catalogo.quantidade_por_jogo
+
+        # --- 3. Registros Históricos (um INSERT) ---
+        registros = RegistroManutencao.objects.bulk_create([
+            RegistroManutencao(
+                tenant=tenant,
+                responsavel=str(usuario) if usuario else None,
+                motor=motor,
+                equipamento=equipamento,
+                posicao=posicao,
+                tipo_atividade=tipo_atividade,
+                horimetro_na_execucao=horimetro_atual,
+                arranques_na_execucao=arranques_atual,
+                item_estoque=item_estoque,
+                quantidade_utilizada=quantidade_por_item or 0,
+                novo_serial_number=novo_serial,
+                data_ocorrencia=data_ocorrencia,
+                observacao=observacao
+            )
+            for posicao in posicoes
+        ])
+
+        # --- 4. Posições e Preventivas (bulk_create não dispara o orquestrador) ---
+        aplicar_intervencao(
+            posicao_ids,
             tipo_atividade=tipo_atividade,
-            horimetro_na_execucao=horimetro_atual,
-            item_estoque=item_estoque, # Corrigido para corresponder ao models.py
-            novo_serial_number=novo_serial,
             data_ocorrencia=data_ocorrencia,
-            observacao=observacao
-        )
\ No newline at end of file
+            horimetro=horimetro_atual,
+            arranques=arranques_atual,
+            arranques_ativo=motor.total_arranques if motor else 0,
+            novo_serial=novo_serial,
+            peca_instalada_id=catalogo.pk if catalogo else None,
+        )
+        cache_preventivas.invalidar_no_commit([tenant.pk])
+
+        # --- 5. Estoque: uma baixa condicional pelo total + uma SAIDA por registro ---
+        # Por último: a linha do item (disputada por todos os técnicos) fica
+        # travada só até o COMMIT, e não durante o resto da transação.
+        if item_estoque:
+            partes = [(quantidade_por_item, f"Manutenção #{registro.pk}") for registro in registros]
+            if not baixar_estoque_em_partes(item_estoque.pk, partes, tenant_id=tenant.pk):
+                item_estoque.refresh_from_db(fields=['quantidade'])
+                raise ValidationError(f"Estoque insuficiente. Disponível: {item_estoque.quantidade}")
+
+        if reserva:
+            concluir_reserva(reserva, registros)
+        return registros
+
+
+def registrar_intervencao(
+    *,
+    tenant,
+    usuario,
+    posicao_id: int,
+    tipo_atividade: str,
+    horimetro_atual: int,
+    data_ocorrencia,
+    motor_id: int = None,       # Agora opcional
+    equipamento_id: int = None, # Novo parametro opcional
+    estoque_item_id: int = None,
+    novo_serial: str = None,
+    observacao: str = "",
+    chave_idempotencia: str = None,
+) -> RegistroManutencao:
+    """Intervenção em uma única posição (atalho para registrar_intervencoes_em_lote)."""
+    if tipo_atividade in ATIVIDADES_COM_PECA and not estoque_item_id:
+        raise ValidationError("Para substituição, informe o Item de Estoque.")
+
+    registros = registrar_intervencoes_em_lote(
+        tenant=tenant,
+        usuario=usuario,
+        posicao_ids=[posicao_id],
+        tipo_atividade=tipo_atividade,
+        horimetro_atual=horimetro_atual,
+        data_ocorrencia=data_ocorrencia,
+        motor_id=motor_id,
+        equipamento_id=equipamento_id,
+        estoque_item_id=estoque_item_id,
+        novo_serial=novo_serial,
+        observacao=observacao,
+        chave_idempotencia=chave_idempotencia,
+    )
+    if not registros:
+        # Reenvio de uma chave cujo registro já saiu da tabela (apagado ou arquivado)
+        raise ValidationError(
+            f"A chave '{chave_idempotencia}' já foi usada e o registro original "
+            "não está mais no Livro de Ocorrências."
+        )
+    return registros[0]
@@ -1,94 +1,78 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Subquery
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import RegistroManutencao
-from src.apps.components.models import PlanoPreventiva
+from src.apps.assets.models import Motor
+from src.apps.core.cache import cache_preventivas
+from src.apps.core.tenancy import usar_tenant
+from src.apps.inventory.models import EstoqueItem
+from src.apps.inventory.services import baixar_estoque
+
 
 @receiver(post_save, sender=RegistroManutencao)
 def orquestrador_manutencao(sender, instance, created, **kwargs):
     """
     Função Mestre que roda toda vez que uma manutenção é salva.
+    Os efeitos entram na mesma transação do registro (ver RegistroManutencao.save).
     """
     if not created:
         return
+    processar_registro(instance)
 
-    print(f"--- Processando Manutenção ID: {instance.id} ---")
-
-    # ==========================================================
-    # 1. BAIXA DE ESTOQUE (Mantido igual)
-    # ==========================================================
-    if instance.item_estoque and instance.quantidade_utilizada > 0:
-        estoque = instance.item_estoque
-        if estoque.quantidade >= instance.quantidade_utilizada:
-            estoque.quantidade -= instance.quantidade_utilizada
-            estoque.save()
-            print(f"✅ Estoque: Baixado {instance.quantidade_utilizada} un de '{estoque.catalogo.nome}'")
-        else:
-            print(f"⚠️ Estoque: Saldo insuficiente para baixa automática no item '{estoque.catalogo.nome}'")
 
-    # ==========================================================
-    # 2. ATUALIZAÇÃO FÍSICA DO COMPONENTE (Mantido igual)
-    # ==========================================================
-    posicao = instance.posicao
-    
-    # Lista de atividades que significam "Peça Nova"
-    atividades_de_troca = ['SUBSTITUICAO', 'INSTALACAO', 'TROCA']
+def processar_registro(registro):
+    """
+    Efeitos de um registro em poucos comandos em conjunto: snapshot da
+    posição, reset das preventivas (ver services.aplicar_intervencao, o mesmo
+    caminho do registro em lote) e, por último, a baixa condicional de estoque.
+    Roda no tenant do registro, não no de quem estiver no contexto.
 
-    if instance.tipo_atividade in atividades_de_troca:
-        posicao.data_instalacao = instance.data_ocorrencia
-        posicao.hora_motor_instalacao = instance.horimetro_na_execucao or 0
-        
-        if instance.arranques_na_execucao is not None:
-            posicao.arranques_motor_instalacao = instance.arranques_na_execucao
-            
-        if instance.novo_serial_number:
-            posicao.serial_number = instance.novo_serial_number
-            
-        posicao.save()
-        print(f"✅ Componente: Slot '{posicao.nome}' atualizado com novos dados de instalação.")
+    Estoque insuficiente levanta ValidationError: a transação desfaz o
+    registro e os efeitos já aplicados.
+    """
+    from .services import aplicar_intervencao
 
-    elif instance.tipo_atividade == 'LUBRIFICACAO':
-        posicao.ultimo_engraxamento = instance.data_ocorrencia
-        posicao.save()
-        print(f"✅ Componente: Data de engraxamento atualizada.")
+    with transaction.atomic(), usar_tenant(registro.tenant_id):
+        # ==========================================================
+        # 1. COMPONENTE + 2. PREVENTIVAS
+        # ==========================================================
+        # Valores do Motor/Estoque entram como subquery nos UPDATEs (sem lazy load)
+        arranques_ativo = 0
+        if registro.motor_id:
+            arranques_ativo = Subquery(
+                Motor.objects.filter(pk=registro.motor_id).values('total_arranques')[:1]
+            )
+        peca_instalada_id = None
+        if registro.item_estoque_id:
+            peca_instalada_id = Subquery(
+                EstoqueItem.objects.filter(pk=registro.item_estoque_id).values('catalogo_id')[:1]
+            )
 
-    # ==========================================================
-    # 3. AUTOMAÇÃO DE PREVENTIVAS (MODIFICADO)
-    # ==========================================================
-    
-    # LÓGICA NOVA: Se for troca de peça, zera TODOS os contadores (Limpeza, Regulagem, etc.)
-    # Se for apenas um serviço (ex: Limpeza), zera apenas o contador da Limpeza.
-    
-    if instance.tipo_atividade in atividades_de_troca:
-        # Busca TODOS os planos vinculados a esta posição
-        planos_afetados = PlanoPreventiva.objects.filter(posicao=posicao)
-        print("🔄 Substituição de peça detectada: Zerando TODOS os planos preventivos.")
-    else:
-        # Busca apenas os planos que tem este tipo de serviço como gatilho
-        planos_afetados = PlanoPreventiva.objects.filter(
-            posicao=posicao,
-            tipo_servico=instance.tipo_atividade 
+        aplicar_intervencao(
+            [registro.posicao_id],
+            tipo_atividade=registro.tipo_atividade,
+            data_ocorrencia=registro.data_ocorrencia,
+            horimetro=registro.horimetro_na_execucao,
+            arranques=registro.arranques_na_execucao,
+            arranques_ativo=arranques_ativo,
+            novo_serial=registro.novo_serial_number,
+            peca_instalada_id=peca_instalada_id,
         )
-    
-    count_planos = 0
-    for plano in planos_afetados:
-        
-        # A. Atualiza a DATA da última execução
-        plano.ultima_execucao_data = instance.data_ocorrencia
+        cache_preventivas.invalidar_no_commit([registro.tenant_id])
 
-        # B. Atualiza o CONTADOR (define o novo "zero")
-        if plano.unidade == 'HORAS':
-            plano.ultima_execucao_valor = instance.horimetro_na_execucao or 0
-        
-        elif plano.unidade == 'ARRANQUES':
-            # Se não foi informado o nº de arranques, tenta pegar do motor para não zerar erradamente
-            valor_arranques = instance.arranques_na_execucao
-            if valor_arranques is None:
-                valor_arranques = instance.motor.total_arranques
-            
-            plano.ultima_execucao_valor = valor_arranques or 0
-            
-        plano.save()
-        count_planos += 1
-        
-    if count_planos > 0:
-        print(f"✅ Preventivas: {count_planos} planos foram resetados/atualizados.")
\ No newline at end of file
+        # ==========================================================
+        # 3. BAIXA DE ESTOQUE (condicional: nunca fica negativo)
+        # Por último, para a linha disputada do item ficar travada o mínimo
+        # ==========================================================
+        if registro.item_estoque_id and registro.quantidade_utilizada > 0:
+            baixou = baixar_estoque(
+                registro.item_estoque_id, registro.quantidade_utilizada,
+                tenant_id=registro.tenant_id, origem=f"Manutenção #{registro.pk}",
+            )
+            if not baixou:
+                disponivel = EstoqueItem.objects.filter(pk=registro.item_estoque_id).values_list(
+                    'quantidade', flat=True
+                ).first()
+                raise ValidationError(f"Estoque insuficiente. Disponível: {disponivel}")
@@ -0,0 +1,479 @@
+import tempfile
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from src.apps.assets.models import MarcaMotor, ModeloMotor, Motor
+from src.apps.components.models import PosicaoComponente, PlanoPreventiva
+from src.apps.core.models import Tenant, User
+from src.apps.inventory.models import CategoriaPeca, CatalogoPeca, EstoqueItem, LocalEstoque, MovimentoEstoque
+from .arquivo import arquivar_registros, caminho_arquivo, historico_posicao, registros_arquivados
+from .models import ChaveIdempotencia, RegistroManutencao
+from .services import registrar_intervencao, registrar_intervencoes_em_lote, reservar_chave
+
+
+class CenarioVelas:
+    """Motor de 20 cilindros com 3 preventivas por vela e estoque de velas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(nome="Empresa Teste")
+        marca = MarcaMotor.objects.create(tenant=cls.tenant, nome="Jenbacher")
+        cls.modelo = ModeloMotor.objects.create(tenant=cls.tenant, marca=marca, nome="J620")
+        cls.motor = Motor.objects.create(
+            tenant=cls.tenant, nome="GMG 1", modelo=cls.modelo, numero_serie="1", localizacao="Sala 1",
+            qtd_cilindros=20, horas_totais=5000, total_arranques=300,
+        )
+        categoria = CategoriaPeca.objects.create(tenant=cls.tenant, nome="Ignição")
+        cls.vela = CatalogoPeca.objects.create(tenant=cls.tenant, nome="Vela", categoria=categoria)
+        cls.vela.modelos_compativeis.add(cls.modelo)
+        local = LocalEstoque.objects.create(tenant=cls.tenant, nome="Almoxarifado")
+        cls.estoque = EstoqueItem.objects.create(tenant=cls.tenant, catalogo=cls.vela, local=local, quantidade=50)
+
+        cls.velas = list(
+            PosicaoComponente.objects.filter(motor=cls.motor, nome_base="Vela de Ignição").order_by('numero')
+        )
+        PlanoPreventiva.objects.bulk_create([
+            PlanoPreventiva(
+                tenant=cls.tenant, posicao=vela, tarefa=tarefa, tipo_servico=tipo,
+                unidade=unidade, intervalo_valor=intervalo,
+            )
+            for vela in cls.velas
+            for tarefa, tipo, unidade, intervalo in (
+                ("Troca", 'SUBSTITUICAO', 'HORAS', 2000),
+                ("Limpeza", 'LIMPEZA', 'ARRANQUES', 100),
+                ("Inspeção", 'INSPECAO', 'MESES', 6),
+            )
+        ])
+
+
+class IntervencaoEmLoteTests(CenarioVelas, TestCase):
+    """Troca de várias velas: uma transação, baixa única e nº fixo de queries."""
+
+    def trocar(self, posicoes, **extra):
+        dados = dict(
+            tenant=self.tenant, usuario="Técnico", posicao_ids=[p.pk for p in posicoes],
+            motor_id=self.motor.pk, tipo_atividade='SUBSTITUICAO', horimetro_atual=4800,
+            data_ocorrencia=date(2026, 5, 10), estoque_item_id=self.estoque.pk,
+        )
+        dados.update(extra)
+        return registrar_intervencoes_em_lote(**dados)
+
+    def test_troca_em_lote(self):
+        registros = self.trocar(self.velas[:16], novo_serial="SN-1")
+
+        self.assertEqual(len(registros), 16)
+        self.assertEqual(RegistroManutencao.objects.filter(posicao__in=self.velas).count(), 16)
+        self.estoque.refresh_from_db()
+        self.assertEqual(self.estoque.quantidade, 34)
+        saidas = MovimentoEstoque.objects.filter(item=self.estoque, tipo='SAIDA')
+        self.assertEqual(
+            sorted(saidas.values_list('origem', 'quantidade')),
+            sorted((f"Manutenção #{r.pk}", -1) for r in registros),
+        )
+
+        trocadas = PosicaoComponente.objects.filter(pk__in=[p.pk for p in self.velas[:16]])
+        self.assertEqual(
+            set(trocadas.values_list('hora_motor_instalacao', 'data_instalacao', 'peca_instalada', 'serial_number')),
+            {(4800, date(2026, 5, 10), self.vela.pk, "SN-1")},
+        )
+
+        planos = PlanoPreventiva.objects.filter(posicao__in=trocadas)
+        self.assertEqual(set(planos.values_list('ultima_execucao_data', flat=True)), {date(2026, 5, 10)})
+        self.assertEqual(
+            set(planos.values_list('unidade', 'ultima_execucao_valor', 'saldo_contador', 'data_vencimento')),
+            {('HORAS', 4800, 1800, None), ('ARRANQUES', 300, 100, None), ('MESES', 0, None, date(2026, 11, 6))},
+        )
+        # As velas não selecionadas continuam intactas
+        self.assertFalse(
+            PlanoPreventiva.objects.filter(posicao__in=self.velas[16:], ultima_execucao_data__isnull=False).exists()
+        )
+
+    def test_queries_nao_crescem_com_a_selecao(self):
+        with CaptureQueriesContext(connection) as poucas:
+            self.trocar(self.velas[:2])
+        with CaptureQueriesContext(connection) as muitas:
+            self.trocar(self.velas[2:18])
+        self.assertEqual(len(muitas.captured_queries), len(poucas.captured_queries))
+
+    def test_estoque_insuficiente_nao_grava_nada(self):
+        self.estoque.quantidade = 10
+        self.estoque.save()
+        with self.assertRaises(ValidationError):
+            self.trocar(self.velas[:16])
+        self.estoque.refresh_from_db()
+        self.assertEqual(self.estoque.quantidade, 10)
+        self.assertFalse(RegistroManutencao.objects.exists())
+
+    def test_peca_incompativel(self):
+        self.vela.modelos_compativeis.clear()
+        with self.assertRaises(ValidationError):
+            self.trocar(self.velas[:1])
+
+
+class AdminSelecaoMultiplaTests(TestCase):
+    """
+    A seleção múltipla do admin grava em lote e chega ao MESMO estado que o
+    caminho antigo (um RegistroManutencao.create por componente + orquestrador).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(nome="Empresa Teste")
+        marca = MarcaMotor.objects.create(tenant=cls.tenant, nome="Jenbacher")
+        cls.modelo = ModeloMotor.objects.create(tenant=cls.tenant, marca=marca, nome="J620")
+        categoria = CategoriaPeca.objects.create(tenant=cls.tenant, nome="Ignição")
+        cls.vela = CatalogoPeca.objects.create(tenant=cls.tenant, nome="Vela", categoria=categoria)
+        cls.local = LocalEstoque.objects.create(tenant=cls.tenant, nome="Almoxarifado")
+        cls.user = User.objects.create_superuser(email="admin@teste.com", password="x", tenant=cls.tenant)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def novo_motor(self, nome):
+        motor = Motor.objects.create(
+            tenant=self.tenant, nome=nome, modelo=self.modelo, numero_serie=nome, localizacao="Sala 1",
+            qtd_cilindros=20, horas_totais=5000, total_arranques=300,
+        )
+        PlanoPreventiva.objects.bulk_create([
+            PlanoPreventiva(
+                tenant=self.tenant, posicao=posicao, tarefa=tarefa, tipo_servico=tipo,
+                unidade=unidade, intervalo_valor=intervalo,
+            )
+            for posicao in PosicaoComponente.objects.filter(motor=motor)
+            for tarefa, tipo, unidade, intervalo in (
+                ("Troca", 'SUBSTITUICAO', 'HORAS', 2000),
+                ("Limpeza", 'LIMPEZA', 'ARRANQUES', 100),
+                ("Inspeção", 'INSPECAO', 'MESES', 6),
+            )
+        ])
+        estoque = EstoqueItem.objects.create(
+            tenant=self.tenant, catalogo=CatalogoPeca.objects.create(
+                tenant=self.tenant, nome=f"Vela {nome}", categoria=self.vela.categoria, aplicacao_universal=True,
+            ), local=self.local, quantidade=100,
+        )
+        return motor, estoque
+
+    def dados(self, motor, estoque, **extra):
+        dados = {
+            'data_ocorrencia': '2026-05-10', 'motor': motor.pk, 'horimetro_na_execucao': 4800,
+            'arranques_na_execucao': '', 'tipo_atividade': 'SUBSTITUICAO', 'novo_serial_number': 'SN-9',
+            'item_estoque': estoque.pk, 'quantidade_utilizada': 2, 'responsavel': "Técnico", 'observacao': "Troca",
+        }
+        dados.update(extra)
+        return dados
+
+    def velas(self, motor, n):
+        return list(PosicaoComponente.objects.filter(motor=motor, nome_base="Vela de Ignição").order_by('numero')[:n])
+
+    def postar(self, motor, estoque, n):
+        dados = self.dados(motor, estoque)
+        dados['selecao_multipla'] = [p.pk for p in self.velas(motor, n)]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('admin:maintenance_registromanutencao_add'), dados)
+        self.assertEqual(response.status_code, 302, getattr(response, 'context_data', {}).get('errors'))
+        return len(ctx.captured_queries)
+
+    def estado(self, motor, estoque):
+        estoque.refresh_from_db()
+        posicoes = PosicaoComponente.objects.filter(motor=motor)
+        return {
+            'estoque': estoque.quantidade,
+            'movimentos': sorted(estoque.movimentos.values_list('tipo', 'quantidade')),
+            'posicoes': sorted(posicoes.values_list(
+                'nome', 'data_instalacao', 'hora_motor_instalacao', 'arranques_motor_instalacao',
+                'serial_number', 'peca_instalada__nome', 'ultimo_engraxamento',
+            )),
+            'planos': sorted(PlanoPreventiva.objects.filter(posicao__in=posicoes).values_list(
+                'posicao__nome', 'tarefa', 'ultima_execucao_valor', 'ultima_execucao_data',
+                *PlanoPreventiva.CAMPOS_VENCIMENTO,
+            )),
+            'registros': sorted(RegistroManutencao.objects.filter(motor=motor).values_list(
+                'posicao__nome', 'data_ocorrencia', 'tipo_atividade', 'horimetro_na_execucao',
+                'arranques_na_execucao', 'quantidade_utilizada', 'novo_serial_number', 'responsavel', 'observacao',
+            )),
+        }
+
+    def test_mesmo_estado_do_caminho_por_registro(self):
+        motor_a, estoque_a = self.novo_motor("A")
+        motor_b, estoque_b = self.novo_motor("B")
+        # Peça instalada comparada pelo nome: as duas apontam para "Vela X"
+        CatalogoPeca.objects.filter(pk__in=[estoque_a.catalogo_id, estoque_b.catalogo_id]).update(nome="Vela X")
+
+        # Caminho por registro: um create por componente, efeitos pelo orquestrador
+        campos = self.dados(motor_a, estoque_a)
+        for posicao in self.velas(motor_a, 12):
+            with self.captureOnCommitCallbacks(execute=True):
+                RegistroManutencao.objects.create(
+                    tenant=self.tenant, posicao=posicao, motor=motor_a, item_estoque=estoque_a,
+                    data_ocorrencia=date(2026, 5, 10), horimetro_na_execucao=4800, arranques_na_execucao=None,
+                    tipo_atividade='SUBSTITUICAO', novo_serial_number='SN-9', quantidade_utilizada=2,
+                    responsavel=campos['responsavel'], observacao=campos['observacao'],
+                )
+
+        self.postar(motor_b, estoque_b, 12)
+
+        estado_a = self.estado(motor_a, estoque_a)
+        estado_b = self.estado(motor_b, estoque_b)
+        self.assertEqual(estado_b['estoque'], 76)
+        for chave in estado_a:
+            with self.subTest(chave=chave):
+                self.assertEqual(estado_b[chave], estado_a[chave])
+
+    def test_queries_constantes(self):
+        motor, estoque = self.novo_motor("A")
+        poucas = self.postar(motor, estoque, 2)
+        muitas = self.postar(motor, estoque, 20)
+        self.assertEqual(muitas, poucas)
+
+    def test_estoque_insuficiente_volta_para_o_formulario(self):
+        motor, estoque = self.novo_motor("A")
+        dados = self.dados(motor, estoque, quantidade_utilizada=10)
+        dados['selecao_multipla'] = [p.pk for p in self.velas(motor, 20)]
+        response = self.client.post(reverse('admin:maintenance_registromanutencao_add'), dados)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Estoque insuficiente")
+        self.assertFalse(RegistroManutencao.objects.exists())
+
+
+class OrquestradorTests(CenarioVelas, TestCase):
+    """Registro único (.create): efeitos na transação do registro, baixa condicional."""
+
+    def registrar(self, **extra):
+        dados = dict(
+            tenant=self.tenant, posicao=self.velas[0], motor=self.motor, data_ocorrencia=date(2026, 5, 10),
+            horimetro_na_execucao=4800, tipo_atividade='LIMPEZA',
+        )
+        dados.update(extra)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            registro = RegistroManutencao.objects.create(**dados)
+        # Só a invalidação das previsões fica para o commit
+        self.assertEqual(len(callbacks), 1)
+        return registro
+
+    def test_limpeza_reseta_so_o_plano_do_gatilho(self):
+        self.registrar()
+        planos = dict(
+            PlanoPreventiva.objects.filter(posicao=self.velas[0])
+            .values_list('tipo_servico', 'ultima_execucao_valor')
+        )
+        # Arranques não informados: usa o contador do motor
+        self.assertEqual(planos, {'LIMPEZA': 300, 'SUBSTITUICAO': 0, 'INSPECAO': 0})
+
+    def test_estoque_insuficiente_desfaz_o_registro(self):
+        with self.assertRaisesMessage(ValidationError, "Estoque insuficiente. Disponível: 50"):
+            self.registrar(
+                tipo_atividade='SUBSTITUICAO', item_estoque=self.estoque, quantidade_utilizada=51,
+                novo_serial_number='SN-1',
+            )
+        self.assertFalse(RegistroManutencao.objects.exists())
+        self.estoque.refresh_from_db()
+        self.assertEqual(self.estoque.quantidade, 50)
+        self.velas[0].refresh_from_db()
+        self.assertNotEqual(self.velas[0].serial_number, 'SN-1')
+        self.assertEqual(
+            PlanoPreventiva.objects.filter(posicao=self.velas[0], ultima_execucao_valor__gt=0).count(), 0
+        )
+
+    def test_estoque_insuficiente_pela_view(self):
+        user = User.objects.create_user(email="tecnico@teste.com", password="x", tenant=self.tenant)
+        self.client.force_login(user)
+        dados = {
+            'tenant': self.tenant.pk, 'motor': self.motor.pk, 'posicao': self.velas[0].pk,
+            'data_ocorrencia': '2026-05-10', 'horimetro_na_execucao': 4800, 'tipo_atividade': 'SUBSTITUICAO',
+            'item_estoque': self.estoque.pk, 'quantidade_utilizada': 51, 'chave_idempotencia': 'tablet-9',
+        }
+        response = self.client.post(reverse('maintenance:registro_add'), dados)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Estoque insuficiente")
+        self.assertFalse(RegistroManutencao.objects.exists())
+        self.assertFalse(ChaveIdempotencia.objects.exists())
+
+
+class IdempotenciaTests(CenarioVelas, TestCase):
+    """Reenvio com a mesma chave devolve o registro original sem repetir efeitos."""
+
+    def test_reenvio_pelo_servico(self):
+        dados = dict(
+            tenant=self.tenant, usuario="Técnico", posicao_ids=[v.pk for v in self.velas[:4]],
+            motor_id=self.motor.pk, tipo_atividade='SUBSTITUICAO', horimetro_atual=4800,
+            data_ocorrencia=date(2026, 5, 10), estoque_item_id=self.estoque.pk, chave_idempotencia="tablet-1",
+        )
+        originais = registrar_intervencoes_em_lote(**dados)
+        with CaptureQueriesContext(connection) as ctx:
+            reenvio = registrar_intervencoes_em_lote(**dados)
+        comandos = [q['sql'].split()[0] for q in ctx.captured_queries]
+        self.assertEqual([c for c in comandos if c not in ('SAVEPOINT', 'RELEASE')], ['SELECT', 'SELECT'])
+
+        self.assertEqual([r.pk for r in reenvio], [r.pk for r in originais])
+        self.assertEqual(RegistroManutencao.objects.count(), 4)
+        self.estoque.refresh_from_db()
+        self.assertEqual(self.estoque.quantidade, 46)
+
+    def test_reenvio_pela_view(self):
+        user = User.objects.create_user(email="tecnico@teste.com", password="x", tenant=self.tenant)
+        self.client.force_login(user)
+        dados = {
+            'tenant': self.tenant.pk, 'motor': self.motor.pk, 'posicao': self.velas[0].pk,
+            'data_ocorrencia': '2026-05-10', 'horimetro_na_execucao': 4800, 'tipo_atividade': 'SUBSTITUICAO',
+            'item_estoque': self.estoque.pk, 'quantidade_utilizada': 1,
+        }
+        url = reverse('maintenance:registro_add')
+        for _ in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url, dados, HTTP_IDEMPOTENCY_KEY="tablet-2")
+            self.assertEqual(response.status_code, 302)
+
+        self.assertEqual(RegistroManutencao.objects.count(), 1)
+        self.estoque.refresh_from_db()
+        self.assertEqual(self.estoque.quantidade, 49)
+
+    def test_reenvio_pelo_formulario_sem_original(self):
+        user = User.objects.create_user(email="tecnico@teste.com", password="x", tenant=self.tenant)
+        self.client.force_login(user)
+        url = reverse('maintenance:registro_add')
+        formulario = self.client.get(url)
+        chave = formulario.context['chave_idempotencia']
+        self.assertContains(formulario, f'name="chave_idempotencia" value="{chave}"')
+        dados = {
+            'tenant': self.tenant.pk, 'motor': self.motor.pk, 'posicao': self.velas[0].pk,
+            'data_ocorrencia': '2026-05-10', 'horimetro_na_execucao': 4800, 'tipo_atividade': 'INSPECAO',
+            'quantidade_utilizada': 0, 'chave_idempotencia': chave,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, dados)
+        self.assertEqual(RegistroManutencao.objects.count(), 1)
+
+        # O original foi apagado depois: o reenvio não recria nem quebra, só volta para a lista
+        RegistroManutencao.objects.all().delete()
+        response = self.client.post(url, dados)
+        self.assertRedirects(response, reverse('admin:maintenance_registromanutencao_changelist'), fetch_redirect_response=False)
+        self.assertFalse(RegistroManutencao.objects.exists())
+
+
+    def test_reenvio_depois_do_arquivamento(self):
+        dados = dict(
+            tenant=self.tenant, usuario="Técnico", posicao_id=self.velas[0].pk, motor_id=self.motor.pk,
+            tipo_atividade='SUBSTITUICAO', horimetro_atual=4800, data_ocorrencia=date(2020, 5, 10),
+            estoque_item_id=self.estoque.pk, chave_idempotencia="tablet-3",
+        )
+        registrar_intervencao(**dados)
+        with tempfile.TemporaryDirectory() as diretorio, override_settings(ARQUIVO_MANUTENCAO_DIR=diretorio):
+            arquivar_registros(antes_de=date(2021, 1, 1))
+
+        with self.assertRaisesMessage(ValidationError, "não está mais no Livro de Ocorrências"):
+            registrar_intervencao(**dados)
+        self.assertFalse(RegistroManutencao.objects.exists())
+        self.estoque.refresh_from_db()
+        self.assertEqual(self.estoque.quantidade, 49)
+
+    def test_superusuario_sem_empresa(self):
+        # Sem tenant não há onde guardar a chave: o formulário grava sem idempotência
+        admin = User.objects.create_superuser(email="root@teste.com", password="x")
+        self.client.force_login(admin)
+        dados = {
+            'tenant': self.tenant.pk, 'motor': self.motor.pk, 'posicao': self.velas[0].pk,
+            'data_ocorrencia': '2026-05-10', 'horimetro_na_execucao': 4800, 'tipo_atividade': 'INSPECAO',
+            'quantidade_utilizada': 0, 'chave_idempotencia': "formulario-1",
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('maintenance:registro_add'), dados)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(RegistroManutencao.objects.count(), 1)
+
+        # Outro erro de integridade não é confundido com um reenvio
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            reservar_chave(None, "formulario-1")
+
+
+class ArquivoFrioTests(CenarioVelas, TestCase):
+    """Registros antigos saem da tabela para o JSONL.gz e continuam legíveis no histórico."""
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        configuracao = override_settings(ARQUIVO_MANUTENCAO_DIR=diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+        vela = self.velas[0]
+        RegistroManutencao.objects.bulk_create([
+            RegistroManutencao(
+                tenant=self.tenant, motor=self.motor, posicao=posicao, data_ocorrencia=data,
+                horimetro_na_execucao=horas, tipo_atividade='INSPECAO', observacao="Ok",
+            )
+            for posicao, data, horas in (
+                (vela, date(2017, 3, 1), 100), (vela, date(2018, 6, 1), 900),
+                (self.velas[1], date(2018, 7, 1), 950), (vela, date(2026, 5, 10), 4800),
+            )
+        ])
+
+    def test_arquiva_e_le_de_volta(self):
+        movidos = arquivar_registros(antes_de=date(2020, 1, 1), lote=2)
+        self.assertEqual(movidos, {(self.tenant.pk, 2017): 1, (self.tenant.pk, 2018): 2})
+        self.assertTrue(caminho_arquivo(self.tenant.pk, 2018).exists())
+        self.assertEqual(list(RegistroManutencao.objects.values_list('horimetro_na_execucao', flat=True)), [4800])
+
+        historico = historico_posicao(self.velas[0], incluir_arquivo=True)
+        self.assertEqual([r.data_ocorrencia.year for r in historico], [2026, 2018, 2017])
+        self.assertEqual([getattr(r, 'arquivado', False) for r in historico], [False, True, True])
+        self.assertEqual(historico[1].get_tipo_atividade_display(), 'Inspeção / Rotina')
+        self.assertEqual(len(historico_posicao(self.velas[0])), 1)
+        self.assertEqual(len(registros_arquivados(self.tenant.pk, desde=date(2018, 1, 1))), 2)
+
+        # Página do componente: arquivo só com ?arquivo=1
+        user = User.objects.create_user(email="tecnico@teste.com", password="x", tenant=self.tenant)
+        self.client.force_login(user)
+        url = reverse('components:posicaocomponente_detail', args=[self.velas[0].pk])
+        self.assertNotContains(self.client.get(url), '01/03/2017')
+        self.assertContains(self.client.get(url, {'arquivo': '1'}), '01/03/2017')
+
+
+class LivroOcorrenciasAdminTests(CenarioVelas, TestCase):
+    """Changelist do livro: páginas por cursor (sem OFFSET) e filtro de ativo com busca."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        RegistroManutencao.objects.bulk_create([
+            RegistroManutencao(
+                tenant=cls.tenant, motor=cls.motor, posicao=cls.velas[i % 20],
+                data_ocorrencia=date(2026, 1 + i % 5, 1), horimetro_na_execucao=i,
+            )
+            for i in range(130)
+        ])
+
+    def setUp(self):
+        user = User.objects.create_user(email="admin@teste.com", password="x", tenant=self.tenant)
+        user.is_staff = user.is_superuser = True
+        user.save()
+        self.client.force_login(user)
+
+    def test_paginas_por_cursor(self):
+        url = reverse('admin:maintenance_registromanutencao_changelist')
+        vistos = []
+        response = self.client.get(url)
+        cl = response.context['cl']
+        self.assertTrue(cl.keyset)
+        self.assertEqual(cl.result_count, 130)
+        vistos += cl.result_list
+        self.assertContains(response, 'data-field-name="motor"')
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url + cl.url_proxima_pagina)
+        cl = response.context['cl']
+        self.assertIsNone(cl.url_proxima_pagina)
+        vistos += cl.result_list
+
+        self.assertEqual(len({r.pk for r in vistos}), 130)
+        chaves = [(r.data_ocorrencia, r.pk) for r in vistos]
+        self.assertEqual(chaves, sorted(chaves, reverse=True))
+        self.assertFalse(any('OFFSET' in q['sql'] for q in ctx.captured_queries))
+
+        # Filtro de ativo: mesmo parâmetro do filtro padrão de FK
+        response = self.client.get(url, {'motor__id__exact': self.motor.pk})
+        self.assertEqual(response.context['cl'].result_count, 130)
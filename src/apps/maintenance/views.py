@@ -1,12 +1,20 @@
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import HttpResponseRedirect
+from django.urls import reverse_lazy
 from django.views.generic import CreateView            # <--- Faltava isso
 from django.contrib.auth.mixins import LoginRequiredMixin # <--- Faltava isso
-from .models import RegistroManutencao 
+from .models import RegistroManutencao
+from .services import reservar_chave, concluir_reserva
 
 class RegistroManutencaoCreateView(LoginRequiredMixin, CreateView):
     model = RegistroManutencao
-    fields = '__all__' 
+    fields = '__all__'
     template_name = 'maintenance/registro_form.html'
-    
+    success_url = reverse_lazy('admin:maintenance_registromanutencao_changelist')
+
     def get_initial(self):
         # Preenche automaticamente o componente se vier pela URL (?posicao=ID)
         initial = super().get_initial()
@@ -14,5 +22,49 @@ class RegistroManutencaoCreateView(LoginRequiredMixin, CreateView):
         if posicao_id:
             # Garanta que seu Model RegistroManutencao tem um campo chamado 'posicao'
             # Se o nome do campo for outro (ex: 'componente'), troque abaixo.
-            initial['posicao'] = posicao_id 
-        return initial
\ No newline at end of file
+            initial['posicao'] = posicao_id
+        return initial
+
+    def form_valid(self, form):
+        # Estoque insuficiente na baixa: o registro foi desfeito, o erro volta para o formulário
+        try:
+            return super().form_valid(form)
+        except ValidationError as erro:
+            self.object = None
+            form.add_error(None, erro)
+            return self.form_invalid(form)
+
+    # --- IDEMPOTÊNCIA (reenvio do tablet não duplica o registro) ---
+    def get_chave_idempotencia(self):
+        # Cabeçalho "Idempotency-Key" (clientes HTTP) ou campo oculto do formulário
+        return self.request.headers.get('Idempotency-Key') or self.request.POST.get('chave_idempotencia')
+
+    def get_context_data(self, **kwargs):
+        # Uma chave nova por formulário exibido; se o form voltar com erro, mantém a mesma
+        kwargs.setdefault('chave_idempotencia', self.request.POST.get('chave_idempotencia') or uuid.uuid4().hex)
+        return super().get_context_data(**kwargs)
+
+    def post(self, request, *args, **kwargs):
+        chave = self.get_chave_idempotencia()
+        # Superusuário sem empresa: a chave não tem tenant a que pertencer
+        if not chave or not request.user.tenant_id:
+            return super().post(request, *args, **kwargs)
+
+        self.object = None
+        with transaction.atomic():
+            reserva, originais = reservar_chave(request.user.tenant_id, chave)
+            if originais is not None:
+                # Reenvio: devolve o original sem validar nem gravar nada de novo.
+                # Se o original já foi apagado (ou arquivado), só volta para a lista.
+                if not originais:
+                    return HttpResponseRedirect(self.success_url)
+                self.object = originais[0]
+                return HttpResponseRedirect(self.get_success_url())
+
+            response = super().post(request, *args, **kwargs)
+            if self.object is None:
+                # Form inválido: libera a chave para o próximo envio corrigido
+                transaction.set_rollback(True)
+            else:
+                concluir_reserva(reserva, [self.object])
+            return response
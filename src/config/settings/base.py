@@ -39,6 +39,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'src.apps.core.middleware.TenantMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -87,4 +88,28 @@ USE_THOUSAND_SEPARATOR = True
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'src/apps/dashboard/static']
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# 6. Telemetria (horímetro/arranques enviados pelos controladores)
+# Leituras ficam em memória e são gravadas no máximo uma vez por intervalo
+# (0 = grava a cada requisição, já coalescida por ativo).
+TELEMETRIA_FLUSH_SEGUNDOS = env.int('TELEMETRIA_FLUSH_SEGUNDOS', default=0)
+
+# 7. Cache
+# Memória local por padrão; CACHE_URL aponta para um backend externo
+# compartilhado entre os processos (ex.: redis://localhost:6379/1).
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://motores'),
+}
+# Validade das entradas por tenant (src.apps.core.cache); a invalidação
+# por versão é imediata, o timeout só limita o que fica ocupando memória.
+CACHE_TENANT_TIMEOUT = env.int('CACHE_TENANT_TIMEOUT', default=24 * 60 * 60)
+# Em memória local a versão não é compartilhada: um worker só percebe a
+# invalidação feita em outro quando a entrada expira (segundos).
+CACHE_TENANT_TIMEOUT_LOCAL = env.int('CACHE_TENANT_TIMEOUT_LOCAL', default=30)
+
+# 8. Arquivo frio do Livro de Ocorrências (src.apps.maintenance.arquivo)
+# Registros mais antigos que a idade saem da tabela para
+# <ARQUIVO_MANUTENCAO_DIR>/<tenant>/registros_<ano>.jsonl.gz (command arquivar_registros).
+ARQUIVO_MANUTENCAO_DIR = env('ARQUIVO_MANUTENCAO_DIR', default=str(BASE_DIR / 'arquivo'))
+ARQUIVO_MANUTENCAO_IDADE_DIAS = env.int('ARQUIVO_MANUTENCAO_IDADE_DIAS', default=3 * 365)
@@ -4,7 +4,11 @@ from django.urls import path, include
 urlpatterns = [
     path('admin/', admin.site.urls),
 
+    path('', include('src.apps.dashboard.urls', namespace='dashboard')),
+
+    path('core/', include('src.apps.core.urls', namespace='core')),
     path('components/', include('src.apps.components.urls', namespace='components')),
+    path('assets/', include('src.apps.assets.urls', namespace='assets')),
 
    
     path('maintenance/', include('src.apps.maintenance.urls')),